@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -50,6 +51,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # keeps the users that wrote on the primary, see DATABASE_ROUTERS
+    'core.middleware.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,16 +81,192 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# connections of each process taken from a pool instead of opened by every
+# request, 0 disables the pool. size it to the threads of a worker
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # the postgres backend with health checks and the optional pool
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
+        'PORT': os.environ.get('DB_PORT', ''),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # seconds a connection stays open for the next requests of the same
+        # thread, 0 closes it at the end of each request. with the pool the
+        # connection goes back to the pool instead, so any thread can use it
+        'CONN_MAX_AGE': int(os.environ.get(
+            'DB_CONN_MAX_AGE',
+            0 if DB_POOL_SIZE else 60
+        )),
+        # check that a reused connection still works before using it
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+        'POOL_SIZE': DB_POOL_SIZE,
+        # seconds a request waits for a connection of a full pool
+        'POOL_TIMEOUT': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'OPTIONS': {
+            # seconds to give up on a connection to a database that doesn't
+            # answer, instead of waiting for the timeout of the system
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+        },
     }
 }
 
+# read replicas of the primary, hosts separated by commas. they take the
+# other settings of the primary, DB_REPLICA_NAME and DB_REPLICA_PORT
+# change the database, like a second local one to try the routing
+DB_REPLICA_HOSTS = [
+    host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',')
+    if host
+]
+for index, host in enumerate(DB_REPLICA_HOSTS):
+    DATABASES[f'replica_{index}'] = dict(
+        DATABASES['default'],
+        HOST=host,
+        PORT=os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        NAME=os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        # the tests read the test database through the replicas
+        TEST={'MIRROR': 'default'},
+    )
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# the safe requests of the recipe and user endpoints read from a replica,
+# everything else uses the primary
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+# seconds the reads of a user stay on the primary after the user writes,
+# so it sees its own changes. keep it above the replication lag
+DB_REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+# cache with the pinned users. with DB_REPLICA_HOSTS it must be a backend
+# shared by the processes, like a redis one set with PIN_CACHE_BACKEND,
+# or the next request of a user may reach a process that missed its pin
+DB_REPLICA_PIN_CACHE = os.environ.get('DB_REPLICA_PIN_CACHE', 'pin')
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+# local memory by default. any other backend, like a redis one, can be
+# plugged in production through the environment variables
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+    # counters of the login throttles, separated so the cached responses
+    # can't evict them
+    'throttle': {
+        'BACKEND': os.environ.get(
+            'THROTTLE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('THROTTLE_CACHE_LOCATION', 'throttle'),
+    },
+    # users pinned to the primary database after a write, separated so the
+    # cached responses can't evict the pins
+    'pin': {
+        'BACKEND': os.environ.get(
+            'PIN_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('PIN_CACHE_LOCATION', 'pin'),
+    },
+    # ids of the revoked signed tokens, separated so the cached responses
+    # can't evict them and make a revoked token valid again
+    'revocation': {
+        'BACKEND': os.environ.get(
+            'REVOCATION_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get(
+            'REVOCATION_CACHE_LOCATION',
+            'revocation'
+        ),
+    },
+}
+
+REST_FRAMEWORK = {
+    # proxies in front of the app. the client address is read from
+    # X-Forwarded-For only behind them, otherwise it could be forged to
+    # escape the throttles
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+    # limits of the login (token) and sign up (create) endpoints, by the
+    # email in the request and by the client address
+    'DEFAULT_THROTTLE_RATES': {
+        'token_email': os.environ.get('THROTTLE_TOKEN_EMAIL', '5/min'),
+        'token_ip': os.environ.get('THROTTLE_TOKEN_IP', '30/min'),
+        'create_email': os.environ.get('THROTTLE_CREATE_EMAIL', '5/hour'),
+        'create_ip': os.environ.get('THROTTLE_CREATE_IP', '20/hour'),
+    },
+}
+# cache alias with the counters of the throttles
+THROTTLE_CACHE = os.environ.get('THROTTLE_CACHE', 'throttle')
+
+# Authentication
+# tokens kept in the memory of each process by CachedTokenAuthentication.
+# a deleted token or a changed user is removed right away from the process
+# that changed it and from the shared cache, the other processes drop it
+# when the ttl (seconds) expires
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 30))
+# alias of a cache shared by the processes, like 'default' with a redis
+# backend. empty disables the shared tier
+AUTH_TOKEN_SHARED_CACHE = os.environ.get('AUTH_TOKEN_SHARED_CACHE', '')
+AUTH_TOKEN_SHARED_CACHE_TTL = int(
+    os.environ.get('AUTH_TOKEN_SHARED_CACHE_TTL', 300)
+)
+
+# what /api/user/token/ issues: 'db' for the database tokens
+# (Authorization: Token <key>) or 'signed' for access and refresh tokens
+# signed with HMAC (Authorization: Bearer <access>). the api accepts both
+AUTH_TOKEN_MODE = os.environ.get('AUTH_TOKEN_MODE', 'db')
+# keys that sign the tokens, separated by commas. the first one signs the
+# new tokens and all of them are accepted, so a key can be rotated by
+# putting the new one first
+AUTH_SIGNING_KEYS = [
+    key for key in os.environ.get('AUTH_SIGNING_KEYS', SECRET_KEY).split(',')
+    if key
+]
+# lifetime of the tokens, in seconds
+AUTH_ACCESS_TOKEN_TTL = int(os.environ.get('AUTH_ACCESS_TOKEN_TTL', 300))
+AUTH_REFRESH_TOKEN_TTL = int(
+    os.environ.get('AUTH_REFRESH_TOKEN_TTL', 14 * 24 * 60 * 60)
+)
+# cache with the revoked signed tokens, it must be shared by the processes
+# in production, like a redis backend set with REVOCATION_CACHE_BACKEND
+AUTH_REVOCATION_CACHE = os.environ.get('AUTH_REVOCATION_CACHE', 'revocation')
+
+# seconds that the recipe api responses are kept in the cache
+RECIPE_CACHE_TIMEOUT = int(os.environ.get('RECIPE_CACHE_TIMEOUT', 300))
+
+# maximum number of items of a request to the bulk endpoints
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get('RECIPE_BULK_MAX_ITEMS', 10000))
+
+# rows read at a time by the export, with the relations of each chunk
+RECIPE_EXPORT_CHUNK_SIZE = int(
+    os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 2000)
+)
+
+# rows of an import file written in each transaction
+RECIPE_IMPORT_CHUNK_SIZE = int(
+    os.environ.get('RECIPE_IMPORT_CHUNK_SIZE', 1000)
+)
+# how the uploaded imports run: 'thread' in the pool of the image jobs,
+# 'sync' during the request. large files are better imported with the
+# import_recipes command
+RECIPE_IMPORT_QUEUE = os.environ.get('RECIPE_IMPORT_QUEUE', 'thread')
+# seconds without progress after which a running import is taken for
+# dead, like when its process restarted, and can be resumed. keep it well
+# above the time of one chunk
+RECIPE_IMPORT_STALE_SECONDS = int(
+    os.environ.get('RECIPE_IMPORT_STALE_SECONDS', 600)
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -102,6 +281,48 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# the model backend of django, without letting a full hashing pool escape
+# authenticate()
+AUTHENTICATION_BACKENDS = ['core.backends.ModelBackend']
+
+# Password hashing
+# the chosen hasher hashes the new passwords. the others only verify the
+# passwords hashed before a change, which are rehashed on the next login
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'argon2')
+PASSWORD_HASHER_CLASSES = {
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'bcrypt': 'core.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CLASSES.items()
+    if name != PASSWORD_HASHER
+]
+# work factors (argon2 memory in KiB), tuned per environment with the
+# benchmark_login command. changing them also rehashes the passwords on the
+# next login
+PASSWORD_ARGON2_TIME_COST = int(
+    os.environ.get('PASSWORD_ARGON2_TIME_COST', 2)
+)
+PASSWORD_ARGON2_MEMORY_COST = int(
+    os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 19456)
+)
+PASSWORD_ARGON2_PARALLELISM = int(
+    os.environ.get('PASSWORD_ARGON2_PARALLELISM', 1)
+)
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+PASSWORD_PBKDF2_ITERATIONS = int(
+    os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 120000)
+)
+# threads that hash the passwords, 0 hashes in the request thread. with a
+# pool at most PASSWORD_HASHING_QUEUE more requests wait for a thread, for
+# at most PASSWORD_HASHING_TIMEOUT seconds, the others get a 503
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 0))
+PASSWORD_HASHING_QUEUE = int(os.environ.get('PASSWORD_HASHING_QUEUE', 16))
+PASSWORD_HASHING_TIMEOUT = float(
+    os.environ.get('PASSWORD_HASHING_TIMEOUT', 5)
+)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
@@ -126,5 +347,29 @@ MEDIA_URL = '/media/'
 STATIC_ROOT = '/vol/web/static'
 MEDIA_ROOT = '/vol/web/media'
 
+# text search configuration of postgres used by the recipe search
+RECIPE_SEARCH_CONFIG = os.environ.get('RECIPE_SEARCH_CONFIG', 'english')
+
+# Recipe images
+# how the uploaded images are processed: 'thread' runs the jobs in a pool
+# inside the web process, 'db' leaves them in the database for the
+# process_image_jobs command and 'sync' runs them during the request
+RECIPE_IMAGE_QUEUE = os.environ.get('RECIPE_IMAGE_QUEUE', 'thread')
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+# seconds without progress after which a running job is taken for dead,
+# like when its process restarted, and is processed again
+RECIPE_IMAGE_STALE_SECONDS = int(
+    os.environ.get('RECIPE_IMAGE_STALE_SECONDS', 600)
+)
+# the longest side, in pixels, of each rendition created from the upload
+RECIPE_IMAGE_SIZES = (128, 512, 1024)
+# every size is stored in each one of these formats
+RECIPE_IMAGE_FORMATS = ('webp', 'jpeg')
+# size of the image url of the recipes when ?image_size= isn't given
+RECIPE_IMAGE_DEFAULT_SIZE = int(
+    os.environ.get('RECIPE_IMAGE_DEFAULT_SIZE', 128)
+)
+RECIPE_IMAGE_QUALITY = int(os.environ.get('RECIPE_IMAGE_QUALITY', 85))
+
 # indicates the custom user model
 AUTH_USER_MODEL = 'core.User'
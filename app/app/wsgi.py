@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# the thread queue only lives in the web process, so the image jobs it lost
+# on the last restart are queued again
+from recipe.tasks import requeue_image_jobs  # noqa: E402
+
+requeue_image_jobs()
@@ -0,0 +1,25 @@
+from django.contrib.auth import backends
+
+from core.hashers import HashingBusy, set_hashing_busy
+
+
+class ModelBackend(backends.ModelBackend):
+    """Authenticate with the database, failing the login when busy.
+
+    django's authenticate() isn't ready for the HashingBusy of a full
+    hashing pool, the admin login would answer 500. The login fails instead
+    and the api turns it into a 503 with hashing_was_busy().
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        set_hashing_busy(False)
+        try:
+            return super().authenticate(
+                request,
+                username=username,
+                password=password,
+                **kwargs
+            )
+        except HashingBusy:
+            set_hashing_busy(True)
+            return None
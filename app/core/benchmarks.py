@@ -0,0 +1,143 @@
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.search import update_search_vector
+
+# words of the seeded names, so the searches have something to match
+WORDS = (
+    'chicken', 'beef', 'pork', 'salmon', 'tofu', 'rice', 'pasta', 'noodle',
+    'potato', 'tomato', 'onion', 'garlic', 'ginger', 'lemon', 'chili',
+    'curry', 'soup', 'salad', 'roast', 'grilled', 'baked', 'spicy', 'sweet',
+    'vegan', 'cheese', 'mushroom', 'spinach', 'chocolate', 'honey', 'basil',
+)
+
+
+def random_name(words=2):
+    """Return a name made of random words"""
+    return ' '.join(random.sample(WORDS, words)).capitalize()
+
+
+def best_time(func, repeat=5):
+    """Call func a few times and return the fastest run in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings) * 1000
+
+
+def list_view(viewset_class, user, params=None):
+    """Return the viewset of a list request of the user"""
+    request = Request(APIRequestFactory().get('/', params or {}))
+    request.user = user
+
+    return viewset_class(
+        action='list',
+        request=request,
+        args=(),
+        kwargs={},
+        format_kwarg=None
+    )
+
+
+def view_queryset(viewset_class, user, params=None):
+    """Return the queryset the viewset list action runs for the user"""
+    return list_view(viewset_class, user, params).get_queryset()
+
+
+def _bulk_create(model, objs, batch_size):
+    """Insert the objects in batches and return them with their ids"""
+    return model.objects.bulk_create(objs, batch_size=batch_size)
+
+
+def seed_user(email, recipes=1000, tags=100, ingredients=200,
+              tags_per_recipe=2, ingredients_per_recipe=5, batch_size=5000):
+    """Create a user that owns a library of random recipes and return it"""
+    # the password is unusable so seeding doesn't pay for password hashing
+    user = get_user_model().objects.create_user(email=email)
+
+    with transaction.atomic():
+        tag_objs = _bulk_create(
+            Tag,
+            [Tag(user=user, name=f'{random_name(1)} {i}')
+             for i in range(tags)],
+            batch_size
+        )
+        ingredient_objs = _bulk_create(
+            Ingredient,
+            [
+                Ingredient(user=user, name=f'{random_name(1)} {i}')
+                for i in range(ingredients)
+            ],
+            batch_size
+        )
+
+        # the recipes are created one batch at a time, so a library with
+        # millions of recipes doesn't have to fit in memory
+        for start in range(0, recipes, batch_size):
+            recipe_objs = _bulk_create(
+                Recipe,
+                [
+                    Recipe(
+                        user=user,
+                        title=f'{random_name(3)} {i}',
+                        time_minutes=random.randint(5, 240),
+                        cost=random.randint(100, 99999) / 100
+                    )
+                    for i in range(start, min(start + batch_size, recipes))
+                ],
+                batch_size
+            )
+
+            recipe_tags = []
+            recipe_ingredients = []
+            for recipe in recipe_objs:
+                sampled = random.sample(
+                    tag_objs,
+                    min(tags_per_recipe, tags)
+                )
+                for tag in sampled:
+                    recipe_tags.append(Recipe.tags.through(
+                        recipe_id=recipe.id,
+                        tag_id=tag.id
+                    ))
+                sampled = random.sample(
+                    ingredient_objs,
+                    min(ingredients_per_recipe, ingredients)
+                )
+                for ingredient in sampled:
+                    recipe_ingredients.append(Recipe.ingredients.through(
+                        recipe_id=recipe.id,
+                        ingredient_id=ingredient.id
+                    ))
+
+            _bulk_create(Recipe.tags.through, recipe_tags, batch_size)
+            _bulk_create(
+                Recipe.ingredients.through,
+                recipe_ingredients,
+                batch_size
+            )
+            # bulk_create doesn't send the signals that index the recipes
+            update_search_vector([recipe.id for recipe in recipe_objs])
+
+    return user
+
+
+def seed_database(users=10, **options):
+    """Create users with recipe libraries and return the users"""
+    run = uuid.uuid4().hex[:8]
+
+    return [
+        seed_user(f'bench-{run}-{i}@example.com', **options)
+        for i in range(users)
+    ]
@@ -0,0 +1,98 @@
+from django.db.backends.postgresql import base
+
+from core.db.backends.postgresql.creation import DatabaseCreation
+from core.db.backends.postgresql.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Postgres backend with connection health checks and an optional pool.
+
+    The extra keys of the DATABASES entry:
+
+    CONN_HEALTH_CHECKS: a persistent connection (CONN_MAX_AGE) is checked
+    with a SELECT 1 before the first query of each request, and replaced when
+    the server closed it, instead of failing the request.
+
+    POOL_SIZE: when set, the connections are taken from a pool of the
+    process with up to POOL_SIZE connections and returned to it instead of
+    closed. POOL_TIMEOUT is how long a thread waits for a free connection.
+    """
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.pool = None
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool_size(self):
+        return self.settings_dict.get('POOL_SIZE') or 0
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_size:
+            self.pool = None
+            return super().get_new_connection(conn_params)
+
+        self.pool = get_pool(
+            conn_params,
+            self.pool_size,
+            self.settings_dict.get('POOL_TIMEOUT', 30),
+            self.health_check_enabled
+        )
+        connection = self.pool.getconn()
+        # same as a new connection of the default backend
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+    def connect(self):
+        super().connect()
+        # a new connection works, it isn't checked again in this request
+        self.health_check_done = True
+
+    def _close(self):
+        if self.connection is None or self.pool is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # the wrapper keeps a connection closed inside a transaction
+                # until the transaction ends, no other thread can have it
+                self.connection.close()
+            # a closed connection only frees its place in the pool
+            self.pool.putconn(self.connection)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # called when a request starts and ends, the connection is checked
+        # again before the first query of the next request
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        """Close the connection if the server closed it since its last use"""
+        if (self.connection is None or not self.health_check_enabled or
+                self.health_check_done):
+            return
+
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        # not inside a transaction, a connection lost in the middle of one
+        # has to fail
+        if not self.in_atomic_block:
+            self.close_if_health_check_failed()
+
+        return super()._cursor(name)
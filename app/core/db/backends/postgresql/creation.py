@@ -0,0 +1,11 @@
+from django.db.backends.postgresql import creation
+
+from core.db.backends.postgresql.pool import close_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # the connections waiting in the pools would block the DROP DATABASE
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
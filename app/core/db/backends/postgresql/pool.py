@@ -0,0 +1,116 @@
+import collections
+import os
+import threading
+
+import psycopg2
+from psycopg2 import extensions
+
+# (process id, connection parameters): pool, a forked worker creates its own
+# pools instead of sharing the sockets of its parent
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Open connections of a process, reused by the requests of its threads.
+
+    At most `size` connections are checked out at a time, a thread that
+    needs one more waits up to `timeout` seconds for a connection to come
+    back. The connections that come back wait in the pool, the most recent
+    one is reused first so the older ones can time out on the server.
+    """
+
+    def __init__(self, conn_params, size, timeout, health_checks=False):
+        self.conn_params = conn_params
+        self.timeout = timeout
+        self.health_checks = health_checks
+        self.slots = threading.BoundedSemaphore(size)
+        self.idle = collections.deque()
+        self.closed = False
+
+    def getconn(self):
+        """Return an open connection, reused or new"""
+        if not self.slots.acquire(timeout=self.timeout):
+            raise psycopg2.OperationalError(
+                'Connection pool exhausted, no connection came back in '
+                f'{self.timeout} seconds.'
+            )
+        try:
+            while True:
+                try:
+                    connection = self.idle.pop()
+                except IndexError:
+                    return psycopg2.connect(**self.conn_params)
+                if self._is_usable(connection):
+                    return connection
+                connection.close()
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def putconn(self, connection):
+        """Return a connection, rolling back what it left open"""
+        try:
+            if connection.closed:
+                return
+            if self.closed:
+                connection.close()
+                return
+            status = connection.get_transaction_status()
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                # the server is gone
+                connection.close()
+                return
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            self.idle.append(connection)
+        except psycopg2.Error:
+            connection.close()
+        finally:
+            self.slots.release()
+
+    def close(self):
+        """Close the connections waiting in the pool and the ones in use
+        when they come back"""
+        self.closed = True
+        while self.idle:
+            try:
+                self.idle.pop().close()
+            except IndexError:
+                break
+
+    def _is_usable(self, connection):
+        if connection.closed:
+            return False
+        if not self.health_checks:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except psycopg2.Error:
+            return False
+
+        return True
+
+
+def get_pool(conn_params, size, timeout, health_checks):
+    """Return the pool of the connection parameters in this process"""
+    key = (os.getpid(), tuple(sorted(conn_params.items())))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                conn_params,
+                size,
+                timeout,
+                health_checks
+            )
+
+        return _pools[key]
+
+
+def close_pools():
+    """Close the pools of this process, the next connections get new ones"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,106 @@
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.permissions import SAFE_METHODS
+
+# routing of the request served by each thread. the replica is None while
+# the reads go to the primary
+_state = threading.local()
+
+
+def reset():
+    """Send the reads of the thread to the primary again"""
+    _state.replica = None
+    _state.wrote = False
+
+
+def wrote():
+    """Return True if the request of the thread wrote to the primary"""
+    return getattr(_state, 'wrote', False)
+
+
+def _pin_key(user_id):
+    return f'db:pin:{user_id}'
+
+
+def pin_to_primary(user):
+    """Keep the reads of the user on the primary for a while.
+
+    The replicas lag behind the primary, so for DB_REPLICA_PIN_SECONDS
+    after a write the user reads from the primary and sees its changes.
+    The pin is kept in a cache shared by the processes.
+    """
+    if user.is_authenticated:
+        pin_user_to_primary(user.pk)
+
+
+def pin_user_to_primary(user_id):
+    """Pin the user with the id, like after a write of a background job"""
+    if not settings.DATABASE_REPLICAS:
+        return
+
+    caches[settings.DB_REPLICA_PIN_CACHE].set(
+        _pin_key(user_id),
+        True,
+        settings.DB_REPLICA_PIN_SECONDS
+    )
+
+
+def is_pinned(user):
+    """Return True if the user wrote in the last DB_REPLICA_PIN_SECONDS"""
+    return caches[settings.DB_REPLICA_PIN_CACHE].get(_pin_key(user.pk), False)
+
+
+def read_from_replica(user):
+    """Send the next reads of the request of the user to a replica"""
+    if not settings.DATABASE_REPLICAS or wrote() or is_pinned(user):
+        return
+
+    # one replica per request, so its reads are consistent
+    _state.replica = random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaRouter:
+    """Route the reads of the marked requests to the replicas.
+
+    The writes, and the reads that follow them in the same request, go to
+    the primary ('default'). Outside of the requests, like in the commands
+    and the background jobs, everything goes to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if wrote():
+            return 'default'
+
+        return getattr(_state, 'replica', None) or 'default'
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas have the same rows as the primary
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replicas receive the migrations from the primary
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaReadMixin:
+    """Read from the replicas in the safe requests of a view"""
+
+    def initial(self, request, *args, **kwargs):
+        # the authentication runs on the primary. a token created by a
+        # login a moment ago may not be on the replicas yet
+        super().initial(request, *args, **kwargs)
+
+        if request.method in SAFE_METHODS:
+            read_from_replica(request.user)
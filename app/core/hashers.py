@@ -0,0 +1,129 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingBusy(APIException):
+    """Raised when all the password hashing slots stay taken"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many logins in progress, try again later.')
+    default_code = 'hashing_busy'
+
+
+_pool = None
+_pool_size = None
+_slots = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_pool(workers):
+    """Return the hashing pool and the semaphore that bounds its queue"""
+    global _pool, _pool_size, _slots
+    size = (workers, settings.PASSWORD_HASHING_QUEUE)
+    with _pool_lock:
+        if _pool_size != size:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix='password-hashing'
+            )
+            _slots = threading.BoundedSemaphore(sum(size))
+            _pool_size = size
+
+    return _pool, _slots
+
+
+def _run_in_pool(func, *args):
+    _local.in_pool = True
+    try:
+        return func(*args)
+    finally:
+        _local.in_pool = False
+
+
+def run_hashing(func, *args):
+    """Run a hashing function in the bounded pool, when it is enabled.
+
+    At most PASSWORD_HASHING_WORKERS hashes run at the same time and at most
+    PASSWORD_HASHING_QUEUE more wait for them. A request that can't get a
+    place in PASSWORD_HASHING_TIMEOUT seconds fails with 503 instead of
+    piling up behind a burst of logins.
+    """
+    workers = settings.PASSWORD_HASHING_WORKERS
+    # verify calls encode in some hashers, it must not wait for itself
+    if not workers or getattr(_local, 'in_pool', False):
+        return func(*args)
+
+    pool, slots = _get_pool(workers)
+    if not slots.acquire(timeout=settings.PASSWORD_HASHING_TIMEOUT):
+        raise HashingBusy()
+    try:
+        return pool.submit(_run_in_pool, func, *args).result()
+    finally:
+        slots.release()
+
+
+def set_hashing_busy(busy):
+    """Record whether the last login of the thread found the pool full"""
+    _local.busy = busy
+
+
+def hashing_was_busy():
+    """Return True if the last login of the thread found the pool full"""
+    return getattr(_local, 'busy', False)
+
+
+class PooledHasherMixin:
+    """Run the encoding and the verification of a hasher in the pool"""
+
+    def encode(self, password, salt, *args):
+        return run_hashing(super().encode, password, salt, *args)
+
+    def verify(self, password, encoded):
+        return run_hashing(super().verify, password, encoded)
+
+
+# the work factors are read from the settings on each hash. when they change,
+# check_password rehashes the passwords with the new ones on the next login.
+# the algorithm names are the ones of django, so the stored hashes still work
+
+
+class Argon2PasswordHasher(PooledHasherMixin, hashers.Argon2PasswordHasher):
+    """Argon2 hasher with the work factors of the settings"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(PooledHasherMixin,
+                                 hashers.BCryptSHA256PasswordHasher):
+    """BCrypt hasher with the rounds of the settings"""
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS
+
+
+class PBKDF2PasswordHasher(PooledHasherMixin, hashers.PBKDF2PasswordHasher):
+    """PBKDF2 hasher with the iterations of the settings"""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
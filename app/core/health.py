@@ -0,0 +1,73 @@
+import time
+
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.utils import OperationalError
+
+# databases with all the migrations applied. they stay applied while the
+# process runs, so the migrations aren't loaded again by each probe
+_migrated = set()
+
+
+def ping(alias='default'):
+    """Run SELECT 1 on the database, return the seconds it took.
+
+    It connects first when the connection isn't open, so the time includes
+    the connection.
+    """
+    start = time.perf_counter()
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+    return time.perf_counter() - start
+
+
+def wait_for_database(alias='default', timeout=60, delay=0.1, max_delay=5,
+                      on_retry=None):
+    """Ping the database until it answers, return the seconds of the ping.
+
+    The waits between the attempts start at `delay` and double up to
+    `max_delay`, so a database that is almost up is found quickly without
+    flooding one that takes long. Raises the OperationalError of the last
+    attempt after `timeout` seconds. `on_retry` is called with the error and
+    the seconds of the next wait.
+    """
+    start = time.monotonic()
+    while True:
+        try:
+            return ping(alias)
+        except OperationalError as exc:
+            connection = connections[alias]
+            # a connection broken by a restart is replaced by the next ping
+            if connection.connection is not None \
+                    and not connection.is_usable():
+                connection.close()
+
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                raise
+
+            wait = min(delay, remaining)
+            if on_retry is not None:
+                on_retry(exc, wait)
+            time.sleep(wait)
+            delay = min(delay * 2, max_delay)
+
+
+def pending_migrations(alias='default'):
+    """Return the migrations not applied to the database, as app.name"""
+    if alias in _migrated:
+        return []
+
+    # only the plan of migrate, nothing is applied
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    pending = [
+        f'{migration.app_label}.{migration.name}'
+        for migration, backwards in plan
+    ]
+    if not pending:
+        _migrated.add(alias)
+
+    return pending
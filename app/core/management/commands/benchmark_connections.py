@@ -0,0 +1,113 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.db.backends.postgresql.pool import close_pools
+
+# connection settings compared, applied over the DATABASES entry
+MODES = (
+    ('new connection per request', {
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False,
+        'POOL_SIZE': 0,
+    }),
+    ('persistent connections', {
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': False,
+        'POOL_SIZE': 0,
+    }),
+    ('persistent connections, health checks', {
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'POOL_SIZE': 0,
+    }),
+    ('pool, health checks', {
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': True,
+        'POOL_SIZE': None,
+    }),
+)
+
+
+class Command(BaseCommand):
+    """Django command to compare the connection settings under load"""
+    help = 'Requests per second of the tags list with each connection setting'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='User that lists its tags')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--threads', type=int, default=4)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('User does not exist')
+
+        # the wrappers of every thread read this same dict
+        database = settings.DATABASES['default']
+        original = dict(database)
+        try:
+            for name, params in MODES:
+                database.update(params)
+                if database['POOL_SIZE'] is None:
+                    database['POOL_SIZE'] = options['threads']
+                connections.close_all()
+                close_pools()
+
+                elapsed = self.run_requests(
+                    user,
+                    options['requests'],
+                    options['threads']
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    f'{name}: {options["requests"] / elapsed:.0f} requests/s'
+                ))
+        finally:
+            database.update(original)
+            connections.close_all()
+            close_pools()
+
+    def run_requests(self, user, requests, threads):
+        """Send the requests from the threads, return the seconds it took"""
+        url = reverse('recipe:tag-list')
+        errors = []
+
+        def send(count):
+            # with DEBUG and no ALLOWED_HOSTS only localhost is accepted
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(user)
+            try:
+                for _ in range(count):
+                    # the test client disconnects these from the request
+                    # signals, the wsgi handler calls them on each request
+                    close_old_connections()
+                    res = client.get(url, {'page_size': 10})
+                    close_old_connections()
+                    if res.status_code != 200:
+                        errors.append(res.status_code)
+            finally:
+                connections.close_all()
+
+        workers = [
+            threading.Thread(target=send, args=(requests // threads,))
+            for _ in range(threads)
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+        if errors:
+            raise CommandError(f'{len(errors)} requests failed: {errors[0]}')
+
+        return elapsed
@@ -0,0 +1,77 @@
+import io
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import best_time
+from recipe.images import (IMAGE_FORMATS, apply_exif_orientation,
+                           encode_image, resize_image)
+
+
+def sample_photo(width=4000, height=3000):
+    """Return an image with gradients and noise, closer to a photo"""
+    gray = Image.effect_mandelbrot(
+        (width, height),
+        (-2.2, -1.2, 1.0, 1.2),
+        100
+    )
+    noise = Image.effect_noise((width, height), 40)
+    red = Image.linear_gradient('L').resize((width, height))
+
+    return Image.merge('RGB', (red, gray, noise))
+
+
+class Command(BaseCommand):
+    """Django command to compare the encoding of the image renditions"""
+    help = 'Measure the encode time and the size of the image renditions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            help='Image to encode, a generated photo is used by default'
+        )
+        parser.add_argument(
+            '--quality',
+            type=int,
+            nargs='+',
+            default=[settings.RECIPE_IMAGE_QUALITY]
+        )
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if options['path']:
+            try:
+                with open(options['path'], 'rb') as image_file:
+                    original = image_file.read()
+            except OSError as exc:
+                raise CommandError(exc)
+            img = apply_exif_orientation(Image.open(io.BytesIO(original)))
+        else:
+            img = sample_photo()
+            original = encode_image(img, 'jpeg', quality=95)
+        img = img.convert('RGB')
+
+        self.stdout.write(
+            f'Original {img.size[0]}x{img.size[1]}: '
+            f'{len(original) / 1024:.0f}KB'
+        )
+        self.stdout.write(
+            f'{"size":>6} {"format":>6} {"quality":>7} '
+            f'{"encode ms":>10} {"KB":>8} {"of original":>11}'
+        )
+        for size in settings.RECIPE_IMAGE_SIZES:
+            resized = resize_image(img, size)
+            for image_format in IMAGE_FORMATS:
+                for quality in options['quality']:
+                    output = encode_image(resized, image_format, quality)
+                    elapsed = best_time(
+                        lambda: encode_image(resized, image_format, quality),
+                        options['repeat']
+                    )
+                    self.stdout.write(
+                        f'{size:>6} {image_format:>6} {quality:>7} '
+                        f'{elapsed:>10.1f} {len(output) / 1024:>8.1f} '
+                        f'{len(output) / len(original):>11.2%}'
+                    )
@@ -0,0 +1,106 @@
+import io
+import json
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.benchmarks import random_name
+from core.models import Tag, Ingredient, Recipe, RecipeImport
+from recipe.importer import RecipeImporter
+
+
+class Rollback(Exception):
+    """Raised to undo the recipes imported by the benchmark"""
+
+
+class Command(BaseCommand):
+    """Django command to measure the throughput of the recipe import"""
+    help = 'Import generated recipes in chunks and roll them back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='User that imports the recipes')
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument(
+            '--chunk-sizes',
+            default='100,1000,5000',
+            help='Comma separated chunk sizes to compare'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('User does not exist')
+
+        rows = [
+            {
+                'title': random_name(3),
+                'time_minutes': random.randint(5, 120),
+                'cost': f'{random.uniform(1, 50):.2f}',
+                'tags': [random_name(1) for _ in range(2)],
+                'ingredients': [random_name(1) for _ in range(4)],
+            }
+            for _ in range(options['rows'])
+        ]
+        content = b''.join(json.dumps(row).encode() + b'\n' for row in rows)
+
+        # the rows one at a time with the orm, for comparison
+        per_row = min(len(rows), 500)
+        elapsed = self.rolled_back(
+            lambda: self.save_rows(user, rows[:per_row])
+        )
+        self.stdout.write(
+            f'one row at a time: {per_row / elapsed:.0f} rows/s'
+        )
+
+        for chunk_size in options['chunk_sizes'].split(','):
+            elapsed = self.rolled_back(lambda: self.import_rows(
+                user,
+                content,
+                int(chunk_size)
+            ))
+            self.stdout.write(self.style.SUCCESS(
+                f'import, chunks of {chunk_size}: '
+                f'{len(rows) / elapsed:.0f} rows/s'
+            ))
+
+    def rolled_back(self, func):
+        """Run func in a transaction that is rolled back, return its time"""
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - start
+                raise Rollback
+        except Rollback:
+            pass
+
+        return elapsed
+
+    def save_rows(self, user, rows):
+        for row in rows:
+            recipe = Recipe.objects.create(
+                user=user,
+                title=row['title'],
+                time_minutes=row['time_minutes'],
+                cost=row['cost']
+            )
+            recipe.tags.add(*[
+                Tag.objects.get_or_create(user=user, name=name)[0]
+                for name in row['tags']
+            ])
+            recipe.ingredients.add(*[
+                Ingredient.objects.get_or_create(user=user, name=name)[0]
+                for name in row['ingredients']
+            ])
+
+    def import_rows(self, user, content, chunk_size):
+        recipe_import = RecipeImport.objects.create(
+            user=user,
+            file='benchmark',
+            format=RecipeImport.FORMAT_NDJSON
+        )
+        RecipeImporter(recipe_import, chunk_size).run(io.BytesIO(content))
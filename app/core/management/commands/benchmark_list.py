@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmarks import best_time, list_view
+from recipe import views
+from recipe.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    """Django command to compare the serializer lists with the values() ones"""
+    help = 'Time the list endpoints of a seeded user with both read paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'email',
+            help='User created by the seed_db command'
+        )
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('User does not exist, run seed_db first')
+
+        page_size = options['page_size']
+        lists = {
+            'tags': (views.TagViewSet, {}),
+            'ingredients': (views.IngredientViewSet, {}),
+            f'recipes ({page_size})': (views.RecipeViewSet, {}),
+            f'recipes ({page_size}) id,title,image': (
+                views.RecipeViewSet,
+                {'fields': 'id,title,image'}
+            ),
+        }
+
+        encoder = 'orjson' if orjson is not None else 'json'
+        self.stdout.write(f'values() rows rendered with {encoder}')
+        self.stdout.write(
+            f'{"list":<36} {"serializer ms":>14} {"values ms":>10} '
+            f'{"speedup":>8}'
+        )
+        for name, (viewset_class, params) in lists.items():
+            view = list_view(viewset_class, user, params)
+            serializer = view.get_serializer()
+            queryset = view.get_queryset()
+            if viewset_class is views.RecipeViewSet:
+                # the prefetch the list used before the values() rows
+                queryset = queryset.prefetch_related(*[
+                    lookup for lookup in view.prefetch_for_action['bulk']
+                    if lookup.prefetch_through in serializer.fields
+                ])
+                queryset = queryset[:page_size]
+            rows = queryset.prefetch_related(None).values(
+                *serializer.get_row_columns()
+            )
+
+            def serializer_list():
+                data = view.get_serializer(queryset.all(), many=True).data
+                return JSONRenderer().render(data)
+
+            def values_list():
+                data = serializer.to_representation_rows(rows.all())
+                return FastJSONRenderer().render(data)
+
+            if serializer_list() != values_list():
+                raise CommandError(f'The {name} lists are different')
+
+            serializer_ms = best_time(serializer_list, options['repeat'])
+            values_ms = best_time(values_list, options['repeat'])
+            self.stdout.write(
+                f'{name:<36} {serializer_ms:>14.1f} {values_ms:>10.1f} '
+                f'{serializer_ms / values_ms:>7.1f}x'
+            )
@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from core.benchmarks import best_time
+
+PASSWORD = 'correct horse battery staple'
+
+
+class Command(BaseCommand):
+    """Django command to measure the cost of the password hashers"""
+    help = 'Measure the hash time and the login throughput of the hashers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hasher',
+            nargs='+',
+            choices=sorted(settings.PASSWORD_HASHER_CLASSES),
+            default=sorted(settings.PASSWORD_HASHER_CLASSES)
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Logins verified at the same time'
+        )
+        parser.add_argument(
+            '--logins',
+            type=int,
+            default=100,
+            help='Logins verified for the throughput'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'Hashing pool: {settings.PASSWORD_HASHING_WORKERS} workers, '
+            f'{options["threads"]} concurrent logins'
+        )
+        self.stdout.write(
+            f'{"hasher":>8} {"hash ms":>8} {"verify ms":>10} {"logins/s":>9}'
+        )
+        for name in options['hasher']:
+            hasher = import_string(settings.PASSWORD_HASHER_CLASSES[name])()
+            encoded = hasher.encode(PASSWORD, hasher.salt())
+
+            hash_ms = best_time(
+                lambda: hasher.encode(PASSWORD, hasher.salt()),
+                options['repeat']
+            )
+            verify_ms = best_time(
+                lambda: hasher.verify(PASSWORD, encoded),
+                options['repeat']
+            )
+            with ThreadPoolExecutor(options['threads']) as executor:
+                start = time.perf_counter()
+                results = executor.map(
+                    lambda _: hasher.verify(PASSWORD, encoded),
+                    range(options['logins'])
+                )
+                assert all(results)
+                elapsed = time.perf_counter() - start
+
+            self.stdout.write(
+                f'{name:>8} {hash_ms:>8.1f} {verify_ms:>10.1f} '
+                f'{options["logins"] / elapsed:>9.0f}'
+            )
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.benchmarks import best_time, view_queryset
+from core.models import Tag
+from recipe import views
+
+# indexes added for the api access patterns, dropped to compare the plans
+INDEXES = (
+    'core_tag_user_name_idx',
+    'core_ingredient_user_name_idx',
+    'core_recipe_user_id_idx',
+    'core_recipe_tags_tag_recipe_idx',
+    'core_recipe_ingredients_ingredient_recipe_idx',
+)
+
+
+class Rollback(Exception):
+    """Raised to undo the changes made inside a benchmark transaction"""
+
+
+class Command(BaseCommand):
+    """Django command to compare the query plans of the api endpoints"""
+    help = 'Explain the api queries of a seeded user with and without indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'email',
+            help='User created by the seed_db command'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('User does not exist, run seed_db first')
+
+        tag_ids = list(user.tag_set.values_list('id', flat=True)[:3])
+        ingredient_ids = list(
+            user.ingredient_set.values_list('id', flat=True)[:3]
+        )
+        queries = {
+            'tags': (views.TagViewSet, {}),
+            'tags assigned only': (views.TagViewSet, {'assigned_only': 1}),
+            'ingredients': (views.IngredientViewSet, {}),
+            'recipes': (views.RecipeViewSet, {}),
+            'recipes by tags and ingredients': (views.RecipeViewSet, {
+                'tags': ','.join(str(i) for i in tag_ids),
+                'ingredients': ','.join(str(i) for i in ingredient_ids),
+            }),
+        }
+
+        self.stdout.write(self.style.MIGRATE_HEADING('With indexes'))
+        self.explain(queries, user, options['repeat'])
+        self.compare_assigned_only(user, options['repeat'])
+
+        # postgres ddl is transactional, so the indexes come back when the
+        # transaction is rolled back
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for index in INDEXES:
+                        cursor.execute(f'DROP INDEX IF EXISTS {index}')
+                self.stdout.write(
+                    self.style.MIGRATE_HEADING('Without indexes')
+                )
+                self.explain(queries, user, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def explain(self, queries, user, repeat):
+        for name, (viewset_class, params) in queries.items():
+            queryset = view_queryset(viewset_class, user, params)
+            # only the main query is timed, not the prefetches of the list
+            elapsed = best_time(
+                lambda: list(queryset.prefetch_related(None)),
+                repeat
+            )
+
+            self.stdout.write(self.style.SUCCESS(f'{name}: {elapsed:.2f}ms'))
+            self.stdout.write(queryset.explain(analyze=True))
+
+    def compare_assigned_only(self, user, repeat):
+        """Time the assigned_only filter against the old DISTINCT join"""
+        exists_time = best_time(lambda: list(view_queryset(
+            views.TagViewSet,
+            user,
+            {'assigned_only': 1}
+        )), repeat)
+        distinct_time = best_time(lambda: list(Tag.objects.filter(
+            user=user,
+            recipe__isnull=False
+        ).order_by('-name').distinct()), repeat)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'tags assigned only, EXISTS: {exists_time:.2f}ms, '
+            f'DISTINCT join: {distinct_time:.2f}ms'
+        ))
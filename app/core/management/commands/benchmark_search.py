@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from core.benchmarks import best_time, view_queryset
+from core.models import Recipe
+from recipe import views
+
+PAGE_SIZE = 50
+
+
+class Command(BaseCommand):
+    """Django command to compare the recipe search with a LIKE scan"""
+    help = 'Time the ranked recipe search of a seeded user against ILIKE'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'email',
+            help='User created by the seed_db command'
+        )
+        parser.add_argument(
+            '--q',
+            nargs='+',
+            default=['chicken', 'spicy tomato soup', 'chiken cury'],
+            help='Searched texts'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('User does not exist, run seed_db first')
+
+        recipes = Recipe.objects.filter(user=user).count()
+        self.stdout.write(f'{recipes} recipes, first page of {PAGE_SIZE}')
+        self.stdout.write(
+            f'{"search":<24} {"search ms":>10} {"ilike ms":>10} '
+            f'{"matches":>8}'
+        )
+        for text in options['q']:
+            search = view_queryset(views.RecipeViewSet, user, {'q': text})
+            # what the clients did before: any word anywhere, unranked
+            words = Q()
+            for word in text.split():
+                words |= (
+                    Q(title__icontains=word) |
+                    Q(tags__name__icontains=word) |
+                    Q(ingredients__name__icontains=word)
+                )
+            ilike = Recipe.objects.filter(words, user=user).distinct()
+
+            search_ms = best_time(
+                lambda: list(search[:PAGE_SIZE]),
+                options['repeat']
+            )
+            ilike_ms = best_time(
+                lambda: list(ilike.order_by('-id')[:PAGE_SIZE]),
+                options['repeat']
+            )
+            self.stdout.write(
+                f'{text:<24} {search_ms:>10.1f} {ilike_ms:>10.1f} '
+                f'{search.count():>8}'
+            )
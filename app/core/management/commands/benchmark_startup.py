@@ -0,0 +1,75 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+MANAGE = os.path.join(settings.BASE_DIR, 'manage.py')
+
+# the startup of docker-compose, before and after wait_for_db --migrate
+SEQUENCES = (
+    ('wait_for_db, migrate, runserver', (
+        ('wait_for_db',),
+        ('migrate', '--noinput'),
+    )),
+    ('wait_for_db --migrate, runserver', (
+        ('wait_for_db', '--migrate'),
+    )),
+)
+
+
+class Command(BaseCommand):
+    """Django command to measure the cold start of the app"""
+    help = 'Seconds from the start of the app to its first ready response'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--timeout', type=float, default=60)
+
+    def handle(self, *args, **options):
+        url = f'http://127.0.0.1:{options["port"]}/api/health/ready/'
+        for name, commands in SEQUENCES:
+            times = [
+                self.start(commands, options['port'], url, options['timeout'])
+                for _ in range(options['runs'])
+            ]
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: first request after '
+                f'{statistics.median(times):.2f} s'
+            ))
+
+    def start(self, commands, port, url, timeout):
+        """Run the commands and the server, return the seconds it took"""
+        start = time.perf_counter()
+        for command in commands:
+            subprocess.run(
+                [sys.executable, MANAGE, *command],
+                check=True,
+                stdout=subprocess.DEVNULL
+            )
+
+        server = subprocess.Popen(
+            [sys.executable, MANAGE, 'runserver', '--noreload', str(port)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        try:
+            while time.perf_counter() - start < timeout:
+                try:
+                    with urlopen(url, timeout=1) as res:
+                        if res.status == 200:
+                            return time.perf_counter() - start
+                except (URLError, ConnectionError):
+                    pass
+                time.sleep(0.01)
+        finally:
+            server.terminate()
+            server.wait()
+
+        raise CommandError(f'{url} not ready after {timeout} seconds')
@@ -0,0 +1,124 @@
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import RecipeImport
+from recipe.importer import run_import
+
+
+class Command(BaseCommand):
+    """Django command to import a file of recipes for a user"""
+    help = 'Import recipes from an NDJSON or CSV file, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='User that owns the recipes')
+        parser.add_argument(
+            'path',
+            nargs='?',
+            help='File to import, optional with --resume'
+        )
+        parser.add_argument(
+            '--format',
+            choices=[choice for choice, _label in RecipeImport.FORMAT_CHOICES],
+            help='Format of the file, by default from its extension'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Rows written in each transaction'
+        )
+        parser.add_argument(
+            '--resume',
+            type=int,
+            metavar='IMPORT_ID',
+            help='Continue an interrupted import after its last chunk'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('User does not exist')
+
+        recipe_import = self.get_import(user, options)
+        self.stdout.write(
+            f'Importing {recipe_import.file} (import {recipe_import.pk})'
+        )
+        if recipe_import.rows:
+            self.stdout.write(f'Skipping the {recipe_import.rows} rows done')
+
+        start = time.perf_counter()
+        start_rows = recipe_import.rows
+
+        def progress(recipe_import):
+            elapsed = time.perf_counter() - start
+            rate = (recipe_import.rows - start_rows) / elapsed
+            self.stdout.write(
+                f'{recipe_import.rows} rows, {recipe_import.imported} '
+                f'recipes, {recipe_import.failed} invalid, '
+                f'{rate:.0f} rows/s'
+            )
+
+        with self.open_file(recipe_import) as file:
+            run_import(recipe_import, file, progress, options['chunk_size'])
+
+        for error in recipe_import.errors[:10]:
+            self.stdout.write(
+                self.style.WARNING(f'Row {error["row"]}: {error["errors"]}')
+            )
+        if recipe_import.status == RecipeImport.STATUS_FAILED:
+            raise CommandError(
+                f'{recipe_import.error}\nFix the problem and continue with '
+                f'--resume {recipe_import.pk}'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {recipe_import.imported} recipes in '
+            f'{time.perf_counter() - start:.1f}s'
+        ))
+
+    def get_import(self, user, options):
+        """Return the import to run, a new one or the resumed one"""
+        if options['resume']:
+            try:
+                recipe_import = RecipeImport.objects.get(
+                    pk=options['resume'],
+                    user=user
+                )
+            except RecipeImport.DoesNotExist:
+                raise CommandError('Import does not exist')
+            if recipe_import.status == RecipeImport.STATUS_DONE:
+                raise CommandError('Import is already done')
+            if options['path']:
+                recipe_import.file = os.path.abspath(options['path'])
+                recipe_import.save(update_fields=['file', 'updated_at'])
+            return recipe_import
+
+        if not options['path']:
+            raise CommandError('Inform the file to import')
+
+        file_format = options['format']
+        if file_format is None:
+            extension = options['path'].rsplit('.', 1)[-1].lower()
+            file_format = (
+                RecipeImport.FORMAT_CSV if extension == 'csv'
+                else RecipeImport.FORMAT_NDJSON
+            )
+
+        return RecipeImport.objects.create(
+            user=user,
+            file=os.path.abspath(options['path']),
+            format=file_format
+        )
+
+    def open_file(self, recipe_import):
+        """Open the file given to the command or the uploaded one"""
+        # the command keeps absolute paths, the uploads are relative to the
+        # root of the storage
+        if os.path.isabs(recipe_import.file):
+            return open(recipe_import.file, 'rb')
+
+        return default_storage.open(recipe_import.file, 'rb')
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipe.tasks import claim_next_job, run_image_job
+
+
+class Command(BaseCommand):
+    """Django command to process the pending recipe image jobs"""
+    help = 'Process the recipe images queued in the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when there are no pending jobs'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1,
+            help='Seconds to wait when there are no pending jobs'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Waiting for image jobs...')
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            start = time.perf_counter()
+            run_image_job(job)
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stdout.write(f'Job {job.pk} {job.status} in {elapsed:.0f}ms')
+
+        self.stdout.write(self.style.SUCCESS('No pending image jobs'))
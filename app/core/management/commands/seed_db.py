@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import seed_database
+
+
+class Command(BaseCommand):
+    """Django command to fill the database with data for benchmarks"""
+    help = 'Create users that own large recipe libraries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=100)
+        parser.add_argument('--ingredients', type=int, default=200)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=5)
+
+    def handle(self, *args, **options):
+        users = seed_database(
+            users=options['users'],
+            recipes=options['recipes'],
+            tags=options['tags'],
+            ingredients=options['ingredients'],
+            tags_per_recipe=options['tags_per_recipe'],
+            ingredients_per_recipe=options['ingredients_per_recipe'],
+        )
+
+        for user in users:
+            self.stdout.write(user.email)
+        self.stdout.write(self.style.SUCCESS(f'Seeded {len(users)} users'))
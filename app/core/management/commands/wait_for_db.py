@@ -1,20 +1,76 @@
 import time
-from django.db import connections
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+
+from core import health
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available"""
+    help = 'Wait until SELECT 1 runs on the database, optionally migrating it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Seconds to wait before giving up'
+        )
+        parser.add_argument(
+            '--check-migrations',
+            action='store_true',
+            help='Fail when there are migrations not applied'
+        )
+        parser.add_argument(
+            '--migrate',
+            action='store_true',
+            help='Apply the migrations not applied, in this same process'
+        )
 
     def handle(self, *args, **options):
         self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
-            try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
-
-        self.stdout.write(self.style.SUCCESS('Database available!'))
+        start = time.monotonic()
+
+        def on_retry(exc, wait):
+            self.stdout.write(
+                f'Database unavailable, waiting {wait:.1f} seconds...'
+            )
+
+        try:
+            latency = health.wait_for_database(
+                options['database'],
+                options['timeout'],
+                on_retry=on_retry
+            )
+        except OperationalError as exc:
+            raise CommandError(
+                f'Database unavailable after {options["timeout"]} '
+                f'seconds: {exc}'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Database available! ({time.monotonic() - start:.2f} s, '
+            f'SELECT 1 in {latency * 1000:.1f} ms)'
+        ))
+
+        if not options['check_migrations'] and not options['migrate']:
+            return
+
+        pending = health.pending_migrations(options['database'])
+        if not pending:
+            self.stdout.write('No migrations to apply.')
+        elif options['migrate']:
+            # a separate migrate command would set up django once more
+            call_command(
+                'migrate',
+                database=options['database'],
+                interactive=False,
+                stdout=self.stdout
+            )
+        else:
+            raise CommandError(
+                f'Migrations not applied: {", ".join(pending)}'
+            )
@@ -0,0 +1,23 @@
+from core.db import routers
+
+
+class ReplicaPinMiddleware:
+    """Pin the users that write to the primary and reset the routing"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset()
+        try:
+            response = self.get_response(request)
+
+            # rest framework sets the user it authenticated on the request
+            user = getattr(request, 'user', None)
+            if routers.wrote() and user is not None:
+                routers.pin_to_primary(user)
+        finally:
+            # the thread may run other code before the next request
+            routers.reset()
+
+        return response
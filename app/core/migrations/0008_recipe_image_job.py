@@ -0,0 +1,40 @@
+# Generated by Django 2.1.15 on 2026-10-18 18:32
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeImageJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_renditions',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='recipeimagejob',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_jobs', to='core.Recipe'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeimagejob',
+            index=models.Index(fields=['status', 'id'], name='core_recipeimagejob_status_idx'),
+        ),
+    ]
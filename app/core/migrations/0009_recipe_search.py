@@ -0,0 +1,61 @@
+# Generated by Django 2.1.15 on 2026-10-18 18:44
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# same vector as recipe.search.update_search_vector, for the recipes that
+# already exist. the configuration is a parameter of the query
+POPULATE_SEARCH_VECTOR = '''
+UPDATE core_recipe SET search_vector =
+    setweight(to_tsvector(%(config)s::regconfig, title), 'A') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(core_tag.name, ' ')
+        FROM core_tag
+        JOIN core_recipe_tags ON core_recipe_tags.tag_id = core_tag.id
+        WHERE core_recipe_tags.recipe_id = core_recipe.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(core_ingredient.name, ' ')
+        FROM core_ingredient
+        JOIN core_recipe_ingredients
+            ON core_recipe_ingredients.ingredient_id = core_ingredient.id
+        WHERE core_recipe_ingredients.recipe_id = core_recipe.id
+    ), '')), 'C');
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_image_job'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+        ),
+        # django 2.1 indexes have no operator classes. the trigram index
+        # answers the similarity (%) searches of the misspelled titles
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_title_trgm_idx '
+            'ON core_recipe USING gin (title gin_trgm_ops);',
+            'DROP INDEX core_recipe_title_trgm_idx;',
+        ),
+        migrations.RunSQL(
+            [(
+                POPULATE_SEARCH_VECTOR,
+                {'config': settings.RECIPE_SEARCH_CONFIG}
+            )],
+            migrations.RunSQL.noop
+        ),
+    ]
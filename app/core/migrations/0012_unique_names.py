@@ -0,0 +1,74 @@
+from django.db import migrations
+
+# the tags and ingredients of a user with the same name, regardless of case,
+# are merged into the oldest one before the unique index is created: the
+# recipes of the others move to it and the others are deleted
+MERGE_DUPLICATES = '''
+-- the foreign keys are checked now instead of at commit, postgres doesn't
+-- create indexes on tables with pending checks
+SET CONSTRAINTS ALL IMMEDIATE;
+
+CREATE TEMPORARY TABLE {table}_duplicates ON COMMIT DROP AS
+SELECT id, keep_id FROM (
+    SELECT id, min(id) OVER (PARTITION BY user_id, lower(name)) AS keep_id
+    FROM {table}
+) AS names
+WHERE id <> keep_id;
+
+INSERT INTO {through} (recipe_id, {column})
+SELECT DISTINCT relations.recipe_id, duplicates.keep_id
+FROM {through} AS relations
+JOIN {table}_duplicates AS duplicates ON duplicates.id = relations.{column}
+ON CONFLICT DO NOTHING;
+
+-- the ids in the recipes changed, the conditional requests must see it
+UPDATE core_recipe SET updated_at = now()
+WHERE id IN (
+    SELECT recipe_id FROM {through}
+    WHERE {column} IN (SELECT id FROM {table}_duplicates)
+);
+
+DELETE FROM {through}
+WHERE {column} IN (SELECT id FROM {table}_duplicates);
+
+DELETE FROM {table}
+WHERE id IN (SELECT id FROM {table}_duplicates);
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_import'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            MERGE_DUPLICATES.format(
+                table='core_tag',
+                through='core_recipe_tags',
+                column='tag_id'
+            ),
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            MERGE_DUPLICATES.format(
+                table='core_ingredient',
+                through='core_recipe_ingredients',
+                column='ingredient_id'
+            ),
+            migrations.RunSQL.noop,
+        ),
+        # django 2.1 indexes have no expressions. the names are unique per
+        # user regardless of case, see core.models.NamedObjectManager
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX core_tag_user_lower_name_uniq '
+            'ON core_tag (user_id, lower(name));',
+            'DROP INDEX core_tag_user_lower_name_uniq;',
+        ),
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX core_ingredient_user_lower_name_uniq '
+            'ON core_ingredient (user_id, lower(name));',
+            'DROP INDEX core_ingredient_user_lower_name_uniq;',
+        ),
+    ]
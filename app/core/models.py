@@ -1,7 +1,11 @@
 import uuid
 import os
 
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models.functions import Lower
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 from django.conf import settings
@@ -65,6 +69,56 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class NamedObjectManager(models.Manager):
+    """Manager of the objects a user refers to by name.
+
+    The names are unique per user regardless of case, the migrations add a
+    unique index on (user, lower(name)) (django 2.1 indexes can't have
+    expressions).
+    """
+
+    def filter_names(self, user, names):
+        """Return the objects of the user with any of the names"""
+        return self.filter(user=user).annotate(
+            lower_name=Lower('name')
+        ).filter(lower_name__in={name.lower() for name in names})
+
+    def get_or_create_names(self, user, names, retry=True):
+        """Return the objects of the user with the names, by lowercase name.
+
+        The existing objects are read with one query and the missing ones
+        created with one bulk_create. When a concurrent request creates one
+        of the names first the unique index rejects the insert, and the
+        objects are read again.
+        """
+        # the first spelling of a name is the one created
+        spellings = {}
+        for name in names:
+            spellings.setdefault(name.lower(), name)
+        names = spellings
+        objs = {
+            obj.name.lower(): obj
+            for obj in self.filter_names(user, names.values())
+        }
+        missing = [name for key, name in names.items() if key not in objs]
+        if not missing:
+            return objs
+
+        try:
+            # the savepoint keeps the transaction of the request usable
+            with transaction.atomic():
+                created = self.bulk_create(
+                    [self.model(user=user, name=name) for name in missing]
+                )
+        except IntegrityError:
+            if not retry:
+                raise
+            return self.get_or_create_names(user, names.values(), False)
+
+        objs.update((obj.name.lower(), obj) for obj in created)
+        return objs
+
+
 class Tag(models.Model):
     """Tag to be used for a recipe"""
     name = models.CharField(max_length=255)
@@ -72,6 +126,20 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # used to answer conditional requests without serializing the objects
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = NamedObjectManager()
+
+    class Meta:
+        # the api lists the tags of a user ordered by name (and id, when
+        # paginated), so the index already returns the rows sorted
+        indexes = [
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_tag_user_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -84,6 +152,18 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # used to answer conditional requests without serializing the objects
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = NamedObjectManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_ingredient_user_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -107,6 +187,132 @@ class Recipe(models.Model):
     # So can we call it every time we upload and it gets called in the
     # background by Django by the image field feature.
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # smaller copies of the image created after the upload, by size and
+    # format: {'128': {'jpeg': 'uploads/recipe/<uuid>_128.jpg'}, ...}
+    image_renditions = JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # words of the title, the tags and the ingredients, kept up to date by
+    # recipe.search.update_search_vector
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        # the recipes of a user are listed newest first
+        indexes = [
+            models.Index(
+                fields=['user', 'id'],
+                name='core_recipe_user_id_idx'
+            ),
+            # the time and cost filters and orderings, with the id as the
+            # tiebreaker of the pagination
+            models.Index(
+                fields=['user', 'time_minutes', 'id'],
+                name='core_recipe_user_time_idx'
+            ),
+            models.Index(
+                fields=['user', 'cost', 'id'],
+                name='core_recipe_user_cost_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeImageJob(models.Model):
+    """Processing of an image uploaded to a recipe"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='image_jobs',
+    )
+    # name of the uploaded file, a newer upload makes the job obsolete
+    image = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+    )
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # the workers look for the oldest pending jobs
+        indexes = [
+            models.Index(
+                fields=['status', 'id'],
+                name='core_recipeimagejob_status_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.status}'
+
+
+def recipe_import_file_path(filename):
+    """Generate file path for new recipe import file"""
+    extension = filename.split('.')[-1]
+    filename = f'{uuid.uuid4()}.{extension}'
+
+    return os.path.join('uploads/imports/', filename)
+
+
+class RecipeImport(models.Model):
+    """Import of a file of recipes, committed in chunks"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    FORMAT_NDJSON = 'ndjson'
+    FORMAT_CSV = 'csv'
+    FORMAT_CHOICES = (
+        (FORMAT_NDJSON, 'NDJSON'),
+        (FORMAT_CSV, 'CSV'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='recipe_imports',
+    )
+    # uploaded file, or the path given to the import_recipes command
+    file = models.CharField(max_length=255)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+    )
+    # rows of the file already committed, a resumed import skips them
+    rows = models.PositiveIntegerField(default=0)
+    imported = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    # the first invalid rows: [{'row': 12, 'errors': {...}}, ...]
+    errors = JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.file}: {self.status}'
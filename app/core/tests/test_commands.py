@@ -1,22 +1,23 @@
+from io import StringIO
 from unittest.mock import patch
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import Recipe, Tag
+
 
 class CommandTests(TestCase):
     def test_wait_for_db_ready(self):
-        """Test waiting for db when db is available. It'll try and retrieve the
-         database connection from Django."""
-        # patch - used to mock the ConnectionHandler
-        # try to get the default database via the ConnectionHandler
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.retun_value = True
-            # wait_for_db is the name of our management command
-            call_command('wait_for_db')
+        """Test waiting for db when db is available. It runs SELECT 1 on the
+         test database and checks its migrations without applying them."""
+        out = StringIO()
+        call_command('wait_for_db', check_migrations=True, stdout=out)
 
-            self.assertEqual(gi.call_count, 1)
+        self.assertIn('Database available!', out.getvalue())
+        self.assertIn('No migrations to apply.', out.getvalue())
 
     # patch decorator: instead of mocking what we're mocking here we're going
     # to mock the time.sleep
@@ -24,18 +25,58 @@ class CommandTests(TestCase):
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
-        # if gets OperationalError, waits a second to try to reconnect
-        # we need to add the extra argument for 'ts' even though we're not
-        # using it because when you run the test it will error, an unexpected
-        # argument
+        # if gets OperationalError, waits to try to reconnect
         # What this mock does here is it replaces the behavior of time.sleep
         # with a mock function that returns true. So during our test it won't
         # actually wait the seconds. It is just to speed up
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
+        with patch('core.health.ping') as ping:
             # side effect - it raises the operational error 5 times and then on
-            # the sixth time it won't raise the error it will just return.
-            gi.side_effect = [OperationalError] * 5 + [True]
-            # wait_for_db is the name of our management command
-            call_command('wait_for_db')
+            # the sixth time it returns the seconds of the SELECT 1
+            ping.side_effect = [OperationalError] * 5 + [0.001]
+            call_command('wait_for_db', stdout=StringIO())
+
+            self.assertEqual(ping.call_count, 6)
+        # the waits double each time
+        self.assertEqual(
+            [call[0][0] for call in ts.call_args_list],
+            [0.1, 0.2, 0.4, 0.8, 1.6]
+        )
+
+    @patch('core.health.ping', side_effect=OperationalError('down'))
+    def test_wait_for_db_timeout(self, ping):
+        """Test that the command fails when the db doesn't answer in time"""
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+    @patch('core.health.pending_migrations', return_value=['core.0099_new'])
+    def test_wait_for_db_pending_migrations(self, pending):
+        """Test that the migrations are checked or applied when asked"""
+        with self.assertRaisesMessage(CommandError, 'core.0099_new'):
+            call_command(
+                'wait_for_db',
+                check_migrations=True,
+                stdout=StringIO()
+            )
+
+        with patch(
+            'core.management.commands.wait_for_db.call_command'
+        ) as migrate:
+            call_command('wait_for_db', migrate=True, stdout=StringIO())
+
+        self.assertEqual(migrate.call_args[0], ('migrate',))
+
+    def test_seed_db(self):
+        """Test seeding the database for benchmarks"""
+        call_command(
+            'seed_db',
+            users=2,
+            recipes=5,
+            tags=3,
+            ingredients=4,
+            stdout=StringIO()
+        )
 
-            self.assertEqual(gi.call_count, 6)
+        self.assertEqual(Recipe.objects.count(), 10)
+        self.assertEqual(Tag.objects.count(), 6)
+        self.assertEqual(Recipe.tags.through.objects.count(), 20)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 40)
@@ -0,0 +1,134 @@
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import TestCase
+
+from core.db.backends.postgresql.base import DatabaseWrapper
+from core.db.backends.postgresql.pool import ConnectionPool, close_pools
+
+
+def new_wrapper(**settings):
+    """Return a new connection of the test database with other settings"""
+    return DatabaseWrapper(
+        dict(connection.settings_dict, **settings),
+        alias=connection.alias
+    )
+
+
+def backend_pid(wrapper):
+    """Return the id of the server process of the connection"""
+    with wrapper.cursor() as cursor:
+        cursor.execute('SELECT pg_backend_pid()')
+        return cursor.fetchone()[0]
+
+
+def terminate(pid):
+    """Close a connection from the server side, like a restart would"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+
+
+class HealthCheckTests(TestCase):
+    """Test the health checks of the persistent connections"""
+
+    def tearDown(self):
+        self.wrapper.close()
+
+    def test_lost_connection_replaced(self):
+        """Test that a connection closed by the server is replaced"""
+        self.wrapper = new_wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+        pid = backend_pid(self.wrapper)
+        terminate(pid)
+
+        # the next request
+        self.wrapper.close_if_unusable_or_obsolete()
+
+        self.assertNotEqual(backend_pid(self.wrapper), pid)
+
+    def test_lost_connection_without_health_checks(self):
+        """Test that without the health checks the next query fails"""
+        self.wrapper = new_wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=False)
+        terminate(backend_pid(self.wrapper))
+
+        self.wrapper.close_if_unusable_or_obsolete()
+
+        with self.assertRaises(OperationalError):
+            backend_pid(self.wrapper)
+
+    def test_checked_once_per_request(self):
+        """Test that only the first query of a request is checked"""
+        self.wrapper = new_wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+        backend_pid(self.wrapper)
+        self.wrapper.close_if_unusable_or_obsolete()
+
+        backend_pid(self.wrapper)
+        self.assertTrue(self.wrapper.health_check_done)
+
+
+class ConnectionPoolTests(TestCase):
+    """Test the pool of connections of the backend"""
+
+    def tearDown(self):
+        close_pools()
+
+    def test_connection_reused(self):
+        """Test that a closed connection is reused by the next one"""
+        first = new_wrapper(POOL_SIZE=2)
+        pid = backend_pid(first)
+        first.close()
+
+        second = new_wrapper(POOL_SIZE=2)
+        self.assertEqual(backend_pid(second), pid)
+        second.close()
+
+    def test_pool_size(self):
+        """Test that a full pool doesn't open more connections"""
+        first = new_wrapper(POOL_SIZE=1, POOL_TIMEOUT=0)
+        backend_pid(first)
+
+        second = new_wrapper(POOL_SIZE=1, POOL_TIMEOUT=0)
+        with self.assertRaises(OperationalError):
+            backend_pid(second)
+
+        first.close()
+        backend_pid(second)
+        second.close()
+
+    def test_transaction_rolled_back(self):
+        """Test that a returned connection has no open transaction"""
+        pool = ConnectionPool(
+            new_wrapper().get_connection_params(),
+            size=1,
+            timeout=0
+        )
+        conn = pool.getconn()
+        with conn.cursor() as cursor:
+            cursor.execute('CREATE TEMPORARY TABLE pooled (id int)')
+        pool.putconn(conn)
+
+        conn = pool.getconn()
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT to_regclass('pg_temp.pooled') IS NULL"
+            )
+            self.assertTrue(cursor.fetchone()[0])
+        pool.putconn(conn)
+        pool.close()
+
+    def test_lost_connection_replaced(self):
+        """Test that the pool replaces the connections the server closed"""
+        pool = ConnectionPool(
+            new_wrapper().get_connection_params(),
+            size=1,
+            timeout=0,
+            health_checks=True
+        )
+        conn = pool.getconn()
+        pid = conn.get_backend_pid()
+        pool.putconn(conn)
+        terminate(pid)
+
+        conn = pool.getconn()
+
+        self.assertNotEqual(conn.get_backend_pid(), pid)
+        pool.putconn(conn)
+        pool.close()
@@ -0,0 +1,117 @@
+from django.contrib.auth import authenticate, get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashers
+
+TOKEN_URL = reverse('user:token')
+
+PBKDF2_FIRST = [
+    'core.hashers.PBKDF2PasswordHasher',
+    'core.hashers.Argon2PasswordHasher',
+]
+ARGON2_FIRST = list(reversed(PBKDF2_FIRST))
+
+
+class HasherPolicyTests(TestCase):
+    """Test the configurable password hashers"""
+
+    def test_new_password_uses_policy(self):
+        """Test that new passwords are hashed with the chosen hasher"""
+        with self.settings(PASSWORD_HASHERS=ARGON2_FIRST):
+            user = get_user_model().objects.create_user('test@test.com', '1')
+
+        self.assertTrue(user.password.startswith('argon2$'))
+
+    def test_rehash_on_login_after_hasher_change(self):
+        """Test that a login rehashes the password with the new hasher"""
+        with self.settings(PASSWORD_HASHERS=PBKDF2_FIRST):
+            get_user_model().objects.create_user('test@test.com', '123')
+
+        with self.settings(PASSWORD_HASHERS=ARGON2_FIRST):
+            user = authenticate(username='test@test.com', password='123')
+
+        self.assertIsNotNone(user)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+
+    @override_settings(PASSWORD_HASHERS=PBKDF2_FIRST)
+    def test_rehash_on_login_after_work_factor_change(self):
+        """Test that a login rehashes the password with the new cost"""
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=1000):
+            get_user_model().objects.create_user('test@test.com', '123')
+
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            user = authenticate(username='test@test.com', password='123')
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+
+
+class HashingPoolTests(TestCase):
+    """Test hashing the passwords in a bounded pool"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+
+    @override_settings(PASSWORD_HASHING_WORKERS=2)
+    def test_login_in_pool(self):
+        """Test that the hashing runs in the pool threads"""
+        get_user_model().objects.create_user('test@test.com', '123')
+
+        res = APIClient().post(
+            TOKEN_URL,
+            {'email': 'test@test.com', 'password': '123'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(
+        PASSWORD_HASHING_WORKERS=1,
+        PASSWORD_HASHING_QUEUE=0,
+        PASSWORD_HASHING_TIMEOUT=0
+    )
+    def test_busy_pool_rejects_login(self):
+        """Test that logins are rejected when the pool is full"""
+        get_user_model().objects.create_user('test@test.com', '123')
+        _, slots = hashers._get_pool(1)
+        slots.acquire()
+        try:
+            res = APIClient().post(
+                TOKEN_URL,
+                {'email': 'test@test.com', 'password': '123'}
+            )
+        finally:
+            slots.release()
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    @override_settings(
+        PASSWORD_HASHING_WORKERS=1,
+        PASSWORD_HASHING_QUEUE=0,
+        PASSWORD_HASHING_TIMEOUT=0
+    )
+    def test_busy_pool_fails_admin_login(self):
+        """Test that a full pool fails the logins outside of the api"""
+        get_user_model().objects.create_superuser('admin@test.com', '123')
+        _, slots = hashers._get_pool(1)
+        slots.acquire()
+        try:
+            user = authenticate(username='admin@test.com', password='123')
+            res = self.client.post(
+                reverse('admin:login'),
+                {'username': 'admin@test.com', 'password': '123'}
+            )
+        finally:
+            slots.release()
+
+        self.assertIsNone(user)
+        self.assertTrue(hashers.hashing_was_busy())
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,87 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import health
+
+HEALTH_URL = reverse('health:live')
+READY_URL = reverse('health:ready')
+
+
+class HealthApiTests(TestCase):
+    """Test the liveness and readiness probes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        health._migrated.clear()
+
+    def test_live(self):
+        """Test that the liveness probe answers without authentication"""
+        res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'status': 'ok'})
+
+    def test_ready(self):
+        """Test that the readiness probe reports the database latency"""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['databases']['default']['status'], 'ok')
+        self.assertIn('latency_ms', res.data['databases']['default'])
+        self.assertEqual(res.data['pending_migrations'], [])
+
+    def test_migrations_checked_once(self):
+        """Test that the applied migrations aren't loaded again"""
+        self.client.get(READY_URL)
+
+        with patch('core.health.MigrationExecutor') as executor:
+            res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        executor.assert_not_called()
+
+    @patch('core.health.ping', side_effect=OperationalError('down'))
+    def test_database_unavailable(self, ping):
+        """Test that the app isn't ready without its database"""
+        with self.assertLogs('core.views', 'ERROR'):
+            res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(
+            res.data['databases']['default'],
+            {'status': 'unavailable'}
+        )
+
+    @override_settings(DATABASE_REPLICAS=['replica_0'])
+    def test_replica_unavailable(self):
+        """Test that the app is ready, but degraded, without a replica"""
+        def ping(alias):
+            if alias == 'replica_0':
+                raise OperationalError('down')
+            return 0.001
+
+        with patch('core.health.ping', side_effect=ping):
+            with self.assertLogs('core.views', 'ERROR'):
+                res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], 'degraded')
+        self.assertEqual(res.data['databases']['default']['status'], 'ok')
+        self.assertEqual(
+            res.data['databases']['replica_0'],
+            {'status': 'degraded'}
+        )
+
+    @patch('core.health.pending_migrations', return_value=['core.0099_new'])
+    def test_pending_migrations(self, pending):
+        """Test that the app isn't ready before its migrations"""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.data['pending_migrations'], ['core.0099_new'])
@@ -1,5 +1,6 @@
 from unittest.mock import patch
 
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -59,6 +60,60 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_names_unique_per_user(self):
+        """Test that a user can't have two tags with the same name"""
+        user = sample_user()
+        models.Tag.objects.create(user=user, name='Vegan')
+        models.Tag.objects.create(
+            user=sample_user('other@test.com'),
+            name='vegan'
+        )
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.Tag.objects.create(user=user, name='VEGAN')
+
+    def test_get_or_create_names(self):
+        """Test getting the objects of names, creating the missing ones"""
+        user = sample_user()
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+
+        objs = models.Tag.objects.get_or_create_names(
+            user,
+            ['vegan', 'Quick', 'QUICK']
+        )
+
+        self.assertEqual(sorted(objs), ['quick', 'vegan'])
+        self.assertEqual(objs['vegan'], tag)
+        self.assertEqual(objs['quick'].name, 'Quick')
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 2)
+
+    def test_get_or_create_names_concurrent(self):
+        """Test that names created meanwhile are read again"""
+        user = sample_user()
+        filter_names = models.Tag.objects.filter_names
+        calls = []
+
+        def created_meanwhile(user, names):
+            # another request creates the tag after the first read
+            calls.append(names)
+            if len(calls) == 1:
+                queryset = filter_names(user, names)
+                list(queryset)
+                models.Tag.objects.create(user=user, name='vegan')
+                return queryset
+            return filter_names(user, names)
+
+        with patch.object(
+            models.Tag.objects,
+            'filter_names',
+            created_meanwhile
+        ):
+            objs = models.Tag.objects.get_or_create_names(user, ['Vegan'])
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(objs['vegan'].name, 'vegan')
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 1)
+
     def test_ingredient_str(self):
         """Test the ingredient string representation"""
         ingredient = models.Ingredient.objects.create(
@@ -0,0 +1,162 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.db import routers
+from core.models import Tag
+
+from recipe.cache import invalidate_user_cache
+
+TAGS_URL = reverse('recipe:tag-list')
+CREATE_USER_URL = reverse('user:create')
+REPLICA = 'replica_test'
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class ReplicaRouterTests(TestCase):
+    """Test the routing of the queries to the replicas"""
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        caches[settings.DB_REPLICA_PIN_CACHE].clear()
+        routers.reset()
+
+    def tearDown(self):
+        routers.reset()
+
+    def test_reads_on_primary_by_default(self):
+        """Test that the reads outside of the safe requests use the primary"""
+        self.assertEqual(self.router.db_for_read(Tag), 'default')
+
+    def test_reads_on_replica(self):
+        """Test that the reads of a safe request use a replica"""
+        routers.read_from_replica(self.user)
+
+        self.assertEqual(self.router.db_for_read(Tag), 'replica_0')
+
+    def test_reads_after_write_on_primary(self):
+        """Test that the reads that follow a write use the primary"""
+        routers.read_from_replica(self.user)
+
+        self.assertEqual(self.router.db_for_write(Tag), 'default')
+        self.assertEqual(self.router.db_for_read(Tag), 'default')
+
+    def test_pinned_user_reads_on_primary(self):
+        """Test that a user that wrote a moment ago reads from the primary"""
+        routers.pin_to_primary(self.user)
+
+        routers.read_from_replica(self.user)
+
+        self.assertEqual(self.router.db_for_read(Tag), 'default')
+
+    def test_pin_expires(self):
+        """Test that the pin lasts DB_REPLICA_PIN_SECONDS"""
+        with override_settings(DB_REPLICA_PIN_SECONDS=0):
+            routers.pin_to_primary(self.user)
+
+        self.assertFalse(routers.is_pinned(self.user))
+
+    def test_invalidation_pins_user(self):
+        """Test that the writes of the background jobs pin the user too"""
+        invalidate_user_cache(self.user.pk)
+
+        routers.read_from_replica(self.user)
+
+        self.assertTrue(routers.is_pinned(self.user))
+        self.assertEqual(self.router.db_for_read(Tag), 'default')
+
+    def test_replicas_not_migrated(self):
+        """Test that the migrations only run on the primary"""
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica_0', 'core'))
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingApiTests(TestCase):
+    """Test the endpoints that read from the replicas"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # a second connection to the test database stands for the replica.
+        # it doesn't see the rows of the transaction of each test, like a
+        # replica that lags behind
+        connections.databases[REPLICA] = dict(connection.settings_dict)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        self.client.force_authenticate(self.user)
+        caches['default'].clear()
+        caches['throttle'].clear()
+        caches[settings.DB_REPLICA_PIN_CACHE].clear()
+
+    def test_list_from_replica(self):
+        """Test that the safe requests read from a replica"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        # as if the pin of the write had expired
+        caches[settings.DB_REPLICA_PIN_CACHE].clear()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_reads_own_writes(self):
+        """Test that the user reads from the primary after a write"""
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual([tag['name'] for tag in res.data], ['Vegan'])
+
+    def test_pin_kept_apart_from_responses(self):
+        """Test that clearing the response cache keeps the pins"""
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        caches['default'].clear()
+
+        self.assertTrue(routers.is_pinned(self.user))
+
+    def test_token_authentication_on_primary(self):
+        """Test that a token that isn't on the replicas yet is accepted"""
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_new_user_pinned(self):
+        """Test that a new user reads from the primary for a while"""
+        res = APIClient().post(
+            CREATE_USER_URL,
+            {'email': 'new@test.com', 'password': '123', 'name': 'New'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        user = get_user_model().objects.get(email='new@test.com')
+        self.assertTrue(routers.is_pinned(user))
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from core import views
+
+
+app_name = 'health'
+
+urlpatterns = [
+    path('', views.HealthView.as_view(), name='live'),
+    path('ready/', views.ReadinessView.as_view(), name='ready'),
+]
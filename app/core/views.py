@@ -0,0 +1,69 @@
+import logging
+
+from django.conf import settings
+from django.db.utils import DatabaseError
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import health
+
+logger = logging.getLogger(__name__)
+
+
+class HealthView(APIView):
+    """Answer while the process is up, without touching the database"""
+    # the probes aren't authenticated
+    authentication_classes = ()
+    permission_classes = ()
+
+    def get(self, request, *args, **kwargs):
+        return Response({'status': 'ok'})
+
+
+class ReadinessView(APIView):
+    """Answer 200 when the primary database can serve the requests, else 503"""
+    authentication_classes = ()
+    permission_classes = ()
+
+    def get(self, request, *args, **kwargs):
+        databases = {'default': self.check('default', 'unavailable')}
+        # a replica down doesn't take the app out of the load balancer, the
+        # readiness is only reported as degraded
+        for alias in settings.DATABASE_REPLICAS:
+            databases[alias] = self.check(alias, 'degraded')
+
+        # the replicas receive the migrations from the primary
+        ready = databases['default']['status'] == 'ok'
+        pending = []
+        if ready:
+            pending = health.pending_migrations()
+            ready = not pending
+
+        if not ready:
+            overall = 'unavailable'
+        elif any(db['status'] != 'ok' for db in databases.values()):
+            overall = 'degraded'
+        else:
+            overall = 'ok'
+
+        return Response(
+            {
+                'status': overall,
+                'databases': databases,
+                'pending_migrations': pending,
+            },
+            status=status.HTTP_200_OK if ready
+            else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    def check(self, alias, failed_status):
+        """Return the status of a database and its latency"""
+        try:
+            latency = health.ping(alias)
+        except DatabaseError:
+            logger.exception('Database %s unavailable', alias)
+            return {'status': failed_status}
+
+        return {'status': 'ok', 'latency_ms': round(latency * 1000, 2)}
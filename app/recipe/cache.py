@@ -0,0 +1,107 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework.response import Response
+
+from core.db.routers import pin_user_to_primary
+
+# query parameters holding comma separated ids, where the order and the
+# spaces don't change the response
+ID_LIST_PARAMS = ('tags', 'ingredients')
+# query parameters read as booleans by the views
+BOOLEAN_PARAMS = ('assigned_only',)
+
+
+def _version_key(user_id):
+    return f'recipe:version:{user_id}'
+
+
+def get_user_version(user_id):
+    """Return the current version of the cached responses of a user"""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # the version starts from the clock instead of 1, so a version that
+        # was evicted from the cache never matches the old entries again
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+
+    return version
+
+
+def invalidate_user_cache(user_id):
+    """Make all the cached responses of a user stale"""
+    # the next read must not come from a replica that lags behind the
+    # write, or it would cache the old rows under the new version. the
+    # background jobs write outside of the requests that pin the user
+    pin_user_to_primary(user_id)
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # no version yet means there is nothing cached for the user
+        pass
+
+
+def normalize_params(query_params):
+    """Return the query parameters as a string that ignores their order"""
+    params = []
+    for name, values in sorted(query_params.lists()):
+        normalized = []
+        for value in values:
+            try:
+                if name in ID_LIST_PARAMS:
+                    ids = sorted({int(item) for item in value.split(',')})
+                    value = ','.join(str(item) for item in ids)
+                elif name in BOOLEAN_PARAMS:
+                    value = str(int(bool(int(value))))
+            except ValueError:
+                # invalid values are kept as they are, the view rejects them
+                pass
+            normalized.append(value)
+        params.append(f'{name}={",".join(normalized)}')
+
+    return '&'.join(params)
+
+
+def response_cache_key(request, model_name, action, pk=None):
+    """Return the cache key of a response for the request user"""
+    user_id = request.user.pk
+    params = f'{request.get_host()}?{normalize_params(request.query_params)}'
+    digest = hashlib.md5(params.encode()).hexdigest()
+
+    return (
+        f'recipe:{model_name}:{action}:{user_id}:'
+        f'{get_user_version(user_id)}:{pk}:{digest}'
+    )
+
+
+def cached_response(handler):
+    """Cache the responses of a list or retrieve viewset action.
+
+    The keys hold a version per user that the signal receivers increment
+    whenever one of the objects of the user changes, so every cached response
+    of that user becomes stale at once.
+    """
+    @wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = response_cache_key(
+            request,
+            view.queryset.model._meta.model_name,
+            view.action,
+            kwargs.get(view.lookup_url_kwarg or view.lookup_field)
+        )
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(view, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RECIPE_CACHE_TIMEOUT)
+
+        return response
+
+    return wrapper
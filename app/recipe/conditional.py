@@ -0,0 +1,112 @@
+import hashlib
+from calendar import timegm
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from recipe.cache import normalize_params
+
+
+def get_validators(view, queryset, related_fields=()):
+    """Return the ETag and last modification time of a view response"""
+    aggregates = {
+        'count': Count('pk'),
+        'updated_at': Max('updated_at'),
+    }
+    if view.action != 'retrieve' and hasattr(view, 'get_fieldset'):
+        # the lists render the relations of ?expand= as objects, so their
+        # renames change the response too
+        related_fields = sorted(view.get_fieldset()[1])
+    if related_fields:
+        # the joins return one row per relation
+        aggregates['count'] = Count('pk', distinct=True)
+        for field in related_fields:
+            aggregates[field] = Max(f'{field}__updated_at')
+
+    values = queryset.order_by().aggregate(**aggregates)
+    if view.action == 'retrieve' and not values['count']:
+        # the handler answers with not found
+        return None, None
+
+    timestamps = [
+        value for name, value in values.items()
+        if name != 'count' and value is not None
+    ]
+    last_modified = max(timestamps) if timestamps else None
+
+    validator = ':'.join([
+        queryset.model._meta.label,
+        view.action,
+        str(view.request.user.pk),
+        normalize_params(view.request.query_params),
+        str(values['count']),
+        last_modified.isoformat() if last_modified else '',
+    ])
+    etag = '"%s"' % hashlib.md5(validator.encode()).hexdigest()
+
+    return etag, last_modified
+
+
+def conditional_response(related_fields=()):
+    """Answer a list or retrieve viewset action with 304 when unchanged.
+
+    The validators come from one aggregate query over the objects of the
+    response (the newest `updated_at` and the number of rows), so an unchanged
+    poll never loads or serializes the objects. `related_fields` are the
+    relations rendered by the response, their changes change it too. Only
+    the detail sends Last-Modified, the lists are validated by the ETag.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            queryset = view.filter_queryset(view.get_queryset())
+            if view.action == 'retrieve':
+                lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+                queryset = queryset.filter(
+                    **{view.lookup_field: kwargs[lookup_url_kwarg]}
+                )
+
+            try:
+                etag, last_modified = get_validators(
+                    view,
+                    queryset,
+                    related_fields
+                )
+            except (TypeError, ValueError, ValidationError):
+                # invalid lookups are reported by the handler itself
+                etag = None
+
+            if etag is None:
+                return handler(view, request, *args, **kwargs)
+
+            # a delete doesn't change the newest updated_at of a list, so
+            # its If-Modified-Since would get a stale 304. the lists are
+            # only validated by the ETag, which counts the rows too
+            timestamp = None
+            if view.action == 'retrieve' and last_modified is not None:
+                timestamp = timegm(last_modified.utctimetuple())
+
+            response = get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=timestamp
+            )
+            if response is None:
+                response = handler(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            # clients may keep the response, but have to revalidate it first
+            patch_cache_control(response, private=True, no_cache=True)
+
+            return response
+
+        return wrapper
+
+    return decorator
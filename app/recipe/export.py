@@ -0,0 +1,78 @@
+from collections import OrderedDict
+
+from rest_framework.renderers import BaseRenderer
+
+from recipe.renderers import FastJSONRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline delimited JSON, one object per line.
+
+    Only selects the export format in the content negotiation, the export
+    writes the lines itself as it reads the rows.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # the errors of the export endpoint, like 401, are a single line
+        if data is None:
+            return b''
+
+        return FastJSONRenderer().render(data) + b'\n'
+
+
+def iter_chunks(serializer, queryset, chunk_size):
+    """Yield the representation of the objects, one chunk at a time.
+
+    The rows are read through a server side cursor, chunk_size rows at a
+    time, and the relations of each chunk are read with one query each (the
+    prefetch of a chunk), so only one chunk is in memory at any time.
+    """
+    rows = queryset.values(*serializer.get_row_columns()).iterator(
+        chunk_size=chunk_size
+    )
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield serializer.to_representation_rows(chunk)
+            chunk = []
+    if chunk:
+        yield serializer.to_representation_rows(chunk)
+
+
+def ndjson_stream(sections, chunk_size):
+    """Yield the objects of the sections as NDJSON lines.
+
+    Each line has the type of the object followed by its fields:
+    {"type":"tag","id":1,"name":"Vegan"}
+    """
+    render = FastJSONRenderer().render
+    for object_type, serializer, queryset in sections:
+        for chunk in iter_chunks(serializer, queryset, chunk_size):
+            yield b''.join(
+                render(OrderedDict(
+                    [('type', object_type)] + list(data.items())
+                )) + b'\n'
+                for data in chunk
+            )
+
+
+def json_stream(sections, chunk_size):
+    """Yield the objects of the sections as one JSON object of lists.
+
+    {"tags":[...],"ingredients":[...],"recipes":[...]}
+    """
+    render = FastJSONRenderer().render
+    separator = b'{'
+    for object_type, serializer, queryset in sections:
+        yield separator + render(f'{object_type}s') + b':['
+        separator = b''
+        for chunk in iter_chunks(serializer, queryset, chunk_size):
+            yield separator + b','.join(render(data) for data in chunk)
+            separator = b','
+        yield b']'
+        separator = b','
+    yield b'}'
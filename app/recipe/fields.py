@@ -0,0 +1,208 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+def save_named_objects(model, relations):
+    """Create the related objects that were submitted with a new name.
+
+    `relations` is a list of {relation name: related objects} of `model`,
+    where the objects named by BatchedManyRelatedField that don't exist yet
+    are unsaved. They are created with one query per related model and
+    replaced in the lists by the saved ones.
+    """
+    names = {}
+    for related in relations:
+        for field in model._meta.many_to_many:
+            for obj in related.get(field.name, ()):
+                if obj.pk is None:
+                    key = (field.related_model, obj.user_id)
+                    names.setdefault(key, (obj.user, []))[1].append(obj.name)
+
+    saved = {
+        key: key[0].objects.get_or_create_names(user, new_names)
+        for key, (user, new_names) in names.items()
+    }
+    for related in relations:
+        for field in model._meta.many_to_many:
+            if field.name not in related:
+                continue
+            related[field.name] = [
+                obj if obj.pk is not None
+                else saved[field.related_model, obj.user_id][obj.name.lower()]
+                for obj in related[field.name]
+            ]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key relation limited to the objects of the request user.
+
+    With accept_names the many relations also take names, see
+    BatchedManyRelatedField.
+    """
+
+    def __init__(self, accept_names=False, **kwargs):
+        self.accept_names = accept_names
+        super().__init__(**kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            # without a user nothing can be related
+            return queryset.none()
+
+        return queryset.filter(user=request.user)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        """Return a field that resolves all the primary keys at once"""
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return BatchedManyRelatedField(**list_kwargs)
+
+
+class BatchedManyRelatedField(serializers.ManyRelatedField):
+    """Many related field that validates all the primary keys in one query.
+
+    The default ManyRelatedField runs one get() per submitted id. This one
+    runs a single `id__in` query and reports every missing id together. When
+    the serializer is validated as part of a bulk list, the list serializer
+    resolves the ids of all the items up front (see `related_objects`).
+
+    When the child relation accepts names, the values that aren't numbers
+    are names of objects of the user, compared regardless of case and read
+    by the same query. The names that don't exist become unsaved objects,
+    created on save by save_named_objects.
+    """
+    default_error_messages = {
+        'does_not_exist': _(
+            'Invalid pks {pk_values} - objects do not exist.'
+        ),
+        'blank_name': _('Names may not be blank.'),
+        'long_name': _(
+            'Ensure the names have no more than {max_length} characters.'
+        ),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pks, names = self.split_values(data)
+        found = self._get_cached_objects()
+        if found is None:
+            found = self.get_objects(pks, names)
+        objs, named_objs = found
+
+        missing = [pk for pk in pks if pk not in objs]
+        if missing:
+            self.fail(
+                'does_not_exist',
+                pk_values=', '.join(str(pk) for pk in missing)
+            )
+
+        # repeated ids or names would insert the same relation twice
+        values = {}
+        for value in data:
+            if self._is_name(value):
+                obj = named_objs[value.strip().lower()]
+            else:
+                obj = objs[self._to_pk(value)]
+            key = obj.pk if obj.pk is not None else obj.name.lower()
+            values.setdefault(key, obj)
+
+        return list(values.values())
+
+    def _is_name(self, value):
+        return (
+            self.child_relation.accept_names and
+            isinstance(value, str) and
+            not value.strip().isdigit()
+        )
+
+    def _to_pk(self, value):
+        pk_field = self.child_relation.queryset.model._meta.pk
+        if isinstance(value, bool):
+            self.child_relation.fail(
+                'incorrect_type',
+                data_type=type(value).__name__
+            )
+        try:
+            return pk_field.to_python(value)
+        except (DjangoValidationError, TypeError, ValueError):
+            self.child_relation.fail(
+                'incorrect_type',
+                data_type=type(value).__name__
+            )
+
+    def split_values(self, data):
+        """Return the primary keys and the names of the submitted values"""
+        pks = []
+        names = []
+        for value in data:
+            if not self._is_name(value):
+                pks.append(self._to_pk(value))
+                continue
+
+            name = value.strip()
+            max_length = self.child_relation.queryset.model._meta.get_field(
+                'name'
+            ).max_length
+            if not name:
+                self.fail('blank_name')
+            if len(name) > max_length:
+                self.fail('long_name', max_length=max_length)
+            names.append(name)
+
+        return pks, names
+
+    def get_objects(self, pks, names):
+        """Return the objects of the ids and of the names, with one query.
+
+        The objects are returned by id and by lowercase name. The names
+        that don't exist are new unsaved objects of the request user.
+        """
+        queryset = self.child_relation.get_queryset()
+        if not names:
+            return queryset.in_bulk(pks), {}
+
+        lower_names = {name.lower() for name in names}
+        objs = {}
+        named_objs = {}
+        for obj in queryset.annotate(lower_name=Lower('name')).filter(
+            Q(pk__in=pks) | Q(lower_name__in=lower_names)
+        ):
+            objs[obj.pk] = obj
+            named_objs[obj.name.lower()] = obj
+
+        request = self.context.get('request')
+        for name in names:
+            if name.lower() in named_objs:
+                continue
+            if request is None:
+                # without a user nothing can be created
+                self.fail('does_not_exist', pk_values=name)
+            named_objs[name.lower()] = queryset.model(
+                user=request.user,
+                name=name
+            )
+
+        return objs, named_objs
+
+    def _get_cached_objects(self):
+        """Return the objects resolved by the bulk list serializer, if any"""
+        related_objects = getattr(self.root, 'related_objects', None)
+        if related_objects is None:
+            return None
+
+        return related_objects.get(self.field_name)
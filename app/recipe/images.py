@@ -0,0 +1,112 @@
+import io
+import os
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# how to transpose the pixels for each value of the EXIF orientation tag, so
+# phone photos are shown the right way up
+EXIF_ORIENTATION_TAG = 0x0112
+ORIENTATION_TRANSPOSE = {
+    2: Image.FLIP_LEFT_RIGHT,
+    3: Image.ROTATE_180,
+    4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE,
+    6: Image.ROTATE_270,
+    7: Image.TRANSVERSE,
+    8: Image.ROTATE_90,
+}
+
+
+def apply_exif_orientation(img):
+    """Return the image rotated as its EXIF orientation says"""
+    # only JPEG (and a few other formats) carry EXIF data
+    exif = img._getexif() if hasattr(img, '_getexif') else None
+    orientation = (exif or {}).get(EXIF_ORIENTATION_TAG)
+    if orientation in ORIENTATION_TRANSPOSE:
+        return img.transpose(ORIENTATION_TRANSPOSE[orientation])
+
+    return img
+
+
+# Pillow format, file extension and encoder options of each rendition
+# format. WebP is about a third smaller than JPEG at the same quality, JPEG
+# is kept for the clients that can't decode WebP
+IMAGE_FORMATS = {
+    'webp': ('WEBP', 'webp', {'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'optimize': True, 'progressive': True}),
+}
+
+
+def resize_image(img, size):
+    """Return a copy of the image scaled down to fit the size"""
+    rendition = img.copy()
+    rendition.thumbnail((size, size), Image.LANCZOS)
+
+    return rendition
+
+
+def encode_image(img, image_format='jpeg', quality=None):
+    """Return the image encoded in one of the rendition formats"""
+    pil_format, _, options = IMAGE_FORMATS[image_format]
+    output = io.BytesIO()
+    img.save(
+        output,
+        format=pil_format,
+        quality=quality or settings.RECIPE_IMAGE_QUALITY,
+        **options
+    )
+
+    return output.getvalue()
+
+
+def create_renditions(name):
+    """Create the renditions of a stored image and return their paths"""
+    with default_storage.open(name, 'rb') as image_file:
+        img = Image.open(image_file)
+        img.load()
+
+    img = apply_exif_orientation(img)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    stem, _ = os.path.splitext(name)
+    renditions = {}
+    for size in settings.RECIPE_IMAGE_SIZES:
+        resized = resize_image(img, size)
+        formats = {}
+        for image_format in settings.RECIPE_IMAGE_FORMATS:
+            _, extension, _ = IMAGE_FORMATS[image_format]
+            formats[image_format] = default_storage.save(
+                f'{stem}_{size}.{extension}',
+                ContentFile(encode_image(resized, image_format))
+            )
+        # the keys are strings because the renditions are stored as JSON
+        renditions[str(size)] = formats
+
+    return renditions
+
+
+def select_rendition(renditions, size):
+    """Return the smallest rendition that is at least as large as the size.
+
+    When the size is larger than all the renditions the largest one is
+    returned, the client scales it up.
+    """
+    if not renditions:
+        return None
+
+    sizes = sorted(int(key) for key in renditions)
+    selected = next((key for key in sizes if key >= size), sizes[-1])
+
+    return renditions[str(selected)]
+
+
+def delete_renditions(renditions):
+    """Delete the files of the renditions of an image"""
+    for formats in renditions.values():
+        for path in formats.values():
+            default_storage.delete(path)
@@ -0,0 +1,288 @@
+import codecs
+import csv
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from rest_framework.exceptions import ValidationError
+
+from core.models import Tag, Ingredient, Recipe, RecipeImport
+from recipe.cache import invalidate_user_cache
+from recipe.search import update_search_vector
+from recipe.serializers import RecipeImportRowSerializer
+
+logger = logging.getLogger(__name__)
+
+# relations of the recipes that are imported by name
+RELATIONS = (
+    ('tags', 'tag', Tag),
+    ('ingredients', 'ingredient', Ingredient),
+)
+# separator of the names in the tags and ingredients columns of a csv file
+CSV_NAMES_SEPARATOR = '|'
+# invalid rows kept in the import, the others are only counted
+MAX_ERRORS = 100
+
+
+def read_rows(file, file_format):
+    """Yield the rows of a binary file as they are read.
+
+    NDJSON rows are the objects of the lines, or None for a line that isn't
+    JSON. CSV rows have the tags and ingredients split into lists. Blank
+    lines are not rows.
+    """
+    lines = codecs.iterdecode(file, 'utf-8-sig')
+    if file_format == RecipeImport.FORMAT_CSV:
+        for row in csv.DictReader(lines):
+            for field, _object_type, _model in RELATIONS:
+                row[field] = [
+                    name.strip()
+                    for name in (row.get(field) or '').split(
+                        CSV_NAMES_SEPARATOR
+                    )
+                    if name.strip()
+                ]
+            yield row
+        return
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+class RecipeImporter:
+    """Import the rows of a file into the recipes of the import user.
+
+    The rows are written in chunks of chunk_size rows, each one in its own
+    transaction: the missing tags and ingredients of the chunk are created
+    with one bulk_create per model, then the recipes, then their relations.
+    The number of rows of the committed chunks is saved in the same
+    transaction, so an interrupted import resumes after the last chunk.
+
+    Besides the recipes, NDJSON files may have the tag and ingredient lines
+    of the export ({"type": "tag", "id": 1, "name": "Vegan"}). The recipes
+    after them may refer to those objects by the ids of the file.
+    """
+
+    def __init__(self, recipe_import, chunk_size=None):
+        self.recipe_import = recipe_import
+        self.user = recipe_import.user
+        self.chunk_size = chunk_size or settings.RECIPE_IMPORT_CHUNK_SIZE
+        # lowercase name: id of the tags and ingredients of the user, the
+        # names are unique regardless of case
+        self.ids = {
+            field: {
+                name.lower(): pk
+                for name, pk in model.objects.filter(
+                    user=self.user
+                ).values_list('name', 'id')
+            }
+            for field, _object_type, model in RELATIONS
+        }
+        # id of the file: name, from the tag and ingredient lines
+        self.file_names = {field: {} for field, _type, _model in RELATIONS}
+        # building the fields of a serializer costs more than validating a
+        # row, so one serializer validates all the rows
+        self.row_serializer = RecipeImportRowSerializer()
+
+    def run(self, file, progress=None):
+        """Import the rows after the ones of the committed chunks"""
+        recipe_import = self.recipe_import
+        done = recipe_import.rows
+        chunk = self._new_chunk()
+        number = done
+        for number, row in enumerate(read_rows(file, recipe_import.format), 1):
+            if number <= done:
+                # already imported, only the objects of the file are needed
+                self._read_object(row)
+                continue
+
+            self._read_row(chunk, number, row)
+            if number - recipe_import.rows >= self.chunk_size:
+                self._commit(chunk, number)
+                chunk = self._new_chunk()
+                if progress is not None:
+                    progress(recipe_import)
+
+        self._commit(chunk, number)
+        recipe_import.status = RecipeImport.STATUS_DONE
+        recipe_import.save(update_fields=['status', 'updated_at'])
+        if progress is not None:
+            progress(recipe_import)
+
+        return recipe_import
+
+    def _new_chunk(self):
+        return {
+            'recipes': [],
+            # ordered, the first spelling of a new name is the one created
+            'names': {field: {} for field, _type, _model in RELATIONS},
+            'errors': [],
+        }
+
+    def _read_object(self, row):
+        """Read a tag or ingredient line, return its relation and name"""
+        if not isinstance(row, dict):
+            return None
+        for field, object_type, _model in RELATIONS:
+            if row.get('type') == object_type:
+                name = row.get('name')
+                if isinstance(name, str) and 0 < len(name) <= 255:
+                    self.file_names[field][row.get('id')] = name
+                    return field, name
+                return field, None
+
+        return None
+
+    def _read_row(self, chunk, number, row):
+        """Add a row of the file to the chunk, or its errors"""
+        if not isinstance(row, dict):
+            chunk['errors'].append(
+                {'row': number, 'errors': ['Expected a JSON object.']}
+            )
+            return
+
+        found = self._read_object(row)
+        if found is not None:
+            field, name = found
+            if name is None:
+                chunk['errors'].append(
+                    {'row': number, 'errors': {'name': ['Invalid name.']}}
+                )
+            else:
+                chunk['names'][field].setdefault(name)
+            return
+
+        if row.get('type', 'recipe') != 'recipe':
+            chunk['errors'].append(
+                {'row': number, 'errors': {'type': ['Unknown type.']}}
+            )
+            return
+
+        errors = {}
+        data = dict(row)
+        for field, _object_type, _model in RELATIONS:
+            values = data.get(field)
+            if isinstance(values, list):
+                data[field] = self._get_names(field, values, errors)
+        try:
+            recipe = self.row_serializer.run_validation(data)
+        except ValidationError as exc:
+            errors = dict(exc.detail, **errors)
+        if errors:
+            chunk['errors'].append({'row': number, 'errors': errors})
+            return
+
+        for field, _object_type, _model in RELATIONS:
+            # the same name twice would insert the relation twice
+            names = {}
+            for name in recipe[field]:
+                names.setdefault(name.lower(), name)
+            recipe[field] = list(names.values())
+            chunk['names'][field].update(dict.fromkeys(recipe[field]))
+        chunk['recipes'].append(recipe)
+
+    def _get_names(self, field, values, errors):
+        """Return the names of a relation, replacing the ids of the file"""
+        names = []
+        for value in values:
+            if isinstance(value, int) and not isinstance(value, bool):
+                if value not in self.file_names[field]:
+                    errors[field] = [f'Unknown id {value}.']
+                    continue
+                value = self.file_names[field][value]
+            names.append(value)
+
+        return names
+
+    def _create_missing(self, chunk):
+        """Create the tags and ingredients of the chunk the user lacks"""
+        for field, _object_type, model in RELATIONS:
+            ids = self.ids[field]
+            missing = [
+                name for name in chunk['names'][field]
+                if name.lower() not in ids
+            ]
+            if missing:
+                objs = model.objects.get_or_create_names(self.user, missing)
+                ids.update((key, obj.pk) for key, obj in objs.items())
+
+    def _commit(self, chunk, rows):
+        """Write a chunk and the progress of the import in one transaction"""
+        recipe_import = self.recipe_import
+        with transaction.atomic():
+            self._create_missing(chunk)
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    user=self.user,
+                    title=data['title'],
+                    time_minutes=data['time_minutes'],
+                    cost=data['cost'],
+                    link=data['link'],
+                )
+                for data in chunk['recipes']
+            ])
+            for field, object_type, _model in RELATIONS:
+                through = getattr(Recipe, field).through
+                ids = self.ids[field]
+                through.objects.bulk_create([
+                    through(**{
+                        'recipe_id': recipe.pk,
+                        f'{object_type}_id': ids[name.lower()],
+                    })
+                    for recipe, data in zip(recipes, chunk['recipes'])
+                    for name in data[field]
+                ])
+            # bulk_create sends no signals, the search index is updated
+            # once for the chunk
+            update_search_vector([recipe.pk for recipe in recipes])
+
+            recipe_import.rows = rows
+            recipe_import.imported += len(recipes)
+            recipe_import.failed += len(chunk['errors'])
+            room = MAX_ERRORS - len(recipe_import.errors)
+            recipe_import.errors = (
+                recipe_import.errors + chunk['errors'][:max(room, 0)]
+            )
+            recipe_import.save(update_fields=[
+                'rows', 'imported', 'failed', 'errors', 'updated_at'
+            ])
+
+        if chunk['recipes'] or any(chunk['names'].values()):
+            invalidate_user_cache(self.user.pk)
+
+
+def run_import(recipe_import, file, progress=None, chunk_size=None):
+    """Run an import, marking it as failed when it can't be finished.
+
+    A failed import keeps the rows of its committed chunks and can be run
+    again with the same file to import the rest.
+    """
+    recipe_import.status = RecipeImport.STATUS_RUNNING
+    recipe_import.error = ''
+    recipe_import.save(update_fields=['status', 'error', 'updated_at'])
+    start = time.perf_counter()
+    try:
+        RecipeImporter(recipe_import, chunk_size).run(file, progress)
+    except Exception as exc:
+        logger.exception('Failed to import the recipes of %s', recipe_import)
+        # the progress of the chunk that failed was rolled back
+        recipe_import.refresh_from_db()
+        recipe_import.status = RecipeImport.STATUS_FAILED
+        recipe_import.error = str(exc)
+        recipe_import.save(update_fields=['status', 'error', 'updated_at'])
+    logger.info(
+        'Imported %s rows of %s in %.1fs',
+        recipe_import.rows,
+        recipe_import,
+        time.perf_counter() - start
+    )
+
+    return recipe_import
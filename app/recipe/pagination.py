@@ -0,0 +1,152 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Opt-in keyset pagination over the ordering of the view queryset.
+
+    The cursor holds the ordering values of the last row of the page, so the
+    next page is a plain `WHERE (key, id) < (...)` on an index instead of an
+    OFFSET scan, no matter how deep the page is. The primary key is always
+    added as the last ordering key to make the position unique.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 100
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # pagination is opt-in: clients that don't send any of the parameters
+        # keep receiving the plain list
+        params = request.query_params
+        if (self.cursor_query_param not in params and
+                self.page_size_query_param not in params):
+            return None
+
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.get_position_filter(position))
+            except (TypeError, ValueError, ValidationError):
+                # the cursor values don't match the types of the fields
+                raise NotFound(self.invalid_cursor_message)
+
+        # fetch one extra row just to know if there is a next page
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        """Return the page size requested by the client, within the limits"""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """Return the queryset ordering with the primary key as tiebreaker"""
+        ordering = list(queryset.query.order_by)
+        for field in ordering:
+            if not isinstance(field, str) or '__' in field:
+                raise ImproperlyConfigured(
+                    'KeysetPagination only supports ordering by fields of '
+                    'the model, got %r.' % (field,)
+                )
+
+        pk_name = queryset.model._meta.pk.name
+        fields = [field.lstrip('-') for field in ordering]
+        if 'pk' not in fields and pk_name not in fields:
+            descending = bool(ordering) and ordering[0].startswith('-')
+            ordering.append(f'-{pk_name}' if descending else pk_name)
+
+        return ordering
+
+    def get_position_filter(self, position):
+        """Return the filter for the rows that come after the position"""
+        # (a, b) < (x, y) is written as a < x OR (a = x AND b < y), so each
+        # key can have its own direction and still use the index
+        position_filter = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition = Q(**{f'{name}__{lookup}': position[index]})
+            for previous, value in zip(self.ordering[:index], position):
+                condition &= Q(**{previous.lstrip('-'): value})
+            position_filter |= condition
+
+        return position_filter
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        last = self.page[-1]
+        position = [
+            self._get_value(last, field.lstrip('-'))
+            for field in self.ordering
+        ]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            self.encode_cursor(position)
+        )
+
+    def encode_cursor(self, position):
+        """Encode the ordering values of a row as an opaque cursor"""
+        data = json.dumps(position, cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, request):
+        """Return the ordering values stored in the request cursor"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            data = base64.urlsafe_b64decode(encoded.encode())
+            position = json.loads(data.decode())
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if (not isinstance(position, list) or
+                len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position
+
+    def _get_value(self, row, name):
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
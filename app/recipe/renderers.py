@@ -0,0 +1,51 @@
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+
+# orjson is optional, without it the responses are encoded by the json module
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes the compact responses with orjson.
+
+    The output is byte for byte the one of JSONRenderer. The types that
+    orjson would write differently (dates, times, decimals, lazy strings)
+    are passed to the encoder of DRF, and anything orjson can't encode, like
+    integers over 64 bits or keys that aren't strings, falls back to the
+    json module. Indented responses always use the json module. Floats are
+    the only exception: orjson writes exponents as 1e16 instead of 1e+16 and
+    NaN as null, the recipe api has no float fields.
+    """
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if orjson is not None else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # the same escapes of JSONRenderer, so the output is valid javascript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9',
+            b'\\u2029'
+        )
+
+
+# renderers of the recipe api, the browsable api is kept for the developers
+API_RENDERER_CLASSES = (FastJSONRenderer, BrowsableAPIRenderer)
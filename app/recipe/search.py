@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+    SearchVector, TrigramSimilarity
+from django.db.models import F, FloatField, OuterRef, Subquery
+from django.db.models.functions import Cast
+
+from core.models import Tag, Ingredient, Recipe
+
+
+def _related_names(model):
+    """Return a subquery with the names of the objects of a recipe"""
+    return Subquery(
+        model.objects.filter(recipe=OuterRef('pk'))
+        .values('recipe')
+        .annotate(names=StringAgg('name', ' '))
+        .values('names')
+    )
+
+
+def update_search_vector(recipe_ids=None):
+    """Recompute the search vector of the recipes, all of them by default.
+
+    The title weighs more than the tag names, which weigh more than the
+    ingredient names. It is one UPDATE for any number of recipes.
+    """
+    config = settings.RECIPE_SEARCH_CONFIG
+    queryset = Recipe.objects.all()
+    if recipe_ids is not None:
+        queryset = queryset.filter(pk__in=recipe_ids)
+
+    return queryset.update(search_vector=(
+        SearchVector('title', weight='A', config=config) +
+        SearchVector(_related_names(Tag), weight='B', config=config) +
+        SearchVector(_related_names(Ingredient), weight='C', config=config)
+    ))
+
+
+def update_related_search_vector(model, pks):
+    """Recompute the search vector of the recipes of tags or ingredients"""
+    field = 'tags' if model is Tag else 'ingredients'
+    update_search_vector(
+        Recipe.objects.filter(**{f'{field}__in': pks}).values('pk')
+    )
+
+
+def search_recipes(queryset, text):
+    """Filter the recipes that match the text, the best matches first.
+
+    The full text search finds the recipes with the words of the text in the
+    title, the tags or the ingredients. Only when it finds nothing, the
+    trigram similarity of the title looks for misspelled words. Both are
+    answered by GIN indexes.
+    """
+    query = SearchQuery(text, config=settings.RECIPE_SEARCH_CONFIG)
+    matches = queryset.filter(search_vector=query)
+    if matches.exists():
+        rank = SearchRank(F('search_vector'), query)
+    else:
+        # searching both at once makes postgres rank the union of the two,
+        # which is much larger than the full text matches alone
+        matches = queryset.filter(title__trigram_similar=text)
+        rank = TrigramSimilarity('title', text)
+
+    # the rank is a real in postgres, cast to double precision it keeps the
+    # same value in the pagination cursor
+    return matches.annotate(
+        rank=Cast(rank, FloatField())
+    ).order_by('-rank', '-id')
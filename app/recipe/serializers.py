@@ -1,42 +1,474 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Case, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
 from rest_framework import serializers
 
-from core.models import Tag, Ingredient, Recipe
+from core.models import Tag, Ingredient, Recipe, RecipeImageJob, \
+    RecipeImport
+from recipe.cache import invalidate_user_cache
+from recipe.fields import BatchedManyRelatedField, \
+    UserPrimaryKeyRelatedField, save_named_objects
+from recipe.images import select_rendition
+from recipe.search import update_search_vector, update_related_search_vector
+
+
+def bulk_update(model, objs, fields, batch_size=1000):
+    """Save the fields of the objects with one UPDATE per batch"""
+    # Django 2.1 has no QuerySet.bulk_update, each field becomes a CASE with
+    # the new value of every object of the batch
+    fields = [model._meta.get_field(name) for name in fields]
+    for start in range(0, len(objs), batch_size):
+        batch = objs[start:start + batch_size]
+        values = {'updated_at': timezone.now()}
+        for field in fields:
+            values[field.attname] = Case(
+                *[
+                    # postgres reads the parameters as text, so they are
+                    # cast to the type of the column
+                    When(pk=obj.pk, then=Cast(
+                        Value(getattr(obj, field.attname)),
+                        output_field=field
+                    ))
+                    for obj in batch
+                ],
+                output_field=field
+            )
+        model.objects.filter(pk__in=[obj.pk for obj in batch]).update(
+            **values
+        )
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """Write a list of objects with bulk queries.
+
+    The objects are inserted with one bulk_create and their many to many
+    relations with one bulk_create per relation, instead of one save() per
+    object and one insert per relation.
+    """
+    batch_size = 1000
+
+    def to_internal_value(self, data):
+        # the related ids of all the items are resolved with one query per
+        # relation, the fields of each item read them from here
+        self.related_objects = self._get_related_objects(data)
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        if hasattr(model.objects, 'get_or_create_names'):
+            # the names of the user are unique, the existing ones are
+            # returned instead of created again
+            return [
+                objs[attrs['name'].lower()]
+                for objs, attrs in zip(
+                    self._get_or_create_names(model, validated_data),
+                    validated_data
+                )
+            ]
+
+        relations = self._pop_relations(validated_data)
+        save_named_objects(model, relations)
+        objs = model.objects.bulk_create(
+            [model(**attrs) for attrs in validated_data],
+            batch_size=self.batch_size
+        )
+        self._set_relations(objs, relations)
+        if model is Recipe:
+            update_search_vector([obj.pk for obj in objs])
+
+        return objs
+
+    def update(self, instance, validated_data):
+        """Update the objects in `instance`, in the same order as the data"""
+        model = self.child.Meta.model
+        relations = self._pop_relations(validated_data)
+        save_named_objects(model, relations)
+        fields = set()
+        for obj, attrs in zip(instance, validated_data):
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
+                fields.add(attr)
+
+        bulk_update(model, instance, fields, self.batch_size)
+        self._set_relations(instance, relations, replace=True)
+        # the bulk queries don't send the signals that keep the search
+        # vectors up to date
+        pks = [obj.pk for obj in instance]
+        if model is Recipe:
+            update_search_vector(pks)
+        elif 'name' in fields:
+            update_related_search_vector(model, pks)
+
+        return instance
+
+    def _get_or_create_names(self, model, validated_data):
+        """Return the objects of the names by user, for each item"""
+        names = {}
+        for attrs in validated_data:
+            names.setdefault(attrs['user'], []).append(attrs['name'])
+        objs = {
+            user: model.objects.get_or_create_names(user, user_names)
+            for user, user_names in names.items()
+        }
+
+        return [objs[attrs['user']] for attrs in validated_data]
+
+    def _get_related_objects(self, data):
+        """Return the objects of every related id in the data, by field"""
+        if not isinstance(data, list):
+            return {}
+
+        related_objects = {}
+        for name, field in self.child.fields.items():
+            if (not isinstance(field, BatchedManyRelatedField) or
+                    field.read_only):
+                continue
+
+            pks = set()
+            names = {}
+            for item in data:
+                values = item.get(name) if isinstance(item, dict) else None
+                if isinstance(values, list):
+                    try:
+                        item_pks, item_names = field.split_values(values)
+                    except serializers.ValidationError:
+                        # reported by the validation of the item
+                        continue
+                    pks.update(item_pks)
+                    for item_name in item_names:
+                        names.setdefault(item_name.lower(), item_name)
+            related_objects[name] = field.get_objects(
+                pks,
+                list(names.values())
+            )
+
+        return related_objects
+
+    def _pop_relations(self, validated_data):
+        """Remove the many to many values from the data and return them"""
+        names = [
+            field.name
+            for field in self.child.Meta.model._meta.many_to_many
+        ]
+        return [
+            {name: attrs.pop(name) for name in names if name in attrs}
+            for attrs in validated_data
+        ]
+
+    def _set_relations(self, objs, relations, replace=False):
+        """Insert the relation rows, replacing the old ones if asked to"""
+        model = self.child.Meta.model
+        now = timezone.now()
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            changed = [
+                (obj, related[field.name])
+                for obj, related in zip(objs, relations)
+                if field.name in related
+            ]
+            if not changed:
+                continue
+
+            changed_ids = [obj.pk for obj, related_objs in changed]
+            rows = through.objects.filter(**{f'{source}__in': changed_ids})
+            touched = set()
+            if replace:
+                touched.update(rows.values_list(target, flat=True))
+                rows.delete()
+
+            new_rows = []
+            for obj, related_objs in changed:
+                for related_obj in set(related_objs):
+                    touched.add(related_obj.pk)
+                    new_rows.append(
+                        through(**{source: obj.pk, target: related_obj.pk})
+                    )
+            through.objects.bulk_create(new_rows, batch_size=self.batch_size)
+
+            # same as the m2m_changed receivers, the other side of the
+            # relation changed too
+            field.related_model.objects.filter(pk__in=touched).update(
+                updated_at=now
+            )
+            model.objects.filter(pk__in=changed_ids).update(updated_at=now)
+
+
+class SparseFieldsetSerializerMixin:
+    """Render only the fields of the `fields` context, nesting the relations
+    of the `expand` context.
+
+    Only the top level serializer of the response is changed, the objects
+    nested in it keep all their fields.
+    """
+    # relation name: serializer of the nested objects
+    expandable_fields = {}
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_root():
+            return fields
+
+        for name in self.context.get('expand', ()):
+            if name in self.expandable_fields:
+                fields[name] = self.expandable_fields[name](
+                    many=True,
+                    read_only=True
+                )
+
+        selected = self.context.get('fields')
+        if selected is None:
+            return fields
+
+        return OrderedDict(
+            (name, field) for name, field in fields.items()
+            if name in selected
+        )
+
+
+class ValuesSerializerMixin:
+    """Represent a list of objects straight from values() rows.
+
+    to_representation reads each field of each object through a model
+    instance. The read only lists instead select the columns of the rendered
+    fields with values(), read each relation with one query and pass the
+    values that are already JSON types as they are. The data is the same,
+    test_values checks it.
+    """
+    # columns read by the fields that are not columns themselves
+    field_columns = {}
+    # fields whose representation of a values() row is the value itself
+    passthrough_fields = (serializers.CharField, serializers.IntegerField)
+
+    def _is_relation(self, field):
+        return isinstance(
+            field,
+            (serializers.ManyRelatedField, serializers.ListSerializer)
+        )
+
+    def get_row_columns(self):
+        """Return the columns of the values() rows"""
+        columns = [self.Meta.model._meta.pk.name]
+        for name, field in self.fields.items():
+            if name in self.field_columns:
+                columns.extend(self.field_columns[name])
+            elif not self._is_relation(field):
+                columns.append(field.source)
+
+        return list(dict.fromkeys(columns))
+
+    def _get_reader(self, name, field, relations):
+        """Return the function that reads the field of a row"""
+        if isinstance(field, serializers.SerializerMethodField):
+            return getattr(self, f'{field.method_name}_from_row')
+        if name in relations:
+            pk_name = self.Meta.model._meta.pk.name
+            objs = relations[name]
+            return lambda row: objs.get(row[pk_name], [])
+        if type(field) in self.passthrough_fields:
+            source = field.source
+            return lambda row: row[source]
+
+        source = field.source
+        to_representation = field.to_representation
+
+        def read(row):
+            value = row[source]
+            return None if value is None else to_representation(value)
+
+        return read
 
+    def _get_relation_values(self, field, pks):
+        """Return the representation of the related objects by object id"""
+        model = self.Meta.model
+        model_field = model._meta.get_field(field.source)
+        objs = {}
+        if isinstance(field, serializers.ManyRelatedField):
+            # only the ids are rendered, the relation table has them
+            through = model_field.remote_field.through
+            rows = through.objects.filter(**{
+                f'{model_field.m2m_field_name()}_id__in': pks
+            }).values_list(
+                f'{model_field.m2m_field_name()}_id',
+                f'{model_field.m2m_reverse_field_name()}_id'
+            ).order_by(f'{model_field.m2m_reverse_field_name()}_id')
+            for pk, related_pk in rows:
+                objs.setdefault(pk, []).append(related_pk)
+        else:
+            child = field.child
+            key = model_field.related_query_name()
+            rows = list(
+                model_field.related_model.objects.filter(**{
+                    f'{key}__in': pks
+                }).values(key, *child.get_row_columns()).order_by('id')
+            )
+            for row, data in zip(rows, child.to_representation_rows(rows)):
+                objs.setdefault(row[key], []).append(data)
 
-class TagSerializer(serializers.ModelSerializer):
+        return objs
+
+    def to_representation_rows(self, rows):
+        """Return the representation of the objects of the values() rows"""
+        rows = list(rows)
+        pk_name = self.Meta.model._meta.pk.name
+        pks = [row[pk_name] for row in rows]
+        relations = {
+            name: self._get_relation_values(field, pks)
+            for name, field in self.fields.items()
+            if self._is_relation(field)
+        }
+        readers = [
+            (name, self._get_reader(name, field, relations))
+            for name, field in self.fields.items()
+        ]
+
+        return [
+            OrderedDict((name, read(row)) for name, read in readers)
+            for row in rows
+        ]
+
+
+class NamedObjectSerializerMixin:
+    """Create the objects whose name is unique per user, case insensitive"""
+
+    def create(self, validated_data):
+        """Return the object of the user with the name, created if needed"""
+        name = validated_data['name']
+        user = validated_data['user']
+        objs = self.Meta.model.objects.get_or_create_names(user, [name])
+        # bulk_create sends no post_save to invalidate the cache
+        invalidate_user_cache(user.pk)
+
+        return objs[name.lower()]
+
+
+class TagSerializer(NamedObjectSerializerMixin, SparseFieldsetSerializerMixin,
+                    ValuesSerializerMixin, serializers.ModelSerializer):
     """Serializer for tag objects"""
 
     class Meta:
         model = Tag
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(NamedObjectSerializerMixin,
+                           SparseFieldsetSerializerMixin,
+                           ValuesSerializerMixin,
+                           serializers.ModelSerializer):
     """Serializer for ingredient objects"""
 
     class Meta:
         model = Ingredient
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsetSerializerMixin, ValuesSerializerMixin,
+                       serializers.ModelSerializer):
     """Serialize a recipe"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    expandable_fields = {
+        'ingredients': IngredientSerializer,
+        'tags': TagSerializer,
+    }
+    field_columns = {
+        'image': ('image', 'image_renditions'),
+        'images': ('image_renditions',),
+    }
+    # the ids are validated with one query per relation, and only the tags
+    # and ingredients of the authenticated user are accepted. names can be
+    # sent instead of ids, the missing ones are created on save
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
-        queryset=Ingredient.objects.all()
+        queryset=Ingredient.objects.all(),
+        accept_names=True
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        accept_names=True
     )
+    # url of the rendition closest to ?image_size=, and the urls of all the
+    # renditions by size and format to build a srcset
+    image = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'time_minutes', 'cost', 'link', 'ingredients',
-                  'tags')
+                  'tags', 'image', 'images')
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
+
+    def create(self, validated_data):
+        save_named_objects(Recipe, [validated_data])
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        save_named_objects(Recipe, [validated_data])
+        return super().update(instance, validated_data)
+
+    def _build_url(self, path):
+        url = default_storage.url(path)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+
+        return url
+
+    def _image_url(self, name, renditions):
+        if not name:
+            return None
+
+        size = self.context.get(
+            'image_size',
+            settings.RECIPE_IMAGE_DEFAULT_SIZE
+        )
+        rendition = select_rendition(renditions, size)
+        if rendition is None:
+            # the renditions are still being created
+            return self._build_url(name)
+
+        return self._build_url(rendition['jpeg'])
+
+    def _image_urls(self, renditions):
+        return {
+            size: {
+                image_format: self._build_url(path)
+                for image_format, path in formats.items()
+            }
+            for size, formats in renditions.items()
+        }
+
+    def get_image(self, obj):
+        """Return the url of the JPEG rendition of the requested size"""
+        return self._image_url(obj.image.name, obj.image_renditions)
+
+    def get_image_from_row(self, row):
+        return self._image_url(row['image'], row['image_renditions'])
+
+    def get_images(self, obj):
+        """Return the urls of the renditions by size and format"""
+        return self._image_urls(obj.image_renditions)
+
+    def get_images_from_row(self, row):
+        return self._image_urls(row['image_renditions'])
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -52,3 +484,100 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'image')
         read_only_fields = ('id',)
+
+
+class RecipeImageJobSerializer(serializers.ModelSerializer):
+    """Serialize the processing of a recipe image"""
+
+    class Meta:
+        model = RecipeImageJob
+        fields = ('id', 'recipe', 'status', 'error', 'created_at',
+                  'updated_at')
+        read_only_fields = fields
+
+
+class RecipeImportRowSerializer(serializers.Serializer):
+    """Validate a recipe of an import file, with the names of its relations"""
+    title = serializers.CharField(max_length=255)
+    time_minutes = serializers.IntegerField()
+    cost = serializers.DecimalField(max_digits=5, decimal_places=2)
+    link = serializers.CharField(
+        max_length=255,
+        allow_blank=True,
+        default=''
+    )
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        default=list
+    )
+    ingredients = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        default=list
+    )
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """Serialize the import of a file of recipes"""
+    upload = serializers.FileField(write_only=True)
+    format = serializers.ChoiceField(
+        choices=RecipeImport.FORMAT_CHOICES,
+        required=False
+    )
+
+    class Meta:
+        model = RecipeImport
+        fields = ('id', 'upload', 'format', 'status', 'rows', 'imported',
+                  'failed', 'errors', 'error', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'status', 'rows', 'imported', 'failed',
+                            'errors', 'error', 'created_at', 'updated_at')
+
+    def validate(self, attrs):
+        if 'format' not in attrs:
+            # from the extension of the file: .csv, .ndjson or .jsonl
+            extension = attrs['upload'].name.rsplit('.', 1)[-1].lower()
+            if extension == 'csv':
+                attrs['format'] = RecipeImport.FORMAT_CSV
+            elif extension in ('ndjson', 'jsonl'):
+                attrs['format'] = RecipeImport.FORMAT_NDJSON
+            else:
+                raise serializers.ValidationError({'format': [
+                    _('Unknown file extension, inform the format.')
+                ]})
+
+        return attrs
+
+
+class RecipeFilterSerializer(serializers.Serializer):
+    """Validate the query parameters that filter and sort the recipes"""
+    ORDERINGS = ('id', '-id', 'time_minutes', '-time_minutes', 'cost',
+                 '-cost', 'matches')
+
+    match = serializers.ChoiceField(choices=('any', 'all'), default='any')
+    min_time = serializers.IntegerField(min_value=0, required=False)
+    max_time = serializers.IntegerField(min_value=0, required=False)
+    min_cost = serializers.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        min_value=0,
+        required=False
+    )
+    max_cost = serializers.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        min_value=0,
+        required=False
+    )
+    ordering = serializers.ChoiceField(choices=ORDERINGS, required=False)
+
+    def validate(self, attrs):
+        for name in ('time', 'cost'):
+            low = attrs.get(f'min_{name}')
+            high = attrs.get(f'max_{name}')
+            if low is not None and high is not None and low > high:
+                msg = _('Ensure this value is greater than or equal to '
+                        '{field}.')
+                raise serializers.ValidationError({
+                    f'max_{name}': [msg.format(field=f'min_{name}')]
+                })
+
+        return attrs
@@ -0,0 +1,124 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, \
+    m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.cache import invalidate_user_cache
+from recipe.search import update_search_vector, update_related_search_vector
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def invalidate_owner_cache(sender, instance, **kwargs):
+    """Invalidate the cached responses of the owner of the object"""
+    invalidate_user_cache(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_recipe_relations_cache(sender, instance, action, **kwargs):
+    """Invalidate the cached responses when recipe relations change"""
+    # instance is the recipe, or the tag or ingredient when the relation is
+    # changed from the reverse side. both belong to the same user
+    if action.startswith('post_'):
+        invalidate_user_cache(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_recipe_relations(sender, instance, action, model, pk_set,
+                           **kwargs):
+    """Update the modification time of both sides of a changed relation"""
+    # the recipe renders the related ids and the tags and ingredients
+    # listed with assigned_only depend on the recipes that use them
+    if action == 'pre_clear':
+        # there is no pk_set when clearing, so it is read before the rows
+        # are deleted
+        pk_set = sender.objects.filter(
+            **{f'{instance._meta.model_name}_id': instance.pk}
+        ).values_list(f'{model._meta.model_name}_id', flat=True)
+    elif action not in ('post_add', 'post_remove'):
+        return
+
+    now = timezone.now()
+    type(instance).objects.filter(pk=instance.pk).update(updated_at=now)
+    model.objects.filter(pk__in=list(pk_set)).update(updated_at=now)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_of_deleted(sender, instance, **kwargs):
+    """Update the modification time of the recipes that lose a relation"""
+    # the relation rows are removed by the cascade, without m2m_changed
+    field = 'tags' if sender is Tag else 'ingredients'
+    Recipe.objects.filter(**{field: instance}).update(
+        updated_at=timezone.now()
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def touch_relations_of_deleted(sender, instance, **kwargs):
+    """Update the modification time of the tags and ingredients it used"""
+    now = timezone.now()
+    Tag.objects.filter(recipe=instance).update(updated_at=now)
+    Ingredient.objects.filter(recipe=instance).update(updated_at=now)
+
+
+@receiver(post_save, sender=Recipe)
+def index_saved_recipe(sender, instance, update_fields, **kwargs):
+    """Update the search vector of a saved recipe"""
+    if update_fields is None or 'title' in update_fields:
+        update_search_vector([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def index_recipes_of_renamed(sender, instance, created, **kwargs):
+    """Update the search vector of the recipes of a renamed object"""
+    # a new object has no recipes yet
+    if not created:
+        update_related_search_vector(sender, [instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_recipe_relations(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """Update the search vector of the recipes with changed relations"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            update_search_vector([instance.pk])
+        return
+
+    # changed from the tag or ingredient side, pk_set has the recipes
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = list(sender.objects.filter(
+            **{f'{instance._meta.model_name}_id': instance.pk}
+        ).values_list('recipe_id', flat=True))
+    elif action == 'post_clear':
+        update_search_vector(instance.__dict__.pop('_cleared_recipe_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        update_search_vector(pk_set)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def find_recipes_of_deleted(sender, instance, **kwargs):
+    """Keep the recipes of an object that is going to be deleted"""
+    # the relation rows are gone when post_delete is sent
+    field = 'tags' if sender is Tag else 'ingredients'
+    instance._deleted_recipe_ids = list(
+        Recipe.objects.filter(**{field: instance}).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def index_recipes_of_deleted(sender, instance, **kwargs):
+    """Update the search vector of the recipes of a deleted object"""
+    update_search_vector(instance.__dict__.pop('_deleted_recipe_ids', []))
@@ -0,0 +1,184 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Recipe, RecipeImageJob, RecipeImport
+from recipe.cache import invalidate_user_cache
+from recipe.images import create_renditions, delete_renditions
+from recipe.importer import run_import
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the pool of threads that process the images and the imports"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-task'
+            )
+
+    return _executor
+
+
+def enqueue_image_job(job):
+    """Schedule the processing of an image job"""
+    queue = settings.RECIPE_IMAGE_QUEUE
+    if queue == 'sync':
+        process_image_job(job.pk)
+    elif queue == 'thread':
+        # the worker must only look for the job after it is committed
+        transaction.on_commit(
+            lambda: get_executor().submit(_run_in_thread, job.pk)
+        )
+    # with the 'db' queue the job stays pending until one of the
+    # process_image_jobs commands picks it
+
+
+def claimable_jobs():
+    """Return the pending jobs and the running ones that stopped"""
+    # a running job without progress for a while was lost by a restart of
+    # the process that ran it
+    stale = timezone.now() - timedelta(
+        seconds=settings.RECIPE_IMAGE_STALE_SECONDS
+    )
+    return RecipeImageJob.objects.filter(
+        Q(status=RecipeImageJob.STATUS_PENDING) |
+        Q(status=RecipeImageJob.STATUS_RUNNING, updated_at__lt=stale)
+    )
+
+
+def claim_next_job():
+    """Mark the oldest pending or stalled job as running and return it"""
+    with transaction.atomic():
+        # skip_locked lets many workers poll the table without waiting on
+        # each other or taking the same job
+        job = claimable_jobs().select_for_update(
+            skip_locked=True
+        ).order_by('id').first()
+        if job is not None:
+            job.status = RecipeImageJob.STATUS_RUNNING
+            job.save(update_fields=['status', 'updated_at'])
+
+    return job
+
+
+def process_image_job(job_id):
+    """Create the renditions of the image of a job"""
+    # claiming the job with an update guarantees that it runs once, even if
+    # it was also picked by a database worker or queued again
+    claimed = claimable_jobs().filter(pk=job_id).update(
+        status=RecipeImageJob.STATUS_RUNNING,
+        updated_at=timezone.now()
+    )
+    if claimed:
+        run_image_job(RecipeImageJob.objects.get(pk=job_id))
+
+
+def requeue_image_jobs():
+    """Schedule the jobs of the thread queue lost by a restart"""
+    if settings.RECIPE_IMAGE_QUEUE != 'thread':
+        return 0
+
+    try:
+        job_ids = list(
+            claimable_jobs().order_by('id').values_list('pk', flat=True)
+        )
+    except DatabaseError:
+        # the web process starts anyway, the jobs are queued on the next one
+        logger.exception('Failed to look for the image jobs to queue again')
+        return 0
+
+    for job_id in job_ids:
+        get_executor().submit(_run_in_thread, job_id)
+
+    return len(job_ids)
+
+
+def run_image_job(job):
+    """Process a job that was already claimed"""
+    try:
+        renditions = create_renditions(job.image)
+    except Exception as exc:
+        logger.exception('Failed to process the image of job %s', job.pk)
+        job.status = RecipeImageJob.STATUS_FAILED
+        job.error = str(exc)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        return
+
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().get(pk=job.recipe_id)
+        if recipe.image.name == job.image:
+            old_renditions = recipe.image_renditions
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image_renditions=renditions,
+                updated_at=timezone.now()
+            )
+        else:
+            # a newer image was uploaded while this one was processed
+            old_renditions = renditions
+
+        job.status = RecipeImageJob.STATUS_DONE
+        job.save(update_fields=['status', 'updated_at'])
+
+    delete_renditions(old_renditions)
+    invalidate_user_cache(recipe.user_id)
+
+
+def _run_in_thread(job_id):
+    try:
+        process_image_job(job_id)
+    except Exception:
+        logger.exception('Failed to run image job %s', job_id)
+    finally:
+        # the connections of the worker thread are not closed by the
+        # request cycle
+        connections.close_all()
+
+
+def enqueue_import(recipe_import):
+    """Schedule an uploaded import"""
+    if settings.RECIPE_IMPORT_QUEUE == 'sync':
+        process_import(recipe_import.pk)
+    else:
+        transaction.on_commit(
+            lambda: get_executor().submit(
+                _run_import_in_thread,
+                recipe_import.pk
+            )
+        )
+
+
+def process_import(import_id):
+    """Import the uploaded file of a pending import"""
+    claimed = RecipeImport.objects.filter(
+        pk=import_id,
+        status=RecipeImport.STATUS_PENDING
+    ).update(status=RecipeImport.STATUS_RUNNING, updated_at=timezone.now())
+    if claimed:
+        recipe_import = RecipeImport.objects.select_related('user').get(
+            pk=import_id
+        )
+        with default_storage.open(recipe_import.file, 'rb') as file:
+            run_import(recipe_import, file)
+
+
+def _run_import_in_thread(import_id):
+    try:
+        process_import(import_id)
+    except Exception:
+        logger.exception('Failed to run import %s', import_id)
+    finally:
+        connections.close_all()
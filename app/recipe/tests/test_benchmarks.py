@@ -0,0 +1,52 @@
+from django.test import TestCase
+
+from core.benchmarks import seed_user, view_queryset
+from core.models import Tag
+
+from recipe.views import TagViewSet
+
+
+class AssignedOnlyBenchmarkTests(TestCase):
+    """Compare the assigned_only filter with the old DISTINCT join"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # most tags are used by many recipes, which is what made the join
+        # fan out. the unused tags must still be filtered out
+        cls.user = seed_user(
+            'bench@test.com',
+            recipes=2000,
+            tags=50,
+            ingredients=10,
+            tags_per_recipe=5,
+            ingredients_per_recipe=1
+        )
+        Tag.objects.bulk_create(
+            Tag(user=cls.user, name=f'Unused {i}') for i in range(10)
+        )
+
+    def setUp(self):
+        self.queryset = view_queryset(
+            TagViewSet,
+            self.user,
+            {'assigned_only': 1}
+        )
+        self.distinct_queryset = Tag.objects.filter(
+            user=self.user,
+            recipe__isnull=False
+        ).order_by('-name').distinct()
+
+    def test_assigned_only_same_results(self):
+        """Test both forms return the same tags"""
+        self.assertEqual(
+            list(self.queryset.values_list('id', flat=True)),
+            list(self.distinct_queryset.values_list('id', flat=True))
+        )
+        self.assertEqual(self.queryset.count(), 50)
+
+    def test_assigned_only_without_distinct(self):
+        """Test the assigned_only filter doesn't sort and deduplicate rows"""
+        sql = str(self.queryset.query)
+
+        self.assertNotIn('DISTINCT', sql)
+        self.assertIn('EXISTS', sql)
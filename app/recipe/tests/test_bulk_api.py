@@ -0,0 +1,281 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'cost': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicBulkApiTests(TestCase):
+    """Test unauthenticated bulk API access"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test that authentication is required"""
+        res = self.client.post(RECIPES_BULK_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBulkApiTests(TestCase):
+    """Test the authenticated bulk API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags(self):
+        """Test creating many tags in one request"""
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_recipes(self):
+        """Test creating many recipes with their relations"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'cost': '5.00',
+                'tags': [tag.id],
+                'ingredients': [ingredient.id],
+            }
+            for i in range(20)
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 20)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 20)
+        self.assertEqual(recipes.filter(tags=tag).count(), 20)
+        self.assertEqual(recipes.filter(ingredients=ingredient).count(), 20)
+
+    def test_bulk_create_recipes_query_count(self):
+        """Test that the number of queries doesn't grow with the items"""
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(5)
+        ]
+
+        def bulk_create(count):
+            payload = [
+                {
+                    'title': f'Recipe {i}',
+                    'time_minutes': 10,
+                    'cost': '5.00',
+                    'tags': [tag.id for tag in tags],
+                    'ingredients': [],
+                }
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(
+                    RECIPES_BULK_URL,
+                    payload,
+                    format='json'
+                )
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(bulk_create(1), bulk_create(50))
+
+    def test_bulk_create_recipes_with_names(self):
+        """Test that the new names of the items are created once"""
+        item = {'title': 'Pancakes', 'time_minutes': 10, 'cost': '5.00'}
+        payload = [
+            dict(item, tags=['Breakfast'], ingredients=['Flour', 'Egg']),
+            dict(item, tags=['breakfast'], ingredients=['Egg']),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        tag = Tag.objects.get(user=self.user)
+        self.assertEqual(tag.name, 'Breakfast')
+        self.assertEqual([data['tags'] for data in res.data], [[tag.id]] * 2)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(),
+            2
+        )
+
+    def test_bulk_create_existing_tags(self):
+        """Test that the tags with existing names are not duplicated"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': 'vegan'}, {'name': 'Dessert'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_rename_tag_to_existing_name(self):
+        """Test that renaming a tag like another one is rejected"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+        payload = [{'id': tag.id, 'name': 'VEGAN'}]
+
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Dessert')
+
+    def test_bulk_create_recipes_missing_tags(self):
+        """Test that missing tag ids are reported per item"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        item = {'title': 'Pancakes', 'time_minutes': 10, 'cost': '5.00'}
+        payload = [
+            dict(item, tags=[tag.id], ingredients=[]),
+            dict(item, tags=[tag.id, 0], ingredients=[]),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+
+    def test_bulk_create_errors_per_item(self):
+        """Test that invalid items are reported and nothing is created"""
+        payload = [
+            {
+                'title': 'Pancakes',
+                'time_minutes': 10,
+                'cost': '5.00',
+                'tags': [],
+                'ingredients': [],
+            },
+            {'title': 'Porridge', 'cost': '5.00'},
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('time_minutes', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_requires_list(self):
+        """Test that the bulk endpoints only accept lists"""
+        res = self.client.post(
+            RECIPES_BULK_URL,
+            {'title': 'Pancakes'},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_recipes(self):
+        """Test updating many recipes in one request"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        recipe2.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+        payload = [
+            {'id': recipe1.id, 'title': 'Pancakes', 'cost': '7.50'},
+            {'id': recipe2.id, 'tags': [tag.id]},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        self.assertEqual(recipe1.title, 'Pancakes')
+        self.assertEqual(str(recipe1.cost), '7.50')
+        self.assertEqual(list(recipe2.tags.all()), [tag])
+
+    def test_bulk_update_other_user_recipe(self):
+        """Test that recipes of other users can't be updated"""
+        user2 = get_user_model().objects.create_user(
+            'test2@test.com',
+            '123'
+        )
+        recipe = sample_recipe(user=user2)
+        payload = [{'id': recipe.id, 'title': 'Pancakes'}]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+        recipe.refresh_from_db()
+        self.assertNotEqual(recipe.title, 'Pancakes')
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting many recipes in one request"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        recipe3 = sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            RECIPES_BULK_URL,
+            [recipe1.id, recipe2.id],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Recipe.objects.all()), [recipe3])
+
+    def test_bulk_delete_missing_recipe(self):
+        """Test that nothing is deleted if one of the ids is not found"""
+        recipe = sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            RECIPES_BULK_URL,
+            [recipe.id, 0],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data, [{}, {'id': ['Not found.']}])
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_create_invalidates_cache(self):
+        """Test that the cached list is invalidated after a bulk create"""
+        self.client.get(RECIPES_URL)
+        payload = [{
+            'title': 'Pancakes',
+            'time_minutes': 10,
+            'cost': '5.00',
+            'tags': [],
+            'ingredients': [],
+        }]
+        self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 1)
@@ -0,0 +1,140 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.request import Request
+
+from core.models import Tag, Recipe
+
+from recipe.cache import normalize_params
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'cost': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ResponseCacheTests(TestCase):
+    """Test the cached responses of the recipe API"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test that a repeated list request doesn't load the objects"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        # only the conditional request validators are queried
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['name'], 'Vegan')
+
+    def test_no_tag_detail_route(self):
+        """Test that the cache doesn't add a detail route to the tags"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(f'{TAGS_URL}{tag.id}/')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_invalidated_on_save(self):
+        """Test that creating an object invalidates the cached list"""
+        self.client.get(TAGS_URL)
+        self.client.post(TAGS_URL, {'name': 'Dessert'})
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_list_invalidated_on_m2m_change(self):
+        """Test that changing recipe relations invalidates the cache"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(user=self.user)
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(len(res.data), 0)
+
+        recipe.tags.add(tag)
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_detail_invalidated_on_delete(self):
+        """Test that deleting a recipe invalidates its cached detail"""
+        recipe = sample_recipe(user=self.user)
+        url = detail_url(recipe.id)
+        self.client.get(url)
+
+        recipe.delete()
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cache_limited_to_user(self):
+        """Test that users don't receive each other cached responses"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        user2 = get_user_model().objects.create_user(
+            'test2@test.com',
+            '123'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data), 0)
+
+    def test_filters_cached_separately(self):
+        """Test that different filters are cached in different entries"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(tag)
+        sample_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, {'tags': tag.id})
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_normalize_params(self):
+        """Test that equivalent query parameters are normalized the same"""
+        factory = APIRequestFactory()
+        request1 = Request(factory.get('/', {
+            'tags': '3, 1,2',
+            'assigned_only': '1',
+        }))
+        request2 = Request(factory.get('/', {
+            'assigned_only': '2',
+            'tags': '1,2,3,3',
+        }))
+
+        self.assertEqual(
+            normalize_params(request1.query_params),
+            normalize_params(request2.query_params)
+        )
@@ -0,0 +1,154 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Recipe
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'cost': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ConditionalGetTests(TestCase):
+    """Test the conditional requests of the recipe API"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_modified(self):
+        """Test that an unchanged list is answered with 304"""
+        sample_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        # only the validators are queried, the recipes aren't loaded
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertFalse(res.content)
+
+    def test_list_modified_after_change(self):
+        """Test that the ETag changes when a recipe changes"""
+        recipe = sample_recipe(user=self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_list_modified_after_delete(self):
+        """Test that the ETag changes when a tag is deleted"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        tag.delete()
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_if_modified_since_after_delete(self):
+        """Test that a delete isn't hidden by If-Modified-Since"""
+        sample_recipe(user=self.user)
+        recipe = sample_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+        self.assertNotIn('Last-Modified', res)
+
+        recipe.delete()
+        # newer than the remaining recipe, as the list was received after it
+        res = self.client.get(
+            RECIPES_URL,
+            HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+
+    def test_etag_depends_on_params(self):
+        """Test that filtered lists have a different ETag"""
+        sample_recipe(user=self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'page_size': 1},
+            HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_modified_after_tag_rename(self):
+        """Test that renaming a tag changes the recipe detail ETag"""
+        recipe = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        url = detail_url(recipe.id)
+        etag = self.client.get(url)['ETag']
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegetarian')
+
+    def test_expanded_list_modified_after_tag_rename(self):
+        """Test that renaming a tag changes the ETag of an expanded list"""
+        recipe = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        params = {'expand': 'tags'}
+        etag = self.client.get(RECIPES_URL, params)['ETag']
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(RECIPES_URL, params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['tags'][0]['name'], 'Vegetarian')
+
+    def test_detail_if_modified_since(self):
+        """Test that the detail honors If-Modified-Since"""
+        recipe = sample_recipe(user=self.user)
+        url = detail_url(recipe.id)
+        last_modified = self.client.get(url)['Last-Modified']
+
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_not_found(self):
+        """Test that a missing recipe is not found even with a wildcard"""
+        res = self.client.get(detail_url(0), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,139 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.serializers import RecipeSerializer
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'cost': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeExportTests(TestCase):
+    """Test exporting the recipe library of a user"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            name='Rice'
+        )
+        self.recipes = []
+        for index in range(5):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {index}')
+            recipe.tags.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+            self.recipes.append(recipe)
+
+        other = get_user_model().objects.create_user('other@test.com', '123')
+        Tag.objects.create(user=other, name='Other tag')
+        sample_recipe(user=other, title='Other recipe')
+
+    def content(self, res):
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return b''.join(res.streaming_content).decode()
+
+    def test_export_json(self):
+        """Test exporting the library as one JSON object"""
+        res = self.client.get(EXPORT_URL)
+
+        data = json.loads(self.content(res))
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(data['tags'], [{'id': self.tag.id, 'name': 'Vegan'}])
+        self.assertEqual(
+            data['ingredients'],
+            [{'id': self.ingredient.id, 'name': 'Rice'}]
+        )
+        request = res.wsgi_request
+        serializer = RecipeSerializer(
+            Recipe.objects.filter(user=self.user).order_by('id'),
+            many=True,
+            context={'request': request}
+        )
+        self.assertEqual(
+            data['recipes'],
+            json.loads(json.dumps(serializer.data))
+        )
+
+    def test_export_ndjson(self):
+        """Test exporting the library as one object per line"""
+        res = self.client.get(EXPORT_URL, {'format': 'ndjson'})
+
+        lines = self.content(res).splitlines()
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertIn('recipes.ndjson', res['Content-Disposition'])
+        objs = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [obj['type'] for obj in objs],
+            ['tag', 'ingredient'] + ['recipe'] * 5
+        )
+        self.assertEqual(
+            [obj['id'] for obj in objs[2:]],
+            [recipe.id for recipe in self.recipes]
+        )
+        self.assertEqual(objs[2]['tags'], [self.tag.id])
+
+    def test_export_ndjson_accept_header(self):
+        """Test choosing NDJSON with the Accept header"""
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT='application/x-ndjson')
+
+        self.assertEqual(len(self.content(res).splitlines()), 7)
+
+    def test_export_empty_library(self):
+        """Test exporting a user without objects"""
+        user = get_user_model().objects.create_user('empty@test.com', '123')
+        self.client.force_authenticate(user)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(
+            json.loads(self.content(res)),
+            {'tags': [], 'ingredients': [], 'recipes': []}
+        )
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_reads_relations_per_chunk(self):
+        """Test that the relations are read once per chunk of recipes"""
+        with CaptureQueriesContext(connection) as queries:
+            content = self.content(self.client.get(EXPORT_URL))
+
+        self.assertEqual(len(json.loads(content)['recipes']), 5)
+        recipe_tags = [
+            query for query in queries
+            if query['sql'].startswith('SELECT') and
+            'FROM "core_recipe_tags"' in query['sql']
+        ]
+        # 5 recipes in chunks of 2
+        self.assertEqual(len(recipe_tags), 3)
+
+    def test_export_auth_required(self):
+        """Test that the export requires authentication"""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
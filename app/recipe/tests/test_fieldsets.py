@@ -0,0 +1,128 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'cost': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class SparseFieldsetTests(TestCase):
+    """Test rendering only the requested fields"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            name='Rice'
+        )
+        self.recipe = sample_recipe(user=self.user, title='Fried rice')
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def test_list_only_requested_fields(self):
+        """Test that the list renders and loads only the requested fields"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title,image'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            [{'id': self.recipe.id, 'title': 'Fried rice', 'image': None}]
+        )
+        # no prefetch of the relations and no unrequested columns
+        sql = queries[-1]['sql']
+        self.assertIn('"core_recipe"."title"', sql)
+        self.assertNotIn('"core_recipe"."cost"', sql)
+        self.assertNotIn('"core_recipe"."link"', sql)
+        self.assertFalse(any(
+            'core_recipe_tags' in query['sql'] for query in queries
+        ))
+
+    def test_list_expand_relations(self):
+        """Test that the expanded relations are rendered as objects"""
+        res = self.client.get(
+            RECIPES_URL,
+            {'fields': 'id', 'expand': 'tags'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{
+            'id': self.recipe.id,
+            'tags': [{'id': self.tag.id, 'name': 'Vegan'}],
+        }])
+
+    def test_list_ordering_field_not_requested(self):
+        """Test that the pagination works without the ordering field"""
+        sample_recipe(user=self.user, title='Beans', cost=2)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'fields': 'title', 'ordering': 'cost', 'page_size': 1}
+        )
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(res.data['results'], [{'title': 'Fried rice'}])
+
+    def test_detail_fields(self):
+        """Test that the detail keeps the nested objects of its fields"""
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            {'fields': 'title,ingredients'}
+        )
+
+        self.assertEqual(res.data, {
+            'title': 'Fried rice',
+            'ingredients': [{'id': self.ingredient.id, 'name': 'Rice'}],
+        })
+
+    def test_tag_fields(self):
+        """Test the fields of the tags"""
+        res = self.client.get(TAGS_URL, {'fields': 'name'})
+
+        self.assertEqual(res.data, [{'name': 'Vegan'}])
+
+    def test_fields_ignored_on_writes(self):
+        """Test that creating a recipe returns all its fields"""
+        payload = {'title': 'Soup', 'time_minutes': 5, 'cost': '1.00'}
+        res = self.client.post(f'{RECIPES_URL}?fields=id', payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['title'], 'Soup')
+
+    def test_unknown_fields(self):
+        """Test that unknown fields and relations are rejected"""
+        for params in ({'fields': 'id,secret'}, {'expand': 'title'}):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,226 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'cost': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeFilterTests(TestCase):
+    """Test filtering the recipes by tags and ingredients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.beans = Ingredient.objects.create(user=self.user, name='Beans')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+    def ids(self, params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data]
+
+    def test_match_any_tags_without_duplicates(self):
+        """Test that a recipe with many of the tags is returned once"""
+        both = sample_recipe(user=self.user, title='Vegan stir fry')
+        both.tags.add(self.vegan, self.quick)
+        one = sample_recipe(user=self.user, title='Vegan stew')
+        one.tags.add(self.vegan)
+        sample_recipe(user=self.user, title='Steak')
+
+        ids = self.ids({'tags': f'{self.vegan.id},{self.quick.id}'})
+
+        self.assertEqual(ids, [one.id, both.id])
+
+    def test_match_all_tags(self):
+        """Test returning only the recipes with all the tags"""
+        both = sample_recipe(user=self.user, title='Vegan stir fry')
+        both.tags.add(self.vegan, self.quick)
+        one = sample_recipe(user=self.user, title='Vegan stew')
+        one.tags.add(self.vegan)
+
+        ids = self.ids({
+            'tags': f'{self.vegan.id},{self.quick.id},{self.quick.id}',
+            'match': 'all',
+        })
+
+        self.assertEqual(ids, [both.id])
+
+    def test_match_all_tags_and_ingredients(self):
+        """Test that each relation must have all of its ids"""
+        recipe1 = sample_recipe(user=self.user, title='Rice and beans')
+        recipe1.tags.add(self.vegan)
+        recipe1.ingredients.add(self.rice, self.beans)
+        recipe2 = sample_recipe(user=self.user, title='Fried rice')
+        recipe2.tags.add(self.vegan)
+        recipe2.ingredients.add(self.rice)
+        recipe3 = sample_recipe(user=self.user, title='Burrito')
+        recipe3.ingredients.add(self.rice, self.beans)
+
+        ids = self.ids({
+            'tags': f'{self.vegan.id}',
+            'ingredients': f'{self.rice.id},{self.beans.id}',
+            'match': 'all',
+        })
+
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_order_by_matches(self):
+        """Test that the recipes with more matches come first"""
+        recipe1 = sample_recipe(user=self.user, title='Salted rice')
+        recipe1.ingredients.add(self.rice, self.salt)
+        recipe2 = sample_recipe(user=self.user, title='Rice and beans')
+        recipe2.tags.add(self.vegan)
+        recipe2.ingredients.add(self.rice, self.beans, self.salt)
+        recipe3 = sample_recipe(user=self.user, title='Salted beans')
+        recipe3.ingredients.add(self.beans, self.salt)
+        recipe4 = sample_recipe(user=self.user, title='Plain rice')
+        recipe4.ingredients.add(self.rice)
+
+        ids = self.ids({
+            'tags': f'{self.vegan.id}',
+            'ingredients': f'{self.rice.id},{self.beans.id},{self.salt.id}',
+            'ordering': 'matches',
+        })
+
+        # the tags and the ingredients are both required
+        self.assertEqual(ids, [recipe2.id])
+
+        ids = self.ids({
+            'ingredients': f'{self.rice.id},{self.beans.id},{self.salt.id}',
+            'ordering': 'matches',
+        })
+
+        # 3 matches, then 2 matches with the newest first, then 1 match
+        self.assertEqual(ids, [recipe2.id, recipe3.id, recipe1.id, recipe4.id])
+
+    def test_order_by_matches_paginated(self):
+        """Test that the cursor pages follow the number of matches"""
+        recipes = []
+        for count in (1, 2, 1, 2):
+            recipe = sample_recipe(user=self.user)
+            recipe.ingredients.add(*[self.rice, self.beans][:count])
+            recipes.append(recipe)
+
+        params = {
+            'ingredients': f'{self.rice.id},{self.beans.id}',
+            'ordering': 'matches',
+            'page_size': 3,
+        }
+        res = self.client.get(RECIPES_URL, params)
+        first = [recipe['id'] for recipe in res.data['results']]
+        res = self.client.get(res.data['next'])
+        second = [recipe['id'] for recipe in res.data['results']]
+
+        self.assertEqual(
+            first + second,
+            [recipes[3].id, recipes[1].id, recipes[2].id, recipes[0].id]
+        )
+
+    def test_invalid_match(self):
+        """Test that an unknown match mode is rejected"""
+        res = self.client.get(RECIPES_URL, {'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('match', res.data)
+
+    def test_invalid_ids(self):
+        """Test that ids that aren't numbers are rejected"""
+        res = self.client.get(RECIPES_URL, {'tags': '1,abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+
+class RecipeRangeTests(TestCase):
+    """Test filtering and sorting the recipes by time and cost"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.quick = sample_recipe(user=self.user, time_minutes=5, cost=9)
+        self.slow = sample_recipe(user=self.user, time_minutes=60, cost=2)
+        self.medium = sample_recipe(user=self.user, time_minutes=20, cost=5)
+        self.cheap = sample_recipe(user=self.user, time_minutes=20, cost=2)
+
+    def ids(self, params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data]
+
+    def test_filter_by_time(self):
+        """Test returning the recipes within the time limits"""
+        ids = self.ids({'min_time': 10, 'max_time': 20})
+
+        self.assertEqual(ids, [self.cheap.id, self.medium.id])
+
+    def test_filter_by_cost(self):
+        """Test returning the recipes within the cost limits"""
+        ids = self.ids({'max_cost': '4.50'})
+
+        self.assertEqual(ids, [self.cheap.id, self.slow.id])
+
+    def test_order_by_time(self):
+        """Test sorting the recipes by time, the id breaking the ties"""
+        ids = self.ids({'ordering': 'time_minutes'})
+
+        self.assertEqual(
+            ids,
+            [self.quick.id, self.medium.id, self.cheap.id, self.slow.id]
+        )
+
+    def test_order_by_cost_descending_paginated(self):
+        """Test that the cursor pages follow the cost ordering"""
+        params = {'ordering': '-cost', 'page_size': 2}
+        res = self.client.get(RECIPES_URL, params)
+        first = [recipe['id'] for recipe in res.data['results']]
+        res = self.client.get(res.data['next'])
+        second = [recipe['id'] for recipe in res.data['results']]
+
+        self.assertEqual(
+            first + second,
+            [self.quick.id, self.medium.id, self.cheap.id, self.slow.id]
+        )
+
+    def test_invalid_params(self):
+        """Test that invalid limits and orderings are rejected"""
+        invalid = (
+            {'min_time': 'abc'},
+            {'min_cost': '-1'},
+            {'min_time': 30, 'max_time': 10},
+            {'ordering': 'title'},
+            {'ordering': 'matches'},
+        )
+        for params in invalid:
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
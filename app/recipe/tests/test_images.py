@@ -0,0 +1,314 @@
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeImageJob
+
+from recipe.tasks import _run_in_thread, requeue_image_jobs
+
+MEDIA_ROOT = tempfile.mkdtemp()
+IMAGE_JOBS_URL = reverse('recipe:recipeimagejob-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def image_upload_url(recipe_id):
+    """Return URL for recipe image upload"""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'cost': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def sample_image(size=(2000, 1000), orientation=None):
+    """Return a JPEG file, optionally with an EXIF orientation"""
+    img = Image.new('RGB', size, color='red')
+    options = {}
+    if orientation is not None:
+        # minimal EXIF block with only the orientation tag
+        options['exif'] = (
+            b'Exif\x00\x00MM\x00*\x00\x00\x00\x08\x00\x01'
+            b'\x01\x12\x00\x03\x00\x00\x00\x01' +
+            bytes([0, orientation, 0, 0]) +
+            b'\x00\x00\x00\x00'
+        )
+    image_file = io.BytesIO()
+    img.save(image_file, format='JPEG', **options)
+    image_file.name = 'photo.jpg'
+    image_file.seek(0)
+
+    return image_file
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RECIPE_IMAGE_QUEUE='sync')
+class RecipeImagePipelineTests(TestCase):
+    """Test the processing of the uploaded recipe images"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def test_upload_creates_renditions(self):
+        """Test that the renditions are created for the uploaded image"""
+        res = self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': sample_image()},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.recipe.refresh_from_db()
+        job = RecipeImageJob.objects.get(pk=res.data['job']['id'])
+        self.assertEqual(job.status, RecipeImageJob.STATUS_DONE)
+        self.assertEqual(job.image, self.recipe.image.name)
+        self.assertEqual(
+            sorted(self.recipe.image_renditions, key=int),
+            ['128', '512', '1024']
+        )
+        for image_format in ('webp', 'jpeg'):
+            path = self.recipe.image_renditions['512'][image_format]
+            with default_storage.open(path) as image_file:
+                img = Image.open(image_file)
+                self.assertEqual(img.format, image_format.upper())
+                self.assertEqual(img.size, (512, 256))
+
+    def test_upload_applies_exif_orientation(self):
+        """Test that the renditions are rotated as the EXIF says"""
+        # 6 means the camera was turned 90 degrees clockwise
+        self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': sample_image(orientation=6)},
+            format='multipart'
+        )
+
+        self.recipe.refresh_from_db()
+        path = self.recipe.image_renditions['128']['jpeg']
+        with default_storage.open(path) as image_file:
+            self.assertEqual(Image.open(image_file).size, (64, 128))
+
+    def test_new_upload_replaces_renditions(self):
+        """Test that the renditions of the previous image are deleted"""
+        url = image_upload_url(self.recipe.id)
+        self.client.post(url, {'image': sample_image()}, format='multipart')
+        self.recipe.refresh_from_db()
+        old_path = self.recipe.image_renditions['128']['jpeg']
+
+        self.client.post(url, {'image': sample_image()}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertNotEqual(self.recipe.image_renditions['128']['jpeg'],
+                            old_path)
+        self.assertFalse(default_storage.exists(old_path))
+
+    def test_invalid_image_job_failed(self):
+        """Test that a stored image that can't be decoded fails the job"""
+        job = RecipeImageJob.objects.create(
+            recipe=self.recipe,
+            image='missing.jpg'
+        )
+
+        call_command('process_image_jobs', once=True, stdout=io.StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, RecipeImageJob.STATUS_FAILED)
+        self.assertTrue(job.error)
+
+    @override_settings(RECIPE_IMAGE_QUEUE='db')
+    def test_database_queue(self):
+        """Test that the database queue is processed by the command"""
+        res = self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': sample_image()},
+            format='multipart'
+        )
+        self.assertEqual(
+            res.data['job']['status'],
+            RecipeImageJob.STATUS_PENDING
+        )
+
+        call_command('process_image_jobs', once=True, stdout=io.StringIO())
+
+        res = self.client.get(IMAGE_JOBS_URL)
+        self.assertEqual(res.data[0]['status'], RecipeImageJob.STATUS_DONE)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image_renditions)
+
+    def create_stalled_job(self):
+        """Create a running job that stopped making progress"""
+        job = RecipeImageJob.objects.create(
+            recipe=self.recipe,
+            image='missing.jpg',
+            status=RecipeImageJob.STATUS_RUNNING
+        )
+        RecipeImageJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(
+                seconds=settings.RECIPE_IMAGE_STALE_SECONDS + 1
+            )
+        )
+        return job
+
+    def test_stalled_job_processed_again(self):
+        """Test that the command takes the running jobs that stalled"""
+        running = RecipeImageJob.objects.create(
+            recipe=self.recipe,
+            image='missing.jpg',
+            status=RecipeImageJob.STATUS_RUNNING
+        )
+        stalled = self.create_stalled_job()
+
+        call_command('process_image_jobs', once=True, stdout=io.StringIO())
+
+        running.refresh_from_db()
+        stalled.refresh_from_db()
+        self.assertEqual(running.status, RecipeImageJob.STATUS_RUNNING)
+        self.assertEqual(stalled.status, RecipeImageJob.STATUS_FAILED)
+
+    @override_settings(RECIPE_IMAGE_QUEUE='thread')
+    def test_requeue_image_jobs(self):
+        """Test that the jobs lost by a restart are queued again"""
+        pending = RecipeImageJob.objects.create(
+            recipe=self.recipe,
+            image='missing.jpg'
+        )
+        RecipeImageJob.objects.create(
+            recipe=self.recipe,
+            image='missing.jpg',
+            status=RecipeImageJob.STATUS_RUNNING
+        )
+        stalled = self.create_stalled_job()
+
+        with patch('recipe.tasks.get_executor') as get_executor:
+            self.assertEqual(requeue_image_jobs(), 2)
+
+        get_executor.return_value.submit.assert_any_call(
+            _run_in_thread,
+            pending.pk
+        )
+        get_executor.return_value.submit.assert_any_call(
+            _run_in_thread,
+            stalled.pk
+        )
+
+    def test_image_jobs_limited_to_user(self):
+        """Test that only the jobs of the user recipes are returned"""
+        user2 = get_user_model().objects.create_user(
+            'test2@test.com',
+            '123'
+        )
+        recipe2 = sample_recipe(user=user2)
+        RecipeImageJob.objects.create(recipe=recipe2, image='other.jpg')
+        job = RecipeImageJob.objects.create(
+            recipe=self.recipe,
+            image='photo.jpg'
+        )
+
+        res = self.client.get(IMAGE_JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.data], [job.id])
+
+    def test_image_jobs_by_recipe(self):
+        """Test filtering the jobs by recipe, rejecting invalid ids"""
+        recipe2 = sample_recipe(user=self.user)
+        RecipeImageJob.objects.create(recipe=recipe2, image='other.jpg')
+        job = RecipeImageJob.objects.create(
+            recipe=self.recipe,
+            image='photo.jpg'
+        )
+
+        res = self.client.get(IMAGE_JOBS_URL, {'recipe': self.recipe.id})
+        invalid = self.client.get(IMAGE_JOBS_URL, {'recipe': 'abc'})
+
+        self.assertEqual([item['id'] for item in res.data], [job.id])
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('recipe', invalid.data)
+
+    def test_list_image_url_by_size(self):
+        """Test that the list returns the rendition of the requested size"""
+        self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': sample_image()},
+            format='multipart'
+        )
+        self.recipe.refresh_from_db()
+        renditions = self.recipe.image_renditions
+
+        res = self.client.get(RECIPES_URL)
+        self.assertTrue(
+            res.data[0]['image'].endswith(renditions['128']['jpeg'])
+        )
+        self.assertTrue(
+            res.data[0]['images']['1024']['webp'].endswith(
+                renditions['1024']['webp']
+            )
+        )
+
+        # the smallest rendition that is large enough is chosen
+        res = self.client.get(RECIPES_URL, {'image_size': 600})
+        self.assertTrue(
+            res.data[0]['image'].endswith(renditions['1024']['jpeg'])
+        )
+
+        res = self.client.get(detail_url(self.recipe.id), {'image_size': 4000})
+        self.assertTrue(
+            res.data['image'].endswith(renditions['1024']['jpeg'])
+        )
+
+    @override_settings(RECIPE_IMAGE_QUEUE='db')
+    def test_image_url_before_renditions(self):
+        """Test that the original is returned while it is processed"""
+        self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': sample_image()},
+            format='multipart'
+        )
+        self.recipe.refresh_from_db()
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertTrue(res.data['image'].endswith(self.recipe.image.name))
+        self.assertEqual(res.data['images'], {})
+
+    def test_invalid_image_size(self):
+        """Test that the image size must be an integer"""
+        res = self.client.get(RECIPES_URL, {'image_size': 'large'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,418 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe, RecipeImport
+from recipe import importer
+from recipe.importer import run_import
+
+MEDIA_ROOT = tempfile.mkdtemp()
+IMPORTS_URL = reverse('recipe:recipeimport-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def resume_url(import_id):
+    """Return the URL to resume an import"""
+    return reverse('recipe:recipeimport-resume', args=[import_id])
+
+
+def ndjson(*rows):
+    """Return the rows as an NDJSON file"""
+    return io.BytesIO(
+        b''.join(json.dumps(row).encode() + b'\n' for row in rows)
+    )
+
+
+def sample_row(title='Sample recipe', **params):
+    """Return a recipe row of an import file"""
+    row = {'title': title, 'time_minutes': 10, 'cost': '5.00'}
+    row.update(params)
+
+    return row
+
+
+class RecipeImporterTests(TestCase):
+    """Test importing files of recipes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+
+    def create_import(self, file_format=RecipeImport.FORMAT_NDJSON):
+        return RecipeImport.objects.create(
+            user=self.user,
+            file='recipes',
+            format=file_format
+        )
+
+    def titles(self):
+        return list(
+            Recipe.objects.filter(user=self.user).order_by('id').values_list(
+                'title',
+                flat=True
+            )
+        )
+
+    def test_import_ndjson(self):
+        """Test importing recipes with the names of their relations"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        file = ndjson(
+            sample_row('Rice', tags=['Vegan', 'Quick'],
+                       ingredients=['Rice', 'Salt', 'Rice']),
+            sample_row('Beans', tags=['quick'], ingredients=['Beans']),
+        )
+
+        recipe_import = run_import(self.create_import(), file)
+
+        self.assertEqual(recipe_import.status, RecipeImport.STATUS_DONE)
+        self.assertEqual(recipe_import.rows, 2)
+        self.assertEqual(recipe_import.imported, 2)
+        recipe = Recipe.objects.get(user=self.user, title='Rice')
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Quick', 'Vegan']
+        )
+        self.assertIn(tag, recipe.tags.all())
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', flat=True)),
+            ['Rice', 'Salt']
+        )
+        # the missing names were created once, regardless of case
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(),
+            3
+        )
+        # the recipes can be searched
+        self.assertTrue(
+            Recipe.objects.filter(pk=recipe.pk, search_vector='salt').exists()
+        )
+
+    def test_import_csv(self):
+        """Test importing recipes from a CSV file"""
+        file = io.BytesIO(
+            'title,time_minutes,cost,link,tags,ingredients\n'
+            'Café,5,1.50,,Breakfast | Quick,Coffee\n'
+            '"Rice, beans",20,3,http://example.com,,Rice|Beans\n'.encode()
+        )
+
+        recipe_import = run_import(
+            self.create_import(RecipeImport.FORMAT_CSV),
+            file
+        )
+
+        self.assertEqual(recipe_import.imported, 2)
+        self.assertEqual(self.titles(), ['Café', 'Rice, beans'])
+        recipe = Recipe.objects.get(title='Café')
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Breakfast', 'Quick']
+        )
+
+    def test_invalid_rows(self):
+        """Test that invalid rows are reported and the others imported"""
+        file = io.BytesIO(
+            json.dumps(sample_row('First')).encode() + b'\n'
+            b'not json\n'
+            b'\n' +
+            json.dumps(sample_row('Bad', cost='abc')).encode() + b'\n' +
+            json.dumps(sample_row('Bad id', tags=[99])).encode() + b'\n' +
+            json.dumps(sample_row('Last')).encode() + b'\n'
+        )
+
+        recipe_import = run_import(self.create_import(), file)
+
+        self.assertEqual(recipe_import.status, RecipeImport.STATUS_DONE)
+        self.assertEqual(self.titles(), ['First', 'Last'])
+        self.assertEqual(recipe_import.failed, 3)
+        self.assertEqual(
+            [error['row'] for error in recipe_import.errors],
+            [2, 3, 4]
+        )
+        self.assertIn('cost', recipe_import.errors[1]['errors'])
+        self.assertIn('tags', recipe_import.errors[2]['errors'])
+
+    def test_resume_after_failed_chunk(self):
+        """Test that a failed import resumes after its last chunk"""
+        rows = [sample_row(f'Recipe {index}') for index in range(5)]
+        update_search_vector = importer.update_search_vector
+        calls = []
+
+        def fail_second_chunk(recipe_ids):
+            calls.append(recipe_ids)
+            if len(calls) == 2:
+                raise RuntimeError('Database went away')
+            update_search_vector(recipe_ids)
+
+        with patch.object(
+            importer,
+            'update_search_vector',
+            fail_second_chunk
+        ), self.assertLogs('recipe.importer', 'ERROR'):
+            recipe_import = run_import(
+                self.create_import(),
+                ndjson(*rows),
+                chunk_size=2
+            )
+
+        self.assertEqual(recipe_import.status, RecipeImport.STATUS_FAILED)
+        self.assertEqual(recipe_import.error, 'Database went away')
+        self.assertEqual(recipe_import.rows, 2)
+        self.assertEqual(self.titles(), ['Recipe 0', 'Recipe 1'])
+
+        recipe_import = run_import(recipe_import, ndjson(*rows), chunk_size=2)
+
+        self.assertEqual(recipe_import.status, RecipeImport.STATUS_DONE)
+        self.assertEqual(recipe_import.imported, 5)
+        self.assertEqual(
+            self.titles(),
+            [f'Recipe {index}' for index in range(5)]
+        )
+
+    def test_import_export(self):
+        """Test importing the export of another user"""
+        other = get_user_model().objects.create_user('other@test.com', '123')
+        tag = Tag.objects.create(user=other, name='Vegan')
+        Tag.objects.create(user=other, name='Unused')
+        recipe = Recipe.objects.create(
+            user=other,
+            title='Curry',
+            time_minutes=30,
+            cost='7.50'
+        )
+        recipe.tags.add(tag)
+        client = APIClient()
+        client.force_authenticate(other)
+        res = client.get(EXPORT_URL, {'format': 'ndjson'})
+        file = io.BytesIO(b''.join(res.streaming_content))
+
+        recipe_import = run_import(self.create_import(), file)
+
+        self.assertEqual(recipe_import.rows, 3)
+        self.assertEqual(recipe_import.failed, 0)
+        imported = Recipe.objects.get(user=self.user)
+        self.assertEqual(imported.title, 'Curry')
+        self.assertEqual(
+            list(imported.tags.values_list('name', flat=True)),
+            ['Vegan']
+        )
+        self.assertEqual(
+            sorted(Tag.objects.filter(user=self.user).values_list(
+                'name',
+                flat=True
+            )),
+            ['Unused', 'Vegan']
+        )
+
+    def test_import_invalidates_cache(self):
+        """Test that the cached lists show the imported recipes"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(RECIPES_URL).data, [])
+
+        run_import(self.create_import(), ndjson(sample_row('New')))
+
+        res = client.get(RECIPES_URL)
+        self.assertEqual([recipe['title'] for recipe in res.data], ['New'])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RECIPE_IMPORT_QUEUE='sync')
+class RecipeImportApiTests(TestCase):
+    """Test uploading files of recipes"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, **data):
+        upload = SimpleUploadedFile(name, content)
+        return self.client.post(
+            IMPORTS_URL,
+            dict(data, upload=upload),
+            format='multipart'
+        )
+
+    def test_upload_import(self):
+        """Test uploading a file imports its recipes"""
+        res = self.upload(
+            'recipes.ndjson',
+            ndjson(sample_row('Uploaded')).getvalue()
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['status'], RecipeImport.STATUS_DONE)
+        self.assertEqual(res.data['imported'], 1)
+        self.assertTrue(
+            Recipe.objects.filter(user=self.user, title='Uploaded').exists()
+        )
+
+    def test_upload_unknown_format(self):
+        """Test that the format is required for unknown extensions"""
+        res = self.upload('recipes.txt', b'')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.upload('recipes.txt', b'title\n', format='csv')
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+
+    def test_imports_limited_to_user(self):
+        """Test that only the imports of the user are listed"""
+        other = get_user_model().objects.create_user('other@test.com', '123')
+        RecipeImport.objects.create(user=other, file='x', format='csv')
+        recipe_import = RecipeImport.objects.create(
+            user=self.user,
+            file='y',
+            format='csv'
+        )
+
+        res = self.client.get(IMPORTS_URL)
+
+        self.assertEqual([item['id'] for item in res.data], [recipe_import.id])
+
+    def test_resume_only_failed(self):
+        """Test that the finished imports can't be resumed"""
+        recipe_import = RecipeImport.objects.create(
+            user=self.user,
+            file='y',
+            format='csv',
+            status=RecipeImport.STATUS_DONE
+        )
+
+        res = self.client.post(resume_url(recipe_import.id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_resume_stalled_import(self):
+        """Test that a running import that stopped can be resumed"""
+        recipe_import = RecipeImport.objects.create(
+            user=self.user,
+            file=default_storage.save(
+                'recipes.ndjson',
+                ndjson(sample_row('Resumed'))
+            ),
+            format=RecipeImport.FORMAT_NDJSON,
+            status=RecipeImport.STATUS_RUNNING
+        )
+
+        # still making progress
+        res = self.client.post(resume_url(recipe_import.id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        RecipeImport.objects.filter(pk=recipe_import.pk).update(
+            updated_at=timezone.now() - timedelta(
+                seconds=settings.RECIPE_IMPORT_STALE_SECONDS + 1
+            )
+        )
+        res = self.client.post(resume_url(recipe_import.id))
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['status'], RecipeImport.STATUS_DONE)
+        self.assertTrue(
+            Recipe.objects.filter(user=self.user, title='Resumed').exists()
+        )
+
+
+class ImportRecipesCommandTests(TestCase):
+    """Test the import_recipes command"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        handle, self.path = tempfile.mkstemp(suffix='.ndjson')
+        with os.fdopen(handle, 'wb') as file:
+            file.write(ndjson(
+                *[sample_row(f'Recipe {index}') for index in range(3)]
+            ).getvalue())
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_import_recipes(self):
+        """Test importing a file with progress reports"""
+        out = io.StringIO()
+        call_command(
+            'import_recipes',
+            'test@test.com',
+            self.path,
+            chunk_size=2,
+            stdout=out
+        )
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+        self.assertIn('2 rows, 2 recipes', out.getvalue())
+        self.assertIn('Imported 3 recipes', out.getvalue())
+
+    @override_settings(MEDIA_ROOT=MEDIA_ROOT)
+    def test_resume_uploaded_import(self):
+        """Test resuming an import of an uploaded file"""
+        recipe_import = RecipeImport.objects.create(
+            user=self.user,
+            file=default_storage.save(
+                'recipes.ndjson',
+                ndjson(sample_row('Uploaded'))
+            ),
+            format=RecipeImport.FORMAT_NDJSON,
+            status=RecipeImport.STATUS_FAILED
+        )
+
+        call_command(
+            'import_recipes',
+            'test@test.com',
+            resume=recipe_import.id,
+            stdout=io.StringIO()
+        )
+
+        self.assertTrue(
+            Recipe.objects.filter(user=self.user, title='Uploaded').exists()
+        )
+        default_storage.delete(recipe_import.file)
+
+    def test_resume_done_import(self):
+        """Test that a finished import can't be resumed"""
+        call_command(
+            'import_recipes',
+            'test@test.com',
+            self.path,
+            stdout=io.StringIO()
+        )
+        recipe_import = RecipeImport.objects.get(user=self.user)
+
+        with self.assertRaises(CommandError):
+            call_command(
+                'import_recipes',
+                'test@test.com',
+                resume=recipe_import.id,
+                stdout=io.StringIO()
+            )
@@ -4,7 +4,9 @@ import tempfile
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -171,6 +173,110 @@ class PrivateRecipeAPITessts(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_names(self):
+        """Test creating a recipe with the names of tags and ingredients"""
+        vegan = sample_tag(user=self.user, name='Vegan')
+        dessert = sample_tag(user=self.user, name='Dessert')
+        payload = {
+            'title': 'Avocado lime cheesecake',
+            'tags': ['vegan', 'Quick', dessert.id, 'QUICK'],
+            'ingredients': ['Avocado', 'Lime'],
+            'time_minutes': 30,
+            'cost': 15.00
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        quick = Tag.objects.get(user=self.user, name='Quick')
+        self.assertEqual(
+            sorted(res.data['tags']),
+            sorted([vegan.id, dessert.id, quick.id])
+        )
+        self.assertEqual(recipe.tags.count(), 3)
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', flat=True)),
+            ['Avocado', 'Lime']
+        )
+
+    def test_create_recipe_with_invalid_names(self):
+        """Test that blank names are rejected and nothing is created"""
+        payload = {
+            'title': 'Avocado lime cheesecake',
+            'tags': ['Vegan', ' '],
+            'time_minutes': 30,
+            'cost': 15.00
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_create_recipe_names_query_count(self):
+        """Test that the names are resolved and created in batches"""
+        sample_ingredient(user=self.user, name='Salt')
+
+        def create_recipe(count):
+            payload = {
+                'title': 'Thai prawn red curry',
+                'tags': [],
+                'ingredients': ['salt'] + [
+                    f'Ingredient {count} {i}' for i in range(count)
+                ],
+                'time_minutes': 40,
+                'cost': 25.00
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(create_recipe(1), create_recipe(20))
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 22)
+
+    def test_create_recipe_with_other_user_tags(self):
+        """Test that tags of other users are rejected together"""
+        user2 = get_user_model().objects.create_user(
+            'teste2@teste.com',
+            '123'
+        )
+        tag1 = sample_tag(user=user2, name='Vegan')
+        tag2 = sample_tag(user=user2, name='Dessert')
+        payload = {
+            'title': 'Avocado lime cheesecake',
+            'tags': [tag1.id, tag2.id],
+            'time_minutes': 30,
+            'cost': 15.00
+        }
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(tag1.id), res.data['tags'][0])
+        self.assertIn(str(tag2.id), res.data['tags'][0])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_ingredients_query_count(self):
+        """Test that the ingredient ids are validated with one query"""
+        ingredients = [
+            sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            for i in range(20)
+        ]
+
+        def create_recipe(count):
+            payload = {
+                'title': 'Thai prawn red curry',
+                'ingredients': [i.id for i in ingredients[:count]],
+                'time_minutes': 40,
+                'cost': 25.00
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(RECIPES_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(create_recipe(1), create_recipe(20))
+
     def test_partial_update_recipe(self):
         """Test updating a recipe with patch"""
         recipe = sample_recipe(user=self.user)
@@ -192,6 +298,71 @@ class PrivateRecipeAPITessts(TestCase):
         self.assertEqual(len(tags), 1)
         self.assertIn(new_tag, tags)
 
+    def test_list_recipes_query_count(self):
+        """Test listing recipes uses a fixed number of queries"""
+        for i in range(10):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            )
+
+        # one query for the conditional request validators, one for the
+        # recipes and one for each many to many relation
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 10)
+
+    def test_filter_recipes_query_count(self):
+        """Test filtering recipes uses a fixed number of queries"""
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        for i in range(10):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+        with self.assertNumQueries(4):
+            res = self.client.get(
+                RECIPES_URL,
+                {'tags': f'{tag.id}', 'ingredients': f'{ingredient.id}'}
+            )
+
+        self.assertEqual(len(res.data), 10)
+
+    def test_view_recipe_detail_query_count(self):
+        """Test viewing a recipe detail uses a fixed number of queries"""
+        recipe = sample_recipe(user=self.user)
+        for i in range(10):
+            recipe.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            )
+
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(len(res.data['tags']), 10)
+        self.assertEqual(len(res.data['ingredients']), 10)
+
+    def test_retrieve_recipes_paginated(self):
+        """Test paging through recipes with a cursor"""
+        for i in range(5):
+            sample_recipe(user=self.user, title=f'Recipe {i}')
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        ids = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids.extend(recipe['id'] for recipe in res.data['results'])
+
+        expected = Recipe.objects.order_by('-id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+
     def full_update_recipe(self):
         """Test updating a recipe with put"""
         recipe = sample_recipe(user=self.user)
@@ -251,8 +422,11 @@ class RecipeImageUploadTests(TestCase):
             res = self.client.post(url, {'image': ntf}, format='multipart')
 
         self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # the renditions are created in background, so the upload is only
+        # accepted
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn('image', res.data)
+        self.assertIn('job', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
     def test_upload_image_bad_request(self):
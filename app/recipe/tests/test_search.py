@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'cost': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeSearchTests(TestCase):
+    """Test searching the recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text, **params):
+        res = self.client.get(RECIPES_URL, dict(params, q=text))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_search_title_tags_and_ingredients(self):
+        """Test that the title, tag and ingredient names are searched"""
+        by_title = sample_recipe(user=self.user, title='Chicken curry')
+        by_tag = sample_recipe(user=self.user, title='Roast')
+        by_tag.tags.add(Tag.objects.create(user=self.user, name='Chicken'))
+        by_ingredient = sample_recipe(user=self.user, title='Salad')
+        by_ingredient.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Chicken breast')
+        )
+        sample_recipe(user=self.user, title='Porridge')
+
+        res = self.search('chicken')
+
+        # the title weighs more than the tags, which weigh more than the
+        # ingredients
+        self.assertEqual(
+            [recipe['id'] for recipe in res],
+            [by_title.id, by_tag.id, by_ingredient.id]
+        )
+
+    def test_search_stemmed_words(self):
+        """Test that the words are searched by their stem"""
+        recipe = sample_recipe(user=self.user, title='Baked potatoes')
+
+        res = self.search('potato bake')
+
+        self.assertEqual([item['id'] for item in res], [recipe.id])
+
+    def test_search_misspelled_title(self):
+        """Test that the trigram similarity finds misspelled titles"""
+        recipe = sample_recipe(user=self.user, title='Chicken curry')
+
+        res = self.search('chiken cury')
+
+        self.assertEqual([item['id'] for item in res], [recipe.id])
+
+    def test_search_other_user_recipes(self):
+        """Test that the recipes of other users are not found"""
+        user2 = get_user_model().objects.create_user('test2@test.com', '123')
+        sample_recipe(user=user2, title='Chicken curry')
+
+        self.assertEqual(self.search('chicken'), [])
+
+    def test_search_paginated(self):
+        """Test that the search results can be paginated by rank"""
+        for title in ('Chicken', 'Chicken curry', 'Chicken and rice'):
+            sample_recipe(user=self.user, title=title)
+        expected = [item['id'] for item in self.search('chicken')]
+
+        page = self.search('chicken', page_size=2)
+        ids = [item['id'] for item in page['results']]
+        page = self.client.get(page['next']).data
+        ids += [item['id'] for item in page['results']]
+
+        self.assertEqual(ids, expected)
+        self.assertIsNone(page['next'])
+
+    def test_index_follows_relations(self):
+        """Test that the index follows the changes of the relations"""
+        recipe = sample_recipe(user=self.user, title='Roast')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        recipe.tags.add(tag)
+        self.assertEqual(len(self.search('vegan')), 1)
+
+        tag.name = 'Dessert'
+        tag.save()
+        self.assertEqual(len(self.search('vegan')), 0)
+        self.assertEqual(len(self.search('dessert')), 1)
+
+        tag.recipe_set.clear()
+        self.assertEqual(len(self.search('dessert')), 0)
+
+        recipe.tags.add(tag)
+        tag.delete()
+        self.assertEqual(len(self.search('dessert')), 0)
+
+    def test_index_follows_bulk_changes(self):
+        """Test that the bulk endpoints keep the index up to date"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{
+            'title': 'Roast',
+            'time_minutes': 10,
+            'cost': '5.00',
+            'tags': [tag.id],
+            'ingredients': [],
+        }]
+        self.client.post(RECIPES_BULK_URL, payload, format='json')
+        self.assertEqual(len(self.search('vegan roast')), 1)
+
+        self.client.patch(
+            TAGS_BULK_URL,
+            [{'id': tag.id, 'name': 'Dessert'}],
+            format='json'
+        )
+        self.assertEqual(len(self.search('dessert')), 1)
@@ -79,6 +79,16 @@ class PrivateTagsApiTests(TestCase):
         ).exists()
         self.assertTrue(exists)
 
+    def test_create_tag_existing_name(self):
+        """Test that creating a tag with an existing name returns it"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'vegan'})
+
+        self.assertEqual(res.data['id'], tag.id)
+        self.assertEqual(res.data['name'], 'Vegan')
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_create_tag_invalid(self):
         """Test creating a new tag with invalid payload"""
         payload = {'name': ''}
@@ -134,3 +144,26 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_retrieve_tags_paginated(self):
+        """Test paging through tags keeps the name ordering"""
+        for name in ('Vegan', 'Dessert', 'Brunch', 'Lunch', 'Dinner'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        names = [tag['name'] for tag in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            names.extend(tag['name'] for tag in res.data['results'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            names,
+            ['Vegan', 'Lunch', 'Dinner', 'Dessert', 'Brunch']
+        )
+
+    def test_retrieve_tags_invalid_cursor(self):
+        """Test that an invalid cursor returns not found"""
+        res = self.client.get(TAGS_URL, {'cursor': 'invalid'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
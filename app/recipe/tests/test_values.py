@@ -0,0 +1,179 @@
+import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import mixins
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import renderers, views
+from recipe.renderers import FastJSONRenderer
+
+
+class SerializerListMixin:
+    """List with the serializer of the view and the json module"""
+    renderer_classes = (JSONRenderer,)
+
+    def list(self, request, *args, **kwargs):
+        return mixins.ListModelMixin.list(self, request, *args, **kwargs)
+
+
+class SerializerTagViewSet(SerializerListMixin, views.TagViewSet):
+    pass
+
+
+class SerializerIngredientViewSet(SerializerListMixin,
+                                  views.IngredientViewSet):
+    pass
+
+
+class SerializerRecipeViewSet(SerializerListMixin, views.RecipeViewSet):
+    # the relations in the order of the values() lists, by id
+    prefetch_for_action = dict(
+        views.RecipeViewSet.prefetch_for_action,
+        list=views.RecipeViewSet.prefetch_for_action['retrieve']
+    )
+
+
+class ValuesListContractTests(TestCase):
+    """Test that the values() lists render the bytes of the serializers"""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Quick\u2028and easy', 'Café')
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Rice', 'Beans', 'Salt')
+        ]
+        for index in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe "{index}" é',
+                time_minutes=index * 10,
+                cost=Decimal('1.5') * index,
+                link='' if index % 2 else f'https://example.com/{index}'
+            )
+            recipe.tags.add(*tags[index % 3:])
+            recipe.ingredients.add(*ingredients[:index % 4])
+        recipe.image = 'uploads/recipe/sample.jpg'
+        recipe.image_renditions = {
+            '128': {
+                'webp': 'uploads/recipe/sample_128.webp',
+                'jpeg': 'uploads/recipe/sample_128.jpg',
+            },
+            '512': {
+                'webp': 'uploads/recipe/sample_512.webp',
+                'jpeg': 'uploads/recipe/sample_512.jpg',
+            },
+        }
+        recipe.save()
+
+    def render(self, viewset, params):
+        view = viewset.as_view({'get': 'list'})
+        request = self.factory.get('/', params)
+        force_authenticate(request, self.user)
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+
+        return response.render().content
+
+    def assertSameContent(self, fast_viewset, serializer_viewset, params):
+        expected = self.render(serializer_viewset, params)
+        self.assertEqual(self.render(fast_viewset, params), expected)
+        # and without orjson
+        with patch.object(renderers, 'orjson', None):
+            self.assertEqual(self.render(fast_viewset, params), expected)
+
+    def test_tags(self):
+        """Test the lists of tags"""
+        for params in ({}, {'fields': 'name'}, {'page_size': 2},
+                       {'assigned_only': 1}):
+            self.assertSameContent(
+                views.TagViewSet,
+                SerializerTagViewSet,
+                params
+            )
+
+    def test_ingredients(self):
+        """Test the lists of ingredients"""
+        for params in ({}, {'fields': 'id'}, {'page_size': 2}):
+            self.assertSameContent(
+                views.IngredientViewSet,
+                SerializerIngredientViewSet,
+                params
+            )
+
+    def test_recipes(self):
+        """Test the lists of recipes"""
+        tag = Tag.objects.get(name='Vegan')
+        for params in (
+            {},
+            {'fields': 'id,title,image'},
+            {'expand': 'tags,ingredients'},
+            {'fields': 'cost', 'expand': 'tags'},
+            {'image_size': 512},
+            {'ordering': 'cost', 'page_size': 2},
+            {'tags': tag.id, 'ordering': 'matches', 'page_size': 2},
+            {'q': 'recipe', 'page_size': 3},
+        ):
+            self.assertSameContent(
+                views.RecipeViewSet,
+                SerializerRecipeViewSet,
+                params
+            )
+
+
+class FastJSONRendererTests(TestCase):
+    """Test that FastJSONRenderer writes the bytes of JSONRenderer"""
+
+    def test_same_bytes(self):
+        """Test the types the api renders"""
+        data = [
+            None,
+            {
+                'text': 'a "quote" \\ café \u2028\u2029 \U0001f600 \x00',
+                'lazy': _('Not found.'),
+                'int': 2 ** 40,
+                'bool': True,
+                'decimal': Decimal('12.50'),
+                'datetime': timezone.now(),
+                'naive': datetime.datetime(2020, 1, 2, 3, 4, 5, 123456),
+                'date': datetime.date(2020, 1, 2),
+                'time': datetime.time(3, 4, 5, 120000),
+                'nested': {'list': [1, 'two', None], 'tuple': (1, 2)},
+            },
+        ]
+        for value in data:
+            self.assertEqual(
+                FastJSONRenderer().render(value),
+                JSONRenderer().render(value)
+            )
+
+    def test_fallback(self):
+        """Test the values orjson can't encode"""
+        for value in ({1: 'int key'}, {'big': 2 ** 70}):
+            self.assertEqual(
+                FastJSONRenderer().render(value),
+                JSONRenderer().render(value)
+            )
+
+    def test_indent(self):
+        """Test that the indented responses use the json module"""
+        context = {'indent': 2}
+        self.assertEqual(
+            FastJSONRenderer().render({'a': [1]}, renderer_context=context),
+            JSONRenderer().render({'a': [1]}, renderer_context=context)
+        )
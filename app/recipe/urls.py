@@ -11,6 +11,8 @@ router = DefaultRouter()
 router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
 router.register('recipes', views.RecipeViewSet)
+router.register('image-jobs', views.RecipeImageJobViewSet)
+router.register('imports', views.RecipeImportViewSet)
 
 app_name = 'recipe'
 
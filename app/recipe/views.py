@@ -1,19 +1,294 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.db.models import Count, Exists, IntegerField, OuterRef, \
+    Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 
-from core.models import Tag, Ingredient, Recipe
+from core.db.routers import ReplicaReadMixin
+from core.models import Tag, Ingredient, Recipe, RecipeImageJob, \
+    RecipeImport, recipe_import_file_path
 from recipe import serializers
+from recipe.cache import cached_response, invalidate_user_cache
+from recipe.conditional import conditional_response
+from recipe.export import NDJSONRenderer, json_stream, ndjson_stream
+from recipe.pagination import KeysetPagination
+from recipe.renderers import API_RENDERER_CLASSES, FastJSONRenderer
+from recipe.search import search_recipes
+from recipe.tasks import enqueue_image_job, enqueue_import
+from user.authentication import API_AUTHENTICATION_CLASSES
+
+
+class BulkModelMixin:
+    """Create, update and delete lists of objects in one request"""
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False)
+    def bulk(self, request):
+        """Create (POST), update (PATCH) or delete (DELETE) many objects"""
+        if not isinstance(request.data, list):
+            return Response(
+                {'non_field_errors': [_('Expected a list of items.')]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(request.data) > settings.RECIPE_BULK_MAX_ITEMS:
+            msg = _('Ensure there are no more than {max} items.')
+            return Response(
+                {'non_field_errors': [
+                    msg.format(max=settings.RECIPE_BULK_MAX_ITEMS)
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        handler = {
+            'POST': self._bulk_create,
+            'PATCH': self._bulk_update,
+            'DELETE': self._bulk_delete,
+        }[request.method]
+        # either every item is written or none of them is
+        try:
+            with transaction.atomic():
+                response = handler(request)
+        except IntegrityError as exc:
+            # a tag or ingredient renamed like another one of the user, the
+            # unique (user, lower(name)) indexes of migration 0012
+            constraint = getattr(
+                getattr(exc.__cause__, 'diag', None),
+                'constraint_name',
+                None
+            ) or ''
+            if not constraint.endswith('_lower_name_uniq'):
+                raise
+            return Response(
+                {'non_field_errors': [_('The names must be unique.')]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if status.is_success(response.status_code):
+            # bulk queries don't send the signals that invalidate the cache
+            invalidate_user_cache(request.user.pk)
+
+        return response
+
+    def _bulk_create(self, request):
+        serializer = self.get_serializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            # one dict of errors per item, empty for the valid ones
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        objs = serializer.save(user=request.user)
+        return Response(
+            self._get_bulk_data(objs),
+            status=status.HTTP_201_CREATED
+        )
+
+    def _bulk_update(self, request):
+        ids = [
+            item.get('id') if isinstance(item, dict) else None
+            for item in request.data
+        ]
+        instances, errors = self._get_bulk_instances(ids)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(
+            [instances[pk] for pk in self._get_bulk_ids(ids)],
+            data=request.data,
+            many=True,
+            partial=True
+        )
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        objs = serializer.save()
+        return Response(self._get_bulk_data(objs))
+
+    def _bulk_delete(self, request):
+        instances, errors = self._get_bulk_instances(request.data)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        self.get_queryset().filter(pk__in=list(instances)).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def _get_bulk_ids(self, ids):
+        """Return the ids as integers, or None for the invalid ones"""
+        result = []
+        for pk in ids:
+            try:
+                result.append(int(pk))
+            except (TypeError, ValueError):
+                result.append(None)
 
+        return result
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+    def _get_bulk_instances(self, ids):
+        """Return the objects of the user by id and the errors of each id"""
+        ids = self._get_bulk_ids(ids)
+        instances = self.get_queryset().in_bulk(
+            [pk for pk in ids if pk is not None]
+        )
+
+        errors = []
+        seen = set()
+        for pk in ids:
+            if pk not in instances:
+                errors.append({'id': [_('Not found.')]})
+            elif pk in seen:
+                errors.append({'id': [_('Duplicated item.')]})
+            else:
+                errors.append({})
+            seen.add(pk)
+
+        return instances, errors
+
+    def _get_bulk_data(self, objs):
+        """Return the representation of the written objects"""
+        queryset = self.get_queryset().filter(pk__in=[obj.pk for obj in objs])
+        return self.get_serializer(queryset, many=True).data
+
+
+class SparseFieldsetMixin:
+    """Answer ?fields= and ?expand= on the reads of the view.
+
+    `?fields=id,title` renders only those fields and loads only their
+    columns. `?expand=tags` renders the tags as objects instead of ids. The
+    relations that are not rendered are not prefetched.
+    """
+
+    def get_fieldset(self):
+        """Return the fields to render (None for all) and the expanded ones"""
+        if not hasattr(self, '_fieldset'):
+            fields, expand = None, set()
+            if self.request.method in SAFE_METHODS:
+                serializer_class = self.get_serializer_class()
+                fields = self._get_param_names(
+                    'fields',
+                    serializer_class.Meta.fields
+                )
+                expand = self._get_param_names(
+                    'expand',
+                    getattr(serializer_class, 'expandable_fields', {})
+                ) or set()
+                # the expanded relations are rendered even if not listed
+                if fields is not None:
+                    fields |= expand
+            self._fieldset = (fields, expand)
+
+        return self._fieldset
+
+    def _get_param_names(self, param, valid):
+        """Return the names of a comma separated parameter, or None"""
+        value = self.request.query_params.get(param)
+        if not value:
+            return None
+
+        names = {name.strip() for name in value.split(',') if name.strip()}
+        unknown = names.difference(valid)
+        if unknown:
+            msg = _('Unknown fields: {names}.')
+            raise ValidationError(
+                {param: [msg.format(names=', '.join(sorted(unknown)))]}
+            )
+
+        return names
+
+    def apply_fieldset(self, queryset):
+        """Load only the columns of the fields that are rendered"""
+        fields, expand = self.get_fieldset()
+        if fields is None:
+            return queryset
+
+        opts = queryset.model._meta
+        concrete = {field.name for field in opts.concrete_fields}
+        columns = {opts.pk.name}
+        # columns read by the serializer fields that are not columns
+        field_columns = getattr(
+            self.get_serializer_class(),
+            'field_columns',
+            {}
+        )
+        for name in fields:
+            if name in field_columns:
+                columns.update(field_columns[name])
+            elif name in concrete:
+                columns.add(name)
+        # the pagination reads the ordering values of the last row
+        for name in queryset.query.order_by:
+            if isinstance(name, str) and name.lstrip('-') in concrete:
+                columns.add(name.lstrip('-'))
+
+        return queryset.only(*columns)
+
+    def get_serializer_context(self):
+        """Add the fields to render and the relations to expand"""
+        context = super().get_serializer_context()
+        fields, expand = self.get_fieldset()
+        if fields is not None:
+            context['fields'] = fields
+        if expand:
+            context['expand'] = expand
+
+        return context
+
+
+class ValuesListMixin:
+    """List the objects from values() rows instead of model instances.
+
+    The serializer of the view builds the same data with
+    to_representation_rows, skipping the model instances and the field
+    machinery of each object.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        columns = serializer.get_row_columns()
+        # the pagination reads the ordering values of the last row, like the
+        # search rank
+        columns += [
+            name.lstrip('-') for name in queryset.query.order_by
+            if name.lstrip('-') not in columns
+        ]
+        rows = queryset.prefetch_related(None).values(*columns)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation_rows(page)
+            )
+
+        return Response(serializer.to_representation_rows(rows))
+
+
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                            BulkModelMixin,
+                            SparseFieldsetMixin,
+                            ValuesListMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for usere owned recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = API_AUTHENTICATION_CLASSES
     permission_classes = (IsAuthenticated,)
+    renderer_classes = API_RENDERER_CLASSES
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
@@ -25,10 +300,30 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         queryset = self.queryset
         if assigned_only:
             # filtra somente receitas com tags ou ingredientes
-            queryset = queryset.filter(recipe__isnull=False)
+            # a correlated EXISTS stops at the first recipe that uses the
+            # object, while joining the recipes returned one row per recipe
+            # that had to be sorted and deduplicated with DISTINCT
+            queryset = queryset.annotate(
+                assigned=Exists(self._get_recipe_relations())
+            ).filter(assigned=True)
+
+        return self.apply_fieldset(
+            queryset.filter(user=self.request.user).order_by('-name')
+        )
 
-        return queryset.filter(
-            user=self.request.user).order_by('-name').distinct()
+    def _get_recipe_relations(self):
+        """Return the recipe relations of the object in the outer query"""
+        through = getattr(Recipe, self.recipe_field).through
+        model_name = self.queryset.model._meta.model_name
+
+        return through.objects.filter(**{model_name: OuterRef('pk')})
+
+    # 304 answers are checked first, they don't even need the cache
+    @conditional_response()
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        """List the objects, answering from the cache when possible"""
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         """Create a new base recipe attribute"""
@@ -39,43 +334,209 @@ class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    recipe_field = 'tags'
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    recipe_field = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, BulkModelMixin, SparseFieldsetMixin,
+                    ValuesListMixin, viewsets.ModelViewSet):
     """Manage recipes in the database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = API_AUTHENTICATION_CLASSES
     permission_classes = (IsAuthenticated,)
+    renderer_classes = API_RENDERER_CLASSES
+    pagination_class = KeysetPagination
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
+    # related objects that each action serializes. they are fetched with one
+    # extra query per relation instead of one query per recipe (N+1). the
+    # list reads them from the relation tables (see ValuesListMixin), in the
+    # same order of the ids
+    prefetch_for_action = {
+        'bulk': (
+            Prefetch('tags', queryset=Tag.objects.only('id').order_by('id')),
+            Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only('id').order_by('id')
+            ),
+        ),
+        'retrieve': (
+            Prefetch(
+                'tags',
+                queryset=Tag.objects.only('id', 'name').order_by('id')
+            ),
+            Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only('id', 'name').order_by('id')
+            ),
+        ),
+    }
 
     # quando coloca o "_" antes do nome da funcao vc esta dizendo que eh uma
     # funcao que tem a intencao de ser privada (no python todas sao publicas)
-    def _convert_params_to_ints(self, qs):
+    def _convert_params_to_ints(self, qs, param=None):
         """Convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(",")]
+        try:
+            return [int(str_id) for str_id in qs.split(",")]
+        except ValueError:
+            raise ValidationError(
+                {param: [_('Expected a list of ids separated by commas.')]}
+            )
+
+    def _get_relation_ids(self):
+        """Return the tag and ingredient ids to filter by, by field"""
+        relation_ids = {}
+        for field in ('tags', 'ingredients'):
+            value = self.request.query_params.get(field)
+            if value:
+                # repeated ids would break the count of the matches
+                relation_ids[field] = set(
+                    self._convert_params_to_ints(value, field)
+                )
+
+        return relation_ids
+
+    def _get_relation_rows(self, field, ids):
+        """Return the relation rows of the recipes with the given ids"""
+        through = getattr(Recipe, field).through
+        target = Recipe._meta.get_field(field).m2m_reverse_field_name()
+
+        return through.objects.filter(**{f'{target}_id__in': ids})
+
+    def _filter_relations(self, queryset, relation_ids, match_all):
+        """Filter the recipes with any or all of the ids of each relation"""
+        for field, ids in relation_ids.items():
+            rows = self._get_relation_rows(field, ids)
+            if match_all:
+                # one grouped query over the relation table instead of one
+                # join per id: the recipes with a row for every id
+                rows = rows.values('recipe_id').annotate(
+                    matches=Count('pk')
+                ).filter(matches=len(ids))
+            # a subquery doesn't multiply the recipes like a join, so there
+            # is no need for DISTINCT
+            queryset = queryset.filter(pk__in=rows.values('recipe_id'))
+
+        return queryset
+
+    def _count_matches(self, relation_ids):
+        """Return how many of the requested ids each recipe has"""
+        counts = []
+        for field, ids in relation_ids.items():
+            rows = self._get_relation_rows(field, ids).filter(
+                recipe_id=OuterRef('pk')
+            ).values('recipe_id').annotate(matches=Count('pk'))
+            # the correlated count reads the (recipe, object) unique index of
+            # the relation table, only for the recipes that were filtered
+            counts.append(Coalesce(
+                Subquery(rows.values('matches'), output_field=IntegerField()),
+                0
+            ))
+
+        return sum(counts[1:], counts[0])
+
+    def _filter_ranges(self, queryset, params):
+        """Filter the recipes by the time and cost limits, if informed"""
+        lookups = {
+            'min_time': 'time_minutes__gte',
+            'max_time': 'time_minutes__lte',
+            'min_cost': 'cost__gte',
+            'max_cost': 'cost__lte',
+        }
+        filters = {
+            lookup: params[param]
+            for param, lookup in lookups.items()
+            if param in params
+        }
+
+        return queryset.filter(**filters)
+
+    @conditional_response()
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        """List the recipes, answering from the cache when possible"""
+        return super().list(request, *args, **kwargs)
+
+    # the detail renders the tags and ingredients, renaming one of them
+    # changes the response
+    @conditional_response(related_fields=('tags', 'ingredients'))
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        """Return a recipe, answering from the cache when possible"""
+        return super().retrieve(request, *args, **kwargs)
 
     def get_queryset(self):
         """Retrieve the recipes for the authenticated user"""
 
+        params = serializers.RecipeFilterSerializer(
+            data=self.request.query_params
+        )
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+
         # filtra as receitas pelas tags e ingredientes, se informados
-        tags = self.request.query_params.get('tags')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._convert_params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+        # match=any (default) returns the recipes with any of the ids,
+        # match=all only the recipes with all of them
+        relation_ids = self._get_relation_ids()
+        queryset = self._filter_relations(
+            self.queryset.filter(user=self.request.user),
+            relation_ids,
+            match_all=params['match'] == 'all'
+        )
+        queryset = self._filter_ranges(queryset, params)
+
+        # the search vector is only read by the database
+        queryset = queryset.defer('search_vector').prefetch_related(
+            *self._get_prefetch()
+        )
+
+        # ?q= searches the title, the tags and the ingredients and orders by
+        # relevance
+        search = self.request.query_params.get('q', '').strip()
+        if search:
+            # the best matches first, unless another ordering is asked
+            queryset = search_recipes(queryset, search)
+        queryset = self._order(queryset, params.get('ordering'), relation_ids)
+
+        return self.apply_fieldset(queryset)
 
-        ingredients = self.request.query_params.get('ingredients')
-        if ingredients:
-            ingredient_ids = self._convert_params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+    def _get_prefetch(self):
+        """Return the prefetch of the relations that the response renders"""
+        fields = self.get_fieldset()[0]
+        return [
+            lookup for lookup in self.prefetch_for_action.get(self.action, ())
+            if fields is None or lookup.prefetch_through in fields
+        ]
 
-        return queryset.filter(user=self.request.user)
+    def _order(self, queryset, ordering, relation_ids):
+        """Sort the recipes by the requested ordering"""
+        if ordering == 'matches':
+            if not relation_ids:
+                raise ValidationError({'ordering': [
+                    _('Ordering by matches requires tags or ingredients.')
+                ]})
+            # the recipes with more of the requested tags and ingredients
+            # first ("what can I cook with what I have")
+            return queryset.annotate(
+                matches=self._count_matches(relation_ids)
+            ).order_by('-matches', '-id')
+        if ordering in ('id', '-id'):
+            return queryset.order_by(ordering)
+        if ordering:
+            # the id breaks the ties in the same direction, so the
+            # (user, field, id) indexes give the rows already sorted
+            tiebreaker = '-id' if ordering.startswith('-') else 'id'
+            return queryset.order_by(ordering, tiebreaker)
+        if queryset.query.order_by:
+            # the search ranking
+            return queryset
+
+        return queryset.order_by('-id')
 
     # this is the function that's called to retrieve the serializer class for
     # a particular request and it is this function that you would use if you
@@ -94,10 +555,72 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return serializers.RecipeSerializer
 
+    def get_serializer_context(self):
+        """Add the size of the image chosen by the client and the fieldset"""
+        context = super().get_serializer_context()
+        image_size = self.request.query_params.get('image_size')
+        if image_size:
+            try:
+                context['image_size'] = int(image_size)
+            except ValueError:
+                raise ValidationError(
+                    {'image_size': [_('A valid integer is required.')]}
+                )
+
+        return context
+
     def perform_create(self, serializer):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
 
+    @action(
+        methods=['GET'],
+        detail=False,
+        renderer_classes=(FastJSONRenderer, NDJSONRenderer)
+    )
+    def export(self, request):
+        """Stream all the tags, ingredients and recipes of the user.
+
+        The format is JSON by default, NDJSON with ?format=ndjson or
+        `Accept: application/x-ndjson`.
+        """
+        # all the fields, the export ignores the parameters of the list
+        context = {'request': request}
+        sections = (
+            (
+                'tag',
+                serializers.TagSerializer(context=context),
+                Tag.objects.filter(user=request.user).order_by('id'),
+            ),
+            (
+                'ingredient',
+                serializers.IngredientSerializer(context=context),
+                Ingredient.objects.filter(user=request.user).order_by('id'),
+            ),
+            (
+                'recipe',
+                serializers.RecipeSerializer(context=context),
+                Recipe.objects.filter(user=request.user).order_by('id'),
+            ),
+        )
+
+        chunk_size = settings.RECIPE_EXPORT_CHUNK_SIZE
+        if request.accepted_renderer.format == 'ndjson':
+            stream = ndjson_stream(sections, chunk_size)
+            filename = 'recipes.ndjson'
+        else:
+            stream = json_stream(sections, chunk_size)
+            filename = 'recipes.json'
+
+        # the response is written while the rows are read, so the whole
+        # library is never in memory
+        response = StreamingHttpResponse(
+            stream,
+            content_type=request.accepted_renderer.media_type
+        )
+        response['Content-Disposition'] = f'attachment; filename={filename}'
+        return response
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to an existing recipe"""
@@ -115,13 +638,115 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             # save the recipe model with the updated data
-            serializer.save()
-            return Response(
-                serializer.data,
-                status=status.HTTP_200_OK
-            )
+            # only the upload is stored during the request. the renditions
+            # are created by the image workers, the job tells when they are
+            # done
+            with transaction.atomic():
+                serializer.save()
+                job = RecipeImageJob.objects.create(
+                    recipe=recipe,
+                    image=recipe.image.name
+                )
+                enqueue_image_job(job)
+
+            data = dict(serializer.data)
+            data['job'] = serializers.RecipeImageJobSerializer(job).data
+            return Response(data, status=status.HTTP_202_ACCEPTED)
 
         return Response(
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+class RecipeImageJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Follow the processing of the uploaded recipe images"""
+    authentication_classes = API_AUTHENTICATION_CLASSES
+    permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    queryset = RecipeImageJob.objects.all()
+    serializer_class = serializers.RecipeImageJobSerializer
+
+    def get_queryset(self):
+        """Retrieve the image jobs of the authenticated user recipes"""
+        queryset = self.queryset.filter(recipe__user=self.request.user)
+
+        recipe = self.request.query_params.get('recipe')
+        if recipe:
+            try:
+                recipe_id = int(recipe)
+            except ValueError:
+                raise ValidationError({'recipe': [_('Expected a recipe id.')]})
+            queryset = queryset.filter(recipe_id=recipe_id)
+
+        return queryset.order_by('-id')
+
+
+class RecipeImportViewSet(mixins.CreateModelMixin,
+                          viewsets.ReadOnlyModelViewSet):
+    """Upload files of recipes and follow their import"""
+    authentication_classes = API_AUTHENTICATION_CLASSES
+    permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    queryset = RecipeImport.objects.all()
+    serializer_class = serializers.RecipeImportSerializer
+
+    def get_queryset(self):
+        """Retrieve the imports of the authenticated user"""
+        return self.queryset.filter(user=self.request.user).order_by('-id')
+
+    def create(self, request, *args, **kwargs):
+        """Store the file and import it in the background"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        upload = serializer.validated_data['upload']
+        with transaction.atomic():
+            recipe_import = RecipeImport.objects.create(
+                user=request.user,
+                file=default_storage.save(
+                    recipe_import_file_path(upload.name),
+                    upload
+                ),
+                format=serializer.validated_data['format']
+            )
+            enqueue_import(recipe_import)
+
+        recipe_import.refresh_from_db()
+        return Response(
+            self.get_serializer(recipe_import).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    @action(methods=['POST'], detail=True)
+    def resume(self, request, pk=None):
+        """Import the rest of the file of a failed or stalled import"""
+        recipe_import = self.get_object()
+        # a running import that stopped making progress lost its process
+        stale = timezone.now() - timedelta(
+            seconds=settings.RECIPE_IMPORT_STALE_SECONDS
+        )
+        with transaction.atomic():
+            # only one of the concurrent requests claims the import
+            resumed = RecipeImport.objects.filter(
+                Q(status=RecipeImport.STATUS_FAILED) |
+                Q(status=RecipeImport.STATUS_RUNNING, updated_at__lt=stale),
+                pk=recipe_import.pk
+            ).update(
+                status=RecipeImport.STATUS_PENDING,
+                updated_at=timezone.now()
+            )
+            if not resumed:
+                return Response(
+                    {'status': [
+                        _('Only failed or stalled imports can be resumed.')
+                    ]},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            enqueue_import(recipe_import)
+
+        recipe_import.refresh_from_db()
+        return Response(
+            self.get_serializer(recipe_import).data,
+            status=status.HTTP_202_ACCEPTED
+        )
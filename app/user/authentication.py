@@ -0,0 +1,188 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, \
+    TokenAuthentication, get_authorization_header
+
+from user.tokens import ACCESS, TokenError, verify_token
+
+
+class TokenCache:
+    """Map token keys to the tokens of active users.
+
+    The first tier is a dict in the memory of the process, bounded to
+    `maxsize` entries (the least recently used is removed first) and to
+    `ttl` seconds per entry. The optional second tier is a django cache
+    shared by all the processes, so a token is loaded from the database
+    once per shared timeout instead of once per process.
+    """
+
+    def __init__(self, maxsize, ttl, shared_alias=None, shared_ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared_alias = shared_alias
+        self.shared_ttl = shared_ttl or ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        if not self.shared_alias:
+            return None
+
+        return caches[self.shared_alias]
+
+    def _shared_key(self, key):
+        return f'auth:token:{key}'
+
+    def get(self, key):
+        """Return the cached token of the key or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                token, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.local_hits += 1
+                    return token
+                del self._entries[key]
+
+        if self.shared is not None:
+            token = self.shared.get(self._shared_key(key))
+            if token is not None:
+                self._set_local(key, token)
+                with self._lock:
+                    self.shared_hits += 1
+                return token
+
+        with self._lock:
+            self.misses += 1
+
+        return None
+
+    def set(self, key, token):
+        """Cache the token in all the tiers"""
+        self._set_local(key, token)
+        if self.shared is not None:
+            self.shared.set(self._shared_key(key), token, self.shared_ttl)
+
+    def _set_local(self, key, token):
+        with self._lock:
+            self._entries[key] = (token, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove the token from all the tiers"""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete(self._shared_key(key))
+
+    def clear(self):
+        """Remove all the tokens of the process and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.local_hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        """Return the counters of the cache"""
+        with self._lock:
+            hits = self.local_hits + self.shared_hits
+            lookups = hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_ratio': hits / lookups if lookups else 0.0,
+            }
+
+
+token_cache = TokenCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL,
+    shared_alias=settings.AUTH_TOKEN_SHARED_CACHE,
+    shared_ttl=settings.AUTH_TOKEN_SHARED_CACHE_TTL
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that keeps the tokens it loaded in memory.
+
+    It accepts the same `Authorization: Token <key>` header as
+    TokenAuthentication. The token and user query only runs on a cache miss.
+    The signal receivers in user.signals remove a token when it is deleted
+    or when its user changes (deactivation, new password).
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token)
+
+        # the cached user is shared by the requests of the process, a view
+        # that changes request.user must not change it for the others
+        return (copy.copy(token.user), token)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authenticate with the signed access tokens of user.tokens.
+
+    Clients send `Authorization: Bearer <access token>`. The signature and
+    the expiry are checked in memory and the revocation list in the cache,
+    the database is never queried. request.user is an unsaved user with the
+    id and the email of the token, and request.auth is the token payload.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            msg = _('Invalid token header.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        try:
+            payload = verify_token(auth[1].decode(), ACCESS)
+        except (TokenError, UnicodeError) as exc:
+            raise exceptions.AuthenticationFailed(str(exc))
+
+        user = get_user_model()(
+            pk=payload['uid'],
+            email=payload['email'],
+            is_active=True,
+            is_staff=payload.get('staff', False)
+        )
+        # the user exists in the database, it just wasn't loaded
+        user._state.adding = False
+
+        return (user, payload)
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+# the views accept both kinds of token, so the clients can move from the
+# database tokens to the signed ones at their own pace
+API_AUTHENTICATION_CLASSES = (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
@@ -3,6 +3,9 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from core.hashers import HashingBusy, hashing_was_busy
+from user.tokens import REFRESH, TokenError, verify_token
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object"""
@@ -68,6 +71,9 @@ class AuthTokenSerializer(serializers.Serializer):
             password=password
         )
         if not user:
+            # a full hashing pool fails the login, it isn't a wrong password
+            if hashing_was_busy():
+                raise HashingBusy()
             msg = _('Unable to authenticate with provided credentials')
             # it raises the validation and django rest framework knows how to
             # handle this and who handles it by passing the error as a 400
@@ -77,3 +83,29 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer for a signed refresh token"""
+    refresh = serializers.CharField(trim_whitespace=False)
+
+    def validate(self, attrs):
+        """Validate the token and load its user"""
+        try:
+            payload = verify_token(attrs['refresh'], REFRESH)
+        except TokenError as exc:
+            raise serializers.ValidationError(str(exc), code='authentication')
+
+        # unlike the access tokens, the refresh checks the database, so a
+        # deactivated or deleted user can't get new tokens
+        user = get_user_model().objects.filter(
+            pk=payload['uid'],
+            is_active=True
+        ).first()
+        if user is None:
+            msg = _('Unable to authenticate with provided credentials')
+            raise serializers.ValidationError(msg, code='authentication')
+
+        attrs['payload'] = payload
+        attrs['user'] = user
+        return attrs
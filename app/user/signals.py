@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache
+from user.tokens import revoke_user_tokens
+
+
+@receiver(post_delete, sender=Token)
+def uncache_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a deleted token from the cache"""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def uncache_user_tokens(sender, instance, created, **kwargs):
+    """Reload the tokens of a user that changed"""
+    # the cached token carries the user, so a deactivated user or a new
+    # password must not be served from the cache anymore
+    if created:
+        return
+
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    for key in keys:
+        token_cache.delete(key)
+
+
+@receiver(post_save, sender=get_user_model())
+def revoke_user_signed_tokens(sender, instance, created, **kwargs):
+    """Revoke the signed tokens of a deactivated user or a new password"""
+    # set_password keeps the raw password in _password until the save ends
+    password_changed = getattr(instance, '_password', None) is not None
+    if not created and (password_changed or not instance.is_active):
+        revoke_user_tokens(instance.pk)
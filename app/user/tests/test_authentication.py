@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import TokenCache, token_cache
+
+ME_URL = reverse('user:me')
+
+
+class TokenCacheTests(TestCase):
+    """Test the cache of the authentication tokens"""
+
+    def test_least_recently_used_removed(self):
+        """Test that the cache keeps at most maxsize tokens"""
+        tokens = TokenCache(maxsize=2, ttl=60)
+        tokens.set('a', 1)
+        tokens.set('b', 2)
+        tokens.get('a')
+        tokens.set('c', 3)
+
+        self.assertEqual(tokens.get('a'), 1)
+        self.assertIsNone(tokens.get('b'))
+        self.assertEqual(tokens.get('c'), 3)
+        self.assertEqual(tokens.stats()['size'], 2)
+
+    def test_expired_token(self):
+        """Test that the tokens expire after the ttl"""
+        tokens = TokenCache(maxsize=2, ttl=0)
+        tokens.set('a', 1)
+
+        self.assertIsNone(tokens.get('a'))
+        self.assertEqual(tokens.stats()['misses'], 1)
+
+    def test_shared_tier(self):
+        """Test that a process finds the tokens cached by another one"""
+        cache.clear()
+        process1 = TokenCache(maxsize=2, ttl=60, shared_alias='default')
+        process2 = TokenCache(maxsize=2, ttl=60, shared_alias='default')
+        process1.set('a', 1)
+
+        self.assertEqual(process2.get('a'), 1)
+        self.assertEqual(process2.get('a'), 1)
+        self.assertEqual(process2.stats()['shared_hits'], 1)
+        self.assertEqual(process2.stats()['local_hits'], 1)
+
+        process1.delete('a')
+        process2.clear()
+        self.assertIsNone(process2.get('a'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating the requests with cached tokens"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_loaded_once(self):
+        """Test that the token is only queried on the first request"""
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        stats = token_cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['local_hits'], 1)
+
+    def test_deleted_token_rejected(self):
+        """Test that a deleted token is not accepted from the cache"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_user_rejected(self):
+        """Test that a deactivated user is not accepted from the cache"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_reloads_user(self):
+        """Test that changing the password removes the cached token"""
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {'password': 'newpassword'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    def test_invalid_token(self):
+        """Test that unknown tokens are rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
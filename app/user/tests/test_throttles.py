@@ -0,0 +1,136 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient
+
+from user.throttles import throttle_metrics
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+METRICS_URL = reverse('user:metrics')
+
+RATES = {
+    'token_email': '2/min',
+    'token_ip': '3/min',
+    'create_email': '1/hour',
+    'create_ip': '2/hour',
+}
+
+
+def rest_framework_settings():
+    """Return the REST_FRAMEWORK settings with low throttle rates"""
+    return dict(api_settings.user_settings, DEFAULT_THROTTLE_RATES=RATES)
+
+
+class LoginThrottleTests(TestCase):
+    """Test the throttles of the login and sign up endpoints"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        throttle_metrics.clear()
+        self.client = APIClient()
+        get_user_model().objects.create_user('test@test.com', '123')
+        settings = self.settings(REST_FRAMEWORK=rest_framework_settings())
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def login(self, email='test@test.com', password='wrong', **extra):
+        return self.client.post(
+            TOKEN_URL,
+            {'email': email, 'password': password},
+            **extra
+        )
+
+    def test_email_throttled_before_authentication(self):
+        """Test that the attempts over the limit skip the password check"""
+        self.login()
+        self.login()
+
+        with patch('user.serializers.authenticate') as authenticate:
+            res = self.login(password='123')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        authenticate.assert_not_called()
+
+    def test_email_throttle_ignores_case(self):
+        """Test that changing the case of the email doesn't reset the limit"""
+        self.login()
+        self.login(email='TEST@test.com')
+
+        res = self.login(email='Test@Test.com ')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_ip_throttle_across_emails(self):
+        """Test that one address can't try many emails"""
+        for i in range(3):
+            self.login(email=f'test{i}@test.com')
+
+        res = self.login(email='other@test.com')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # another client address still can log in
+        res = self.login(password='123', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_forwarded_for_ignored(self):
+        """Test that a forged X-Forwarded-For doesn't escape the limit"""
+        for i in range(3):
+            self.login(
+                email=f'test{i}@test.com',
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{i}'
+            )
+
+        res = self.login(
+            email='other@test.com',
+            HTTP_X_FORWARDED_FOR='10.0.0.9'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_create_user_throttled(self):
+        """Test that the sign ups are throttled by email"""
+        payload = {'email': 'new@test.com', 'password': '123'}
+        self.client.post(CREATE_USER_URL, payload)
+
+        res = self.client.post(CREATE_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_metrics(self):
+        """Test that the admins see the throttle counters"""
+        self.login()
+        self.login()
+        self.login()
+        admin = get_user_model().objects.create_superuser(
+            'admin@test.com',
+            '123'
+        )
+        token = Token.objects.create(user=admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['throttles']['token_email'],
+            {'allowed': 2, 'throttled': 1}
+        )
+        self.assertIn('hit_ratio', res.data['token_cache'])
+
+    def test_metrics_admin_only(self):
+        """Test that regular users can't see the metrics"""
+        self.client.force_authenticate(
+            get_user_model().objects.get(email='test@test.com')
+        )
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
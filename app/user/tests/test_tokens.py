@@ -0,0 +1,190 @@
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import tokens
+
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+ME_URL = reverse('user:me')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(AUTH_TOKEN_MODE='signed', AUTH_SIGNING_KEYS=['key1'])
+class SignedTokenApiTests(TestCase):
+    """Test the signed token authentication mode"""
+
+    def setUp(self):
+        cache.clear()
+        caches['throttle'].clear()
+        caches['revocation'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            '123',
+            name='Test'
+        )
+
+    def login(self):
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': 'test@test.com', 'password': '123'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def authenticate(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_create_signed_tokens(self):
+        """Test that the token endpoint issues access and refresh tokens"""
+        res = self.login()
+
+        self.assertIn('access', res)
+        self.assertIn('refresh', res)
+        self.assertNotIn('token', res)
+
+    def test_access_without_database(self):
+        """Test that the access token is verified without queries"""
+        self.authenticate(self.login()['access'])
+
+        # only the aggregate of the conditional response and the recipes
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_profile(self):
+        """Test that the profile is loaded from the database"""
+        self.authenticate(self.login()['access'])
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data, {'email': 'test@test.com', 'name': 'Test'})
+
+    def test_refresh_token_not_accepted_as_access(self):
+        """Test that only access tokens authenticate requests"""
+        self.authenticate(self.login()['refresh'])
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tampered_token(self):
+        """Test that a token with a changed payload is rejected"""
+        access = self.login()['access']
+        data, signature = access.split('.')
+        payload = tokens._b64decode(data).replace(b'"uid":', b'"uid":1')
+        self.authenticate(f'{tokens._b64encode(payload)}.{signature}')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_token(self):
+        """Test that expired access tokens are rejected"""
+        access = self.login()['access']
+        self.authenticate(access)
+
+        with patch('user.tokens.time.time', return_value=time.time() + 301):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates_token(self):
+        """Test that a refresh token can only be used once"""
+        refresh = self.login()['refresh']
+
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('access', res.data)
+
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_concurrent_refresh_rejected(self):
+        """Test that only one of two concurrent refreshes is accepted"""
+        refresh = self.login()['refresh']
+
+        # both requests validate the token before either of them revokes it
+        with patch('user.tokens.is_revoked', return_value=False):
+            res1 = self.client.post(REFRESH_URL, {'refresh': refresh})
+            res2 = self.client.post(REFRESH_URL, {'refresh': refresh})
+
+        self.assertEqual(res1.status_code, status.HTTP_200_OK)
+        self.assertEqual(res2.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('access', res2.data)
+
+    def test_revoke_tokens(self):
+        """Test that the revoked tokens are rejected"""
+        res = self.login()
+        self.authenticate(res['access'])
+
+        revoke = self.client.post(REVOKE_URL, {'refresh': res['refresh']})
+        recipes = self.client.get(RECIPES_URL)
+        refresh = self.client.post(REFRESH_URL, {'refresh': res['refresh']})
+
+        self.assertEqual(revoke.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(recipes.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(refresh.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_revocation_kept_apart_from_responses(self):
+        """Test that clearing the response cache keeps the revocations"""
+        res = self.login()
+        self.authenticate(res['access'])
+        self.client.post(REVOKE_URL, {'refresh': res['refresh']})
+
+        cache.clear()
+
+        self.assertEqual(
+            self.client.get(RECIPES_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_password_change_revokes_tokens(self):
+        """Test that a new password revokes the issued tokens"""
+        res = self.login()
+        self.user.set_password('456')
+        self.user.save()
+
+        self.authenticate(res['access'])
+        self.assertEqual(
+            self.client.get(RECIPES_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_key_rotation(self):
+        """Test that tokens of the previous key are accepted"""
+        access = self.login()['access']
+        self.authenticate(access)
+
+        with self.settings(AUTH_SIGNING_KEYS=['key2', 'key1']):
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(self.login()['access'].split('.')[1],
+                                access.split('.')[1])
+
+        with self.settings(AUTH_SIGNING_KEYS=['key2']):
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_database_tokens_still_accepted(self):
+        """Test that clients can keep using the database tokens"""
+        with self.settings(AUTH_TOKEN_MODE='db'):
+            token = self.client.post(
+                TOKEN_URL,
+                {'email': 'test@test.com', 'password': '123'}
+            ).data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
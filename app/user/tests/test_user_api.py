@@ -1,3 +1,4 @@
+from django.core.cache import caches
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -26,6 +27,8 @@ class PublicUserApiTests(TestCase):
         # it simplifies to call our client in our test to not have to create it
         # manually in every single test we run
         self.client = APIClient()
+        # the login throttles count the requests of all the tests
+        caches['throttle'].clear()
 
     def test_create_valid_user_success(self):
         """Test creating user with valid payload is successful"""
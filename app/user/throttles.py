@@ -0,0 +1,113 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class ThrottleMetrics:
+    """Count the requests allowed and rejected by each throttle scope"""
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, scope, allowed):
+        with self._lock:
+            counters = self._counters.setdefault(
+                scope,
+                {'allowed': 0, 'throttled': 0}
+            )
+            counters['allowed' if allowed else 'throttled'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+    def stats(self):
+        """Return the counters of each scope"""
+        with self._lock:
+            return {
+                scope: dict(counters)
+                for scope, counters in self._counters.items()
+            }
+
+
+throttle_metrics = ThrottleMetrics()
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    """Limit the requests of a view by one identity of the client.
+
+    The scope is the `throttle_scope` of the view followed by the kind of
+    identity, like `token_email`, and its rate comes from
+    DEFAULT_THROTTLE_RATES. DRF keeps the time of each request of the
+    window, so the limit is a sliding window. The throttles run before the
+    view, so a rejected login never reaches the password hashing.
+    """
+    scope_attr = 'throttle_scope'
+    identity = None
+
+    def __init__(self):
+        # the rate depends on the view, it is read in allow_request
+        pass
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE]
+
+    @property
+    def THROTTLE_RATES(self):
+        return api_settings.DEFAULT_THROTTLE_RATES
+
+    def allow_request(self, request, view):
+        view_scope = getattr(view, self.scope_attr, None)
+        if not view_scope:
+            return True
+
+        self.scope = f'{view_scope}_{self.identity}'
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        allowed = super().allow_request(request, view)
+        if self.rate is not None:
+            throttle_metrics.record(self.scope, allowed)
+
+        return allowed
+
+    def get_identity(self, request):
+        raise NotImplementedError('.get_identity() must be overridden')
+
+    def get_cache_key(self, request, view):
+        identity = self.get_identity(request)
+        if not identity:
+            return None
+
+        # the identity may have characters that some cache backends don't
+        # accept in the keys
+        digest = hashlib.md5(identity.encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': digest}
+
+
+class EmailRateThrottle(LoginRateThrottle):
+    """Limit the attempts on the same email, from any address"""
+    identity = 'email'
+
+    def get_identity(self, request):
+        data = request.data
+        email = data.get('email') if hasattr(data, 'get') else None
+        if not isinstance(email, str):
+            return None
+
+        return email.strip().lower()
+
+
+class IPRateThrottle(LoginRateThrottle):
+    """Limit the attempts from the same client address, on any email"""
+    identity = 'ip'
+
+    def get_identity(self, request):
+        return self.get_ident(request)
@@ -0,0 +1,141 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import ugettext_lazy as _
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+
+
+class TokenError(Exception):
+    """Raised when a signed token can't be accepted"""
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _key_id(key):
+    return hashlib.sha256(key.encode()).hexdigest()[:8]
+
+
+def get_signing_keys():
+    """Return the signing keys by id, the first one signs the new tokens.
+
+    To rotate, put the new key in front of AUTH_SIGNING_KEYS and keep the
+    old one after it until the last refresh token it signed expires.
+    """
+    return {_key_id(key): key for key in settings.AUTH_SIGNING_KEYS}
+
+
+def _signature(key, data):
+    return _b64encode(
+        hmac.new(key.encode(), data.encode(), hashlib.sha256).digest()
+    )
+
+
+def sign_token(user, token_type, lifetime):
+    """Return a token for the user that expires after lifetime seconds"""
+    key = settings.AUTH_SIGNING_KEYS[0]
+    now = time.time()
+    payload = {
+        'kid': _key_id(key),
+        'typ': token_type,
+        'uid': user.pk,
+        'email': user.email,
+        'staff': user.is_staff,
+        'jti': uuid.uuid4().hex,
+        'iat': now,
+        'exp': int(now + lifetime),
+    }
+    data = _b64encode(json.dumps(payload, separators=(',', ':')).encode())
+
+    return f'{data}.{_signature(key, data)}'
+
+
+def issue_tokens(user):
+    """Return a new pair of access and refresh tokens"""
+    return {
+        'access': sign_token(user, ACCESS, settings.AUTH_ACCESS_TOKEN_TTL),
+        'refresh': sign_token(user, REFRESH, settings.AUTH_REFRESH_TOKEN_TTL),
+        'token_type': 'Bearer',
+        'expires_in': settings.AUTH_ACCESS_TOKEN_TTL,
+    }
+
+
+def verify_token(token, token_type):
+    """Return the payload of a valid token, without querying the database"""
+    try:
+        data, signature = token.split('.')
+        payload = json.loads(_b64decode(data))
+        key = get_signing_keys()[payload['kid']]
+    except (ValueError, TypeError, KeyError):
+        raise TokenError(_('Invalid token.'))
+
+    if not hmac.compare_digest(signature, _signature(key, data)):
+        raise TokenError(_('Invalid token.'))
+    if payload.get('typ') != token_type:
+        raise TokenError(_('Invalid token type.'))
+    if payload['exp'] <= time.time():
+        raise TokenError(_('Token has expired.'))
+    if is_revoked(payload):
+        raise TokenError(_('Token has been revoked.'))
+
+    return payload
+
+
+# the revocation list lives in a cache shared by all the processes. it only
+# keeps the ids of the revoked tokens until they would expire anyway
+def _revocation_cache():
+    return caches[settings.AUTH_REVOCATION_CACHE]
+
+
+def _revoked_key(jti):
+    return f'auth:revoked:{jti}'
+
+
+def _revoked_before_key(user_id):
+    return f'auth:revoked_before:{user_id}'
+
+
+def revoke_token(payload):
+    """Stop accepting a token, return False if it was already revoked"""
+    timeout = max(int(payload['exp'] - time.time()), 1)
+    # add only stores the key if it is missing, so of two requests with the
+    # same token only one of them revokes it
+    return _revocation_cache().add(
+        _revoked_key(payload['jti']),
+        True,
+        timeout
+    )
+
+
+def revoke_user_tokens(user_id):
+    """Stop accepting all the tokens issued to a user until now"""
+    _revocation_cache().set(
+        _revoked_before_key(user_id),
+        time.time(),
+        settings.AUTH_REFRESH_TOKEN_TTL
+    )
+
+
+def is_revoked(payload):
+    """Return if the token or all the tokens of its user were revoked"""
+    revoked_key = _revoked_key(payload['jti'])
+    revoked_before_key = _revoked_before_key(payload['uid'])
+    revoked = _revocation_cache().get_many([revoked_key, revoked_before_key])
+    if revoked.get(revoked_key):
+        return True
+
+    revoked_before = revoked.get(revoked_before_key)
+    return revoked_before is not None and payload['iat'] <= revoked_before
@@ -1,13 +1,35 @@
-from rest_framework import generics, authentication, permissions
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.shortcuts import get_object_or_404
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import generics, permissions, serializers, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
-from user.serializers import UserSerializer, AuthTokenSerializer
+from core.db.routers import ReplicaReadMixin, pin_to_primary
+from user.authentication import API_AUTHENTICATION_CLASSES, \
+    SignedTokenAuthentication, token_cache
+from user.serializers import UserSerializer, AuthTokenSerializer, \
+    RefreshTokenSerializer
+from user.throttles import EmailRateThrottle, IPRateThrottle, \
+    throttle_metrics
+from user.tokens import issue_tokens, revoke_token
 
 
 class CreateUserView(generics.CreateAPIView):
     """Create new user in the system"""
     serializer_class = UserSerializer
+    # the rates are the 'create_email' and 'create_ip' throttle rates
+    throttle_scope = 'create'
+    throttle_classes = (EmailRateThrottle, IPRateThrottle)
+
+    def perform_create(self, serializer):
+        """Create the user, reading it from the primary for a while"""
+        # the user isn't authenticated yet, so the write doesn't pin it
+        pin_to_primary(serializer.save())
 
 
 class CreateTokenView(ObtainAuthToken):
@@ -15,16 +37,73 @@ class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     # sets the renderer to view in the browser
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    # each attempt costs a password hash, the throttles reject the excess
+    # before the credentials are checked
+    throttle_scope = 'token'
+    throttle_classes = (EmailRateThrottle, IPRateThrottle)
+
+    def post(self, request, *args, **kwargs):
+        """Return a database token or a pair of signed tokens"""
+        if settings.AUTH_TOKEN_MODE != 'signed':
+            return super().post(request, *args, **kwargs)
+
+        serializer = self.serializer_class(
+            data=request.data,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        return Response(issue_tokens(serializer.validated_data['user']))
+
+
+class RefreshTokenView(generics.GenericAPIView):
+    """Exchange a refresh token for a new pair of signed tokens"""
+    serializer_class = RefreshTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # each refresh token is used once, a stolen copy stops working
+        # after the next refresh. a concurrent refresh with the same token
+        # passes the validation too, but only one of them revokes it
+        if not revoke_token(serializer.validated_data['payload']):
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [
+                    _('Token has been revoked.')
+                ]},
+                code='authentication'
+            )
+        return Response(issue_tokens(serializer.validated_data['user']))
+
+
+class RevokeTokenView(generics.GenericAPIView):
+    """Revoke a refresh token and the access token of the request"""
+    serializer_class = RefreshTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    authentication_classes = (SignedTokenAuthentication,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        revoke_token(serializer.validated_data['payload'])
+        if request.auth is not None:
+            revoke_token(request.auth)
 
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+
+class ManageUserView(ReplicaReadMixin, generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
     # authentication is the mechanism by which the authentication happens
     # this could be cookie authentication or we're going to use token
     # authentication
     # it takes the authenticated user and assign it to request
-    authentication_classes = (authentication.TokenAuthentication,)
+    # the cached version only queries the token when it isn't in memory
+    authentication_classes = API_AUTHENTICATION_CLASSES
     # permissions are the level of access that the user has. the only
     # permission we're going to add is that the user must be authenticated
     # to use the API
@@ -37,4 +116,26 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     # And we're just going to return the user that is authenticated.
     def get_object(self):
         """Retrieve and return authentication user"""
+        authenticator = self.request.successful_authenticator
+        if isinstance(authenticator, SignedTokenAuthentication):
+            # the signed tokens only carry the id and the email of the user
+            return get_object_or_404(
+                get_user_model(),
+                pk=self.request.user.pk
+            )
+
         return self.request.user
+
+
+class MetricsView(APIView):
+    """Show the counters of the authentication to the admins"""
+    authentication_classes = API_AUTHENTICATION_CLASSES
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        # the counters are kept by each process, they describe the process
+        # that answers the request
+        return Response({
+            'throttles': throttle_metrics.stats(),
+            'token_cache': token_cache.stats(),
+        })